@@ -4,7 +4,6 @@ from pprint import pprint, pformat
 import datetime
 import traceback
 import copy
-from collections import OrderedDict
 from itertools import chain
 
 import sqlalchemy as sa
@@ -13,7 +12,6 @@ import requests.packages.urllib3 as urllib3
 from ws.client import API
 from ws.interactive import require_login
 from ws.db.database import Database, parser_cache
-from ws.utils.containers import dmerge
 import ws.diff
 from ws.parser_helpers.encodings import urldecode
 
@@ -94,17 +92,6 @@ def _check_lists_of_unordered_pages(db_list, api_list, *, db=None):
 
     _check_lists(db_list, api_list, key="pageid", db=db)
 
-# pages may be yielded multiple times, so we need to merge them manually
-def _squash_list_of_dicts(api_list, *, key="pageid"):
-    api_dict = OrderedDict()
-    for item in api_list:
-        key_value = item[key]
-        if key_value not in api_dict:
-            api_dict[key_value] = item
-        else:
-            dmerge(item, api_dict[key_value])
-    return list(api_dict.values())
-
 def _deduplicate_list_of_dicts(iterable):
     return [dict(t) for t in {tuple(d.items()) for d in iterable}]
 
@@ -466,7 +453,6 @@ def check_templatelinks(api, db):
 
     db_list = list(db.query(**params, prop=prop))
     api_list = list(api.generator(**params, prop="|".join(prop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     # sort the templates due to different locale (e.g. "Template:Related2" should come after "Template:Related")
     for entry in api_list:
@@ -488,7 +474,6 @@ def check_pagelinks(api, db):
 
     db_list = list(db.query(**params, prop=prop))
     api_list = list(api.generator(**params, prop="|".join(prop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     # fix sorting due to different locale
     for page in api_list:
@@ -510,7 +495,6 @@ def check_imagelinks(api, db):
 
     db_list = list(db.query(**params, prop=prop))
     api_list = list(api.generator(**params, prop="|".join(prop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     _check_lists_of_unordered_pages(db_list, api_list, db=db)
 
@@ -527,7 +511,6 @@ def check_categorylinks(api, db):
 
     db_list = list(db.query(**params, prop=prop))
     api_list = list(api.generator(**params, prop="|".join(prop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     # drop unsupported automatic categories: http://w.localhost/index.php/Special:TrackingCategories
     automatic_categories = {
@@ -568,7 +551,6 @@ def check_interwiki_links(api, db):
 
     db_list = list(db.query(**params, prop=prop))
     api_list = list(api.generator(**params, prop="|".join(prop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     # In our database, we store spaces instead of underscores and capitalize first letter.
     def ucfirst(s):
@@ -602,7 +584,6 @@ def check_external_links(api, db):
 
     db_list = list(db.query(**params, prop=prop))
     api_list = list(api.generator(**params, prop="|".join(prop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     hostname = urllib3.util.url.parse_url(api.index_url).host
     def get_hostname(url):
@@ -646,7 +627,6 @@ def check_redirects(api, db):
 
     db_list = list(db.query(**params, prop=prop, rdprop=rdprop))
     api_list = list(api.generator(**params, prop="|".join(prop), rdprop="|".join(rdprop)))
-    api_list = _squash_list_of_dicts(api_list)
 
     _check_lists_of_unordered_pages(db_list, api_list, db=db)
 
@@ -2,6 +2,8 @@
 
 import mwparserfromhell
 
+from ws.client import API
+from ws.db.database import Database
 from ws.checkers import ExtlinkStatusChecker
 from ws.pageupdater import PageUpdater
 
@@ -16,17 +18,40 @@ if __name__ == "__main__":
     from ws.interactive import InteractiveQuit
 
     argparser = ws.config.getArgParser(description="Parse all pages on the wiki and check the status of external links")
+    API.set_argparser(argparser)
+    # the database is needed only for the bulk check and the incremental mode
+    Database.set_argparser(argparser, required=False)
     Updater.set_argparser(argparser)
-    # checkers don't have their own set_argparser method at the moment,
-    # they just reuse API's and PageUpdater's options
+    ExtlinkStatusChecker.set_argparser(argparser)
+    argparser.add_argument("--sync-database", action="store_true",
+            help="synchronize the wiki-scripts database with the wiki before processing the pages")
+    # checkers reuse also API's and PageUpdater's options
 
     args = ws.config.parse_args(argparser)
 
+    api = API.from_argparser(args)
+    db = Database.from_argparser(args) if args.db_name is not None else None
+
+    if db is None and (args.check_all_extlinks or args.sync_database or args.incremental or args.page_source == "db"):
+        argparser.error("the --check-all-extlinks, --sync-database, --incremental and --page-source=db options require the database (--db-name)")
+
+    if args.sync_database:
+        # the externallinks table is filled by the parser cache
+        db.sync_with_api(api)
+        db.sync_revisions_content(api, mode="latest")
+        db.update_parser_cache()
+
     # create updater and add checkers
-    updater = Updater.from_argparser(args)
-    checker = ExtlinkStatusChecker(updater.api, None, timeout=args.connection_timeout, max_retries=args.connection_max_retries)
+    updater = Updater.from_argparser(args, api, db)
+    checker = ExtlinkStatusChecker(api, db, timeout=args.connection_timeout, max_retries=args.connection_max_retries)
     updater.add_checker(mwparserfromhell.nodes.ExternalLink, checker)
 
+    # check all distinct URLs on the wiki concurrently before processing the
+    # pages (the incremental mode processes only few pages, so it would be
+    # a waste to check all URLs)
+    if args.check_all_extlinks and not args.incremental:
+        checker.check_all_extlinks()
+
     try:
         updater.run()
     except (InteractiveQuit, KeyboardInterrupt):
@@ -4,7 +4,8 @@ import mwparserfromhell
 
 from ws.client import API
 from ws.db.database import Database
-from ws.checkers import ExtlinkReplacements, ManTemplateChecker, WikilinkChecker
+from ws.checkers import ExtlinkStatusChecker, ExtlinkReplacements, ManTemplateChecker, WikilinkChecker
+from ws.checkers.smarter_encryption_list import SmarterEncryptionList
 from ws.pageupdater import PageUpdater
 
 
@@ -23,6 +24,11 @@ class LinkChecker(ExtlinkReplacements, WikilinkChecker, ManTemplateChecker):
             if len(summary_parts) != initial_length:
                 return
 
+    def get_checked_urls(self, urls):
+        # collect the URLs from all parents which check external links
+        for klass in [ExtlinkReplacements, ManTemplateChecker]:
+            yield from klass.get_checked_urls(self, urls)
+
 
 class Updater(PageUpdater):
     skip_pages = ["Table of contents", "Help:Editing", "ArchWiki talk:Requests", "ArchWiki:Statistics"]
@@ -35,24 +41,33 @@ if __name__ == "__main__":
     API.set_argparser(argparser)
     Database.set_argparser(argparser)
     Updater.set_argparser(argparser)
-    # checkers don't have their own set_argparser method at the moment,
-    # they just reuse API's and PageUpdater's options
+    ExtlinkStatusChecker.set_argparser(argparser)
+    SmarterEncryptionList.set_argparser(argparser)
+    # checkers reuse also API's and PageUpdater's options
 
     args = ws.config.parse_args(argparser)
 
     api = API.from_argparser(args)
     db = Database.from_argparser(args)
 
+    # synchronize the mirror first, the checkers load their data from it
+    db.sync_with_api(api)
+    db.sync_revisions_content(api, mode="latest")
+    db.update_parser_cache()
+
     # create updater and add checkers
-    updater = Updater.from_argparser(args, api)
-    checker = LinkChecker(api, db, timeout=args.connection_timeout, max_retries=args.connection_max_retries)
+    updater = Updater.from_argparser(args, api, db)
+    checker = LinkChecker(api, db, timeout=args.connection_timeout, max_retries=args.connection_max_retries,
+                          **SmarterEncryptionList.kwargs_from_argparser(args))
     updater.add_checker(mwparserfromhell.nodes.ExternalLink, checker)
     updater.add_checker(mwparserfromhell.nodes.Wikilink, checker)
     updater.add_checker(mwparserfromhell.nodes.Template, checker)
 
-    db.sync_with_api(api)
-    db.sync_revisions_content(api, mode="latest")
-    db.update_parser_cache()
+    # check the URLs requested by the checkers concurrently before processing
+    # the pages (the incremental mode processes only few pages, so it would
+    # be a waste to check the URLs for all pages)
+    if args.check_all_extlinks and not args.incremental:
+        checker.check_all_extlinks()
 
     try:
         updater.run()
@@ -66,9 +66,8 @@ class Updater(PageUpdater):
 
         for page in self.api.generator(generator="backlinks", gbltitle=ARCHIVE_TITLE, gbllimit="200", gblnamespace=namespaces, gblfilterredir="nonredirects", gblredirect="1",
                                        prop="revisions", rvprop="content|timestamp", rvslots="main"):
-            # if the user is not logged in, the limit for revisions may be lower than gaplimit,
-            # in which case the generator will yield some pages multiple times without revisions
-            # before the query-continuation kicks in
+            # API.generator squashes the partial results of query-continuation,
+            # so pages without revisions can be only those deleted in the meantime
             if "revisions" not in page:
                 continue
 
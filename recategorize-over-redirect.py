@@ -35,7 +35,7 @@ class Recategorize:
 
         if text_old != text_new:
 #            edit_interactive(self.api, title, page["pageid"], text_old, text_new, timestamp, self.edit_summary, bot="")
-            self.api.edit(title, page["pageid"], text_new, timestamp, self.edit_summary, bot="")
+            return self.api.edit_queue.submit("edit", title, page["pageid"], text_new, timestamp, self.edit_summary, bot="")
 
     def flag_for_deletion(self, title):
         _title = self.api.Title(title)
@@ -63,10 +63,20 @@ class Recategorize:
                 continue
 
             catmembers = self.api.generator(generator="categorymembers", gcmtitle=source, gcmlimit="max", prop="revisions", rvprop="content|timestamp", rvslots="main")
-            for page in catmembers:
-                # the same page might be yielded multiple times
-                if "revisions" in page:
-                    self.recategorize_page(page, source, target)
+            futures = []
+            try:
+                for page in catmembers:
+                    # skip pages deleted in the meantime
+                    if "revisions" in page:
+                        future = self.recategorize_page(page, source, target)
+                        if future is not None:
+                            futures.append(future)
+            finally:
+                # wait for the edits submitted asynchronously
+                self.api.edit_queue.join()
+            # raise the errors of the edits like the synchronous API.edit
+            for future in futures:
+                future.result()
             # check again to see if the category is empty
             catmembers = list(self.api.list(list="categorymembers", cmtitle=source, cmlimit="max"))
             if len(catmembers) == 0:
@@ -2,7 +2,8 @@
 
 import logging
 
-from ws.client import API, APIError
+from ws.client import API
+from ws.client.edit_queue import check_result
 from ws.interactive import require_login
 from ws.ArchWiki.lang import detect_language, format_title
 
@@ -20,6 +21,8 @@ class Renamer:
 
     def __init__(self, api):
         self.api = api
+        # futures of the moves submitted asynchronously
+        self.pending_moves = []
 
         # ensure that we are authenticated
         require_login(self.api)
@@ -41,17 +44,21 @@ class Renamer:
 
         summary = self.edit_summary.format(old_lang=lang, new_lang=new_lang)
         logger.info(f"Move [[{title}]] to [[{new_title}]] ({summary})")
-        try:
-            self.api.move(title, new_title, summary, movesubpages=False)
-        except APIError:
-            # skip errors
-            pass
+        # API errors are logged by API.move and skipped (see check_allpages)
+        self.pending_moves.append(self.api.edit_queue.submit("move", title, new_title, summary, movesubpages=False))
 
     def check_allpages(self):
         namespaces = [0, 4, 10, 12, 14]
-        for ns in namespaces:
-            for page in self.api.generator(generator="allpages", gaplimit="max", gapfilterredir="nonredirects", gapnamespace=ns):
-                self.check_page(page["title"])
+        try:
+            for ns in namespaces:
+                for page in self.api.generator(generator="allpages", gaplimit="max", gapfilterredir="nonredirects", gapnamespace=ns):
+                    self.check_page(page["title"])
+        finally:
+            # wait for the moves submitted asynchronously
+            self.api.edit_queue.join()
+        for future in self.pending_moves:
+            check_result(future)
+        self.pending_moves.clear()
 
 if __name__ == "__main__":
     import ws.config
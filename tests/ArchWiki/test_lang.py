@@ -177,3 +177,22 @@ class test_format_title:
     def test_invalid_langname(self):
         with pytest.raises(ValueError):
             format_title("foo", "bar")
+
+def test_detect_languages():
+    titles = ["foo", "foo (Čeština)", "Category:Čeština", "foo (Čeština)"]
+    assert detect_languages(titles) == {
+        "foo": ("foo", get_local_language()),
+        "foo (Čeština)": ("foo", "Čeština"),
+        "Category:Čeština": ("Category:Čeština", "Čeština"),
+    }
+
+def test_getters_return_copies():
+    names = get_language_names()
+    names.append("foo")
+    assert "foo" not in get_language_names()
+
+def test_unknown_language():
+    with pytest.raises(IndexError):
+        tag_for_langname("foo")
+    with pytest.raises(IndexError):
+        langname_for_tag("xx")
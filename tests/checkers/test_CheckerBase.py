@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+import mwparserfromhell
+from mwparserfromhell.nodes import Text
+import pytest
+
+from ws.checkers.CheckerBase import get_edit_summary_tracker
+from ws.parser_helpers.wikicode import ensure_flagged_by_template, ensure_unflagged_by_template
+
+def _track(text, func, *, use_node=True):
+    wikicode = mwparserfromhell.parse(text)
+    node = wikicode.filter_wikilinks()[0]
+    summary_parts = []
+    summary = get_edit_summary_tracker(wikicode, summary_parts, node if use_node else None)
+    with summary("changed"):
+        func(wikicode, node)
+    return str(wikicode), summary_parts
+
+def _noop(wikicode, node):
+    pass
+
+def _set_title(wikicode, node):
+    node.title = "Bar"
+
+def _flag(wikicode, node):
+    ensure_flagged_by_template(wikicode, node, "Broken section link")
+
+def _unflag(wikicode, node):
+    ensure_unflagged_by_template(wikicode, node, "Broken section link")
+
+def _replace(wikicode, node):
+    wikicode.replace(node, "[[Bar]]")
+
+def _split(wikicode, node):
+    # text-preserving change of the structure
+    index = wikicode.index(node)
+    text = wikicode.get(index + 1)
+    wikicode.nodes[index + 1:index + 2] = [Text(text.value[:2]), Text(text.value[2:])]
+
+def _strip_previous(wikicode, node):
+    parent = wikicode.get(wikicode.index(node) - 1)
+    parent.value = parent.value.rstrip()
+
+@pytest.mark.parametrize("use_node", [True, False])
+@pytest.mark.parametrize("text, func, expected", [
+    ("foo [[Foo]] bar", _noop, "foo [[Foo]] bar"),
+    ("foo [[Foo]] bar", _set_title, "foo [[Bar]] bar"),
+    ("foo [[Foo]] bar", _flag, "foo [[Foo]]{{Broken section link}} bar"),
+    ("foo [[Foo]] {{Broken section link}} bar", _unflag, "foo [[Foo]] bar"),
+    ("[[Foo]] {{Broken section link}}", _unflag, "[[Foo]]"),
+    ("{{a}} foo [[Foo]] bar {{b}}", _replace, "{{a}} foo [[Bar]] bar {{b}}"),
+    ("{{a}} foo [[Foo]] bar {{b}}", _split, "{{a}} foo [[Foo]] bar {{b}}"),
+    ("{{a}} foo [[Foo]] bar {{b}}", _strip_previous, "{{a}} foo[[Foo]] bar {{b}}"),
+])
+def test_edit_summary_tracker(text, func, expected, use_node):
+    new_text, summary_parts = _track(text, func, use_node=use_node)
+    assert new_text == expected
+    if new_text == text:
+        assert summary_parts == []
+    else:
+        assert summary_parts == ["changed"]
@@ -86,3 +86,16 @@ def check_page_text(page):
 @then(parsers.parse("the last edit summary should be \"{summary}\""))
 def check_page_text(page, summary):
     assert page.last_edit_summary == summary
+
+
+def test_get_checked_urls(extlink_replacements):
+    urls = [extlink_replacements.parse_url(url) for url in [
+        "http://archlinux.org/some/page/",
+        "https://git.archlinux.org/svntogit/packages.git/commit/?id=c46609a4b0325c363455264844091b71de01eddc",
+        "https://example.org/unchanged",
+    ]]
+    # the bulk check uses the URLs which are checked by the page pass
+    assert list(extlink_replacements.get_checked_urls(urls)) == [
+        "https://archlinux.org/some/page/",
+        "https://github.com/archlinux/svntogit-packages/commit/c46609a4b0325c363455264844091b71de01eddc",
+    ]
@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+
+import requests_mock
+
+from ws.checkers import ExtlinkStatusChecker, ManTemplateChecker
+
+def test_check_urls():
+    checker = ExtlinkStatusChecker(None, None, timeout=1, max_retries=1)
+    with requests_mock.Mocker(session=checker.session) as session_mock:
+        session_mock.get("https://example.org/valid", status_code=200)
+        session_mock.get("https://example.org/invalid", status_code=404)
+        session_mock.get("https://example.org/indeterminate", status_code=500)
+
+        urls = [
+            "https://example.org/valid",
+            "https://example.org/valid#fragment",
+            "https://example.org/invalid",
+            "https://example.org/indeterminate",
+            "https://example.org/valid",
+        ]
+        assert checker.check_urls(urls, max_workers=4) == 3
+        assert session_mock.call_count == 3
+
+        # cached URLs are not checked again
+        assert checker.check_urls(urls) == 0
+        assert checker.check_url("https://example.org/valid#other") is True
+        assert checker.check_url("https://example.org/invalid") is False
+        assert checker.check_url("https://example.org/indeterminate") is None
+        assert session_mock.call_count == 3
+
+    assert checker.cache_invalid_urls == {
+        checker.parse_url("https://example.org/invalid"): 404,
+    }
+
+def test_parse_url():
+    assert ExtlinkStatusChecker.parse_url("https://example.org/foo").host == "example.org"
+    assert ExtlinkStatusChecker.parse_url("ftp://example.org/foo") is None
+    assert ExtlinkStatusChecker.parse_url("ftp://example.org/foo", allow_schemes=["ftp"]) is not None
+    assert ExtlinkStatusChecker.parse_url("http://localhost/foo") is None
+    assert ExtlinkStatusChecker.parse_url("http://127.0.0.1/foo") is None
+    assert ExtlinkStatusChecker.parse_url("http://server/foo") is None
+
+def test_check_url_throttled():
+    checker = ExtlinkStatusChecker(None, None, timeout=1, max_retries=1)
+    with requests_mock.Mocker(session=checker.session) as session_mock:
+        session_mock.get("https://example.org/throttled", [
+            {"status_code": 429, "headers": {"Retry-After": "0"}},
+            {"status_code": 200},
+        ])
+        session_mock.get("https://example.org/always-throttled", status_code=429, headers={"Retry-After": "0"})
+
+        assert checker.check_url("https://example.org/throttled") is True
+        assert checker.check_url("https://example.org/always-throttled") is None
+        assert session_mock.call_count == 2 + checker.throttle_retries + 1
+    assert checker.cache_invalid_urls == {}
+
+def test_get_state():
+    checker = ExtlinkStatusChecker(None, None, timeout=1, max_retries=1)
+    checker._alltemplates = {"Dead link", "Dead link (Español)"}
+    state = checker.get_state()
+    assert ExtlinkStatusChecker.memoizable is False
+    assert state["versions"] == {"CheckerBase": 1}
+    # the state changes with the existing templates
+    checker._alltemplates = {"Dead link"}
+    assert checker.get_state()["templates"] != state["templates"]
+
+def test_get_checked_urls():
+    urls = [ExtlinkStatusChecker.parse_url(url) for url in [
+        "https://example.org/foo",
+        "https://man.archlinux.org/man/ls.1",
+    ]]
+    checker = ExtlinkStatusChecker(None, None, timeout=1, max_retries=1)
+    assert list(checker.get_checked_urls(urls)) == urls
+    # ManTemplateChecker checks only the links generated by the {{man}} template
+    checker = ManTemplateChecker(None, None, timeout=1, max_retries=1)
+    assert list(checker.get_checked_urls(urls)) == urls[1:]
@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+
+import threading
+import time
+
+import pytest
+
+from ws.checkers.domain_scheduler import DomainScheduler, parse_retry_after
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("0", 0),
+    (" 120 ", 120),
+    ("foo", None),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+def test_throttle_backoff():
+    scheduler = DomainScheduler(initial_backoff=1, max_backoff=5)
+    assert scheduler.throttle("example.org") == 1
+    assert scheduler.throttle("Example.org") == 2
+    assert scheduler.throttle("example.org") == 4
+    assert scheduler.throttle("example.org") == 5
+    assert scheduler.throttle("example.org", "3") == 3
+    scheduler.reset("example.org")
+    assert scheduler.throttle("example.org") == 1
+
+def test_map():
+    scheduler = DomainScheduler(max_connections_per_host=2)
+    lock = threading.Lock()
+    active = {}
+    peak = {}
+
+    def func(item):
+        host = item[0]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        # nested slots for the same host do not block
+        with scheduler.slot(host):
+            time.sleep(0.01)
+        with lock:
+            active[host] -= 1
+        return item[1]
+
+    items = [(host, i) for i in range(6) for host in ["a", "b", "c"]]
+    results = scheduler.map(func, items, host=lambda item: item[0], max_workers=8)
+    assert results == [item[1] for item in items]
+    assert peak == {"a": 2, "b": 2, "c": 2}
+
+def test_map_throttled_host():
+    scheduler = DomainScheduler(max_connections_per_host=1)
+    scheduler.throttle("slow", "60")
+    done = []
+
+    def func(item):
+        done.append(item)
+
+    # the throttled host must not block the other hosts
+    thread = threading.Thread(target=scheduler.map, args=(func, ["slow", "fast1", "fast2"]), kwargs={"host": lambda item: item}, daemon=True)
+    thread.start()
+    thread.join(timeout=1)
+    assert sorted(done) == ["fast1", "fast2"]
+
+def test_map_exception():
+    scheduler = DomainScheduler()
+
+    def func(item):
+        raise ValueError(item)
+
+    with pytest.raises(ValueError):
+        scheduler.map(func, ["a", "b"], host=lambda item: item)
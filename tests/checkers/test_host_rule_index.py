@@ -0,0 +1,71 @@
+#! /usr/bin/env python3
+
+import re
+
+import pytest
+
+from ws.checkers.host_rule_index import HostRuleIndex, split_host_pattern
+from ws.checkers.ExtlinkReplacements import ExtlinkReplacements
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"https?\:\/\/wiki\.archlinux\.org\/index\.php\/(.*)", r"https?\:\/\/wiki\.archlinux\.org"),
+    (r"https?://(?:www\.)?example\.com/(?P<path>.*)", r"https?://(?:www\.)?example\.com"),
+    (r"https?://([a-z]+)\.example\.com/.*", r"https?://([a-z]+)\.example\.com"),
+    # the host part could match "/"
+    (r"https?://.*/foo", None),
+    (r"https?://[^.]+\.example\.com/foo", None),
+    # optional slash
+    (r"https?://example\.com/?", None),
+    (r"https?://example\.com(/.*)?", None),
+    # top-level alternation
+    (r"https?://example\.com/foo|https?://example\.org/bar", None),
+    # no scheme separator
+    (r"example\.com/foo", None),
+])
+def test_split_host_pattern(pattern, expected):
+    assert split_host_pattern(pattern) == expected
+
+def test_candidates():
+    patterns = [
+        r"https?://example\.com/foo",
+        r"https?://(www\.)?example\.org/.*",
+        r"https?://.*",
+        re.compile(r"https://example\.com/bar"),
+    ]
+    index = HostRuleIndex(patterns)
+    assert index.candidates("https://example.com/foo") == (0, 2, 3)
+    assert index.candidates("http://example.com/foo") == (0, 2)
+    assert index.candidates("http://www.example.net/") == (2,)
+    assert index.candidates("http://www.example.org/") == (1, 2)
+    assert index.candidates("ftp://example.net/") == (2,)
+
+URLS = [
+    "https://wiki.archlinux.org/index.php/Main_page",
+    "https://wiki.archlinux.org/title/Installation_guide",
+    "https://bugs.archlinux.org/task/12345",
+    "https://bbs.archlinux.org/viewtopic.php?id=123",
+    "https://www.archlinux.org/packages/core/x86_64/linux/",
+    "https://archlinux.org/packages/?q=linux",
+    "http://aur.archlinux.org/packages.php?ID=1234",
+    "https://aur.archlinux.org/packages/yay",
+    "https://projects.archlinux.org/svntogit/packages.git/tree/trunk?h=packages/linux",
+    "https://git.archlinux.org/svntogit/packages.git/tree/trunk/PKGBUILD?h=packages/linux",
+    "https://github.com/archlinux/archinstall",
+    "https://www.kernel.org/doc/Documentation/sysctl/vm.txt",
+    "https://mailman.archlinux.org/pipermail/arch-dev-public/2020-January/029999.html",
+    "https://example.com/foo",
+    "http://example.com",
+]
+
+@pytest.mark.parametrize("table, position", [
+    ("extlink_replacements", 0),
+    ("url_replacements", 1),
+])
+def test_equivalence_with_linear_scan(table, position):
+    rules = [re.compile(rule[position]) for rule in getattr(ExtlinkReplacements, table)]
+    index = HostRuleIndex(rules)
+    for url in URLS:
+        expected = [i for i, regex in enumerate(rules) if regex.fullmatch(url)]
+        candidates = index.candidates(url)
+        assert set(expected) <= set(candidates)
+        assert list(candidates) == sorted(candidates)
@@ -0,0 +1,205 @@
+#! /usr/bin/env python3
+
+import json
+import os
+
+import pytest
+import requests.packages.urllib3 as urllib3
+
+from ws.checkers.https_everywhere.rules import Ruleset
+from ws.checkers.https_everywhere.rule_trie import RuleTrie
+from ws.checkers.https_everywhere.index import build_index, load_index, RulesetIndex
+
+RULESETS = [
+    {
+        "name": "Example",
+        "target": ["example.com", "www.example.com"],
+        "rule": [{"from": "^http:", "to": "https:"}],
+    },
+    {
+        "name": "Wildcard left",
+        "target": ["*.wild.org"],
+        "exclusion": ["^http://excluded\\.wild\\.org/"],
+        "rule": [{"from": "^http://([\\w-]+)\\.wild\\.org/", "to": "https://$1.wild.org/"}],
+    },
+    {
+        "name": "Wildcard right",
+        "target": ["right.*"],
+        "rule": [{"from": "^http://right\\.(\\w+)/", "to": "https://right.$1/"}],
+    },
+    {
+        "name": "Wildcard middle",
+        "target": ["www.*.middle.net"],
+        "rule": [{"from": "^http:", "to": "https:"}],
+    },
+    {
+        "name": "Short wildcard",
+        "target": ["*.io"],
+        "rule": [{"from": "^http:", "to": "https:"}],
+    },
+    {
+        "name": "Disabled",
+        "default_off": "broken",
+        "target": ["disabled.com"],
+        "rule": [{"from": "^http:", "to": "https:"}],
+    },
+    {
+        "name": "Shared target",
+        "target": ["example.com"],
+        "rule": [{"from": "^http://example\\.com/special/", "to": "https://example.com/special/"}],
+    },
+]
+
+DOMAINS = [
+    "example.com", "www.example.com", "foo.example.com", "com",
+    "a.wild.org", "a.b.wild.org", "wild.org", "excluded.wild.org",
+    "right.com", "right.co.uk", "a.right.com",
+    "www.foo.middle.net", "www.foo.bar.middle.net", "foo.middle.net",
+    "a.io", "a.b.io",
+    "disabled.com", "unknown.org",
+]
+
+@pytest.fixture(scope="module")
+def trie():
+    trie = RuleTrie()
+    for r in RULESETS:
+        ruleset = Ruleset(r, "<test>")
+        if not ruleset.defaultOff:
+            trie.addRuleset(ruleset)
+    return trie
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("https_everywhere") / "rules.idx"
+    assert build_index(RULESETS, path) == 6
+    index = RulesetIndex(path)
+    yield index
+    index.close()
+
+@pytest.mark.parametrize("domain", DOMAINS)
+def test_matching_rulesets(trie, index, domain):
+    expected = {r.name for r in trie.matchingRulesets(domain)}
+    assert {r.name for r in index.matchingRulesets(domain)} == expected
+
+@pytest.mark.parametrize("domain", DOMAINS)
+def test_transform_url(trie, index, domain):
+    url = urllib3.util.url.parse_url("http://{}/path".format(domain))
+    assert index.transformUrl(url).url == trie.transformUrl(url).url
+
+def test_lazy_compilation(tmp_path):
+    build_index(RULESETS, tmp_path / "rules.idx")
+    index = RulesetIndex(tmp_path / "rules.idx")
+    ruleset = index.matchingRulesets("www.example.com")[0]
+    rule = ruleset.rules[0]
+    assert "fromRe" not in rule.__dict__
+    assert ruleset.apply("http://www.example.com/") == "https://www.example.com/"
+    assert "fromRe" in rule.__dict__
+    index.close()
+
+def test_load_index(tmp_path):
+    json_path = tmp_path / "rules.json"
+    index_path = tmp_path / "rules.idx"
+    json_path.write_text(json.dumps(RULESETS))
+
+    index = load_index(json_path, index_path)
+    assert len(index) == 6
+    digest = index.digest
+    index.close()
+    mtime = os.path.getmtime(index_path)
+
+    # the current index is not rebuilt
+    index = load_index(json_path, index_path)
+    assert index.digest == digest
+    index.close()
+    assert os.path.getmtime(index_path) == mtime
+
+    # the index is rebuilt when the JSON file is newer
+    json_path.write_text(json.dumps(RULESETS[:1]))
+    os.utime(json_path, (mtime + 10, mtime + 10))
+    index = load_index(json_path, index_path)
+    assert len(index) == 1
+    assert index.digest != digest
+    index.close()
+
+def test_load_index_fallback(tmp_path, monkeypatch):
+    json_path = tmp_path / "rules.json"
+    json_path.write_text(json.dumps(RULESETS))
+    # the index cannot be written into a nonexistent directory
+    index_path = tmp_path / "missing" / "rules.idx"
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+    index = load_index(json_path, index_path)
+    assert len(index) == 6
+    index.close()
+    fallback = [p for p in tmp_path.iterdir() if p.suffix == ".idx"]
+    assert len(fallback) == 1
+    mtime = os.path.getmtime(fallback[0])
+
+    # the fallback index is reused
+    index = load_index(json_path, index_path)
+    assert len(index) == 6
+    index.close()
+    assert [p for p in tmp_path.iterdir() if p.suffix == ".idx"] == fallback
+    assert os.path.getmtime(fallback[0]) == mtime
+
+def test_invalid_index(tmp_path):
+    path = tmp_path / "invalid.idx"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        RulesetIndex(path)
+
+def _apply_sequential(ruleset, url):
+    if any(exclusion.matches(url) for exclusion in ruleset.exclusions):
+        return url
+    for rule in ruleset.rules:
+        new_url = rule.apply(url)
+        if new_url != url:
+            return new_url
+    return url
+
+@pytest.mark.parametrize("rules, combined", [
+    # anchored patterns are combined
+    ([("^http://a\\.example\\.com/", "https://a.example.com/"),
+      ("^http://(b|c)\\.example\\.com/", "https://$1.example.com/"),
+      ("^http:", "https:")], True),
+    # a no-op rewrite falls through to the following rules
+    ([("^http://a\\.example\\.com/(x)", "http://a.example.com/$1"),
+      ("^http:", "https:")], True),
+    # unanchored branch
+    ([("^http://a\\.example\\.com/|example", "foo"),
+      ("^http:", "https:")], False),
+    # backreferences
+    ([("^http://(a)\\1\\.example\\.com/", "https://aa.example.com/"),
+      ("^http:", "https:")], False),
+    # duplicate group names
+    ([("^http://(?P<sub>a)\\.example\\.com/", "https://a.example.com/"),
+      ("^http://(?P<sub>b)\\.example\\.com/", "https://b.example.com/")], False),
+])
+def test_combined_rules(rules, combined):
+    element = {
+        "name": "Combined",
+        "target": ["*.example.com"],
+        "exclusion": ["^http://excluded\\.example\\.com/", "/private/"],
+        "rule": [{"from": from_, "to": to} for from_, to in rules],
+    }
+    ruleset = Ruleset(element, "<test>")
+    assert (ruleset._combinedRuleRe is not None) is combined
+    assert ruleset._combinedExclusionRe is not None
+    for url in ["http://a.example.com/x", "http://b.example.com/", "http://c.example.com/y",
+                "http://aa.example.com/", "http://d.example.com/", "https://a.example.com/",
+                "http://excluded.example.com/", "http://a.example.com/private/",
+                "ftp://example.com/"]:
+        assert ruleset.apply(url) == _apply_sequential(ruleset, url)
+
+def test_matching_rulesets_cache(trie):
+    trie.clearCache()
+    first = trie.matchingRulesets("www.example.com")
+    assert trie.matchingRulesets("www.example.com") is first
+    info = trie._matchingRulesetsCached.cache_info()
+    assert info.hits == 1 and info.misses == 1
+
+def test_add_ruleset_clears_cache():
+    trie = RuleTrie()
+    assert trie.matchingRulesets("example.com") == ()
+    trie.addRuleset(Ruleset(RULESETS[0], "<test>"))
+    assert [r.name for r in trie.matchingRulesets("example.com")] == ["Example"]
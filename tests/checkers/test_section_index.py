@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+
+from ws.checkers.section_index import SectionIndex
+
+class FakeDatabase:
+    pages = {
+        "Foo": [("Foo bar", "Foo_bar"), ("Baz", "Baz"), ("Baz", "Baz_2")],
+        "Talk:Foo": [],
+    }
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, *, titles, prop, secprop):
+        assert prop == "sections"
+        assert secprop == {"title", "anchor"}
+        self.queries.append(set(titles))
+        for title in sorted(titles):
+            if title in self.pages:
+                page = {"title": title}
+                if self.pages[title]:
+                    page["sections"] = [{"title": t, "anchor": a} for t, a in self.pages[title]]
+                yield page
+            else:
+                yield {"missing": "", "title": title}
+
+def test_prefetch():
+    db = FakeDatabase()
+    index = SectionIndex(db)
+    index.prefetch(["Foo", "Talk:Foo", "Bar"])
+    assert db.queries == [{"Foo", "Talk:Foo", "Bar"}]
+
+    assert index.get("Foo") == (["Foo bar", "Baz", "Baz"], ["Foo_bar", "Baz", "Baz_2"])
+    assert index.get("Talk:Foo") == ([], [])
+    assert index.get("Bar") is None
+    # everything was served from memory
+    assert len(db.queries) == 1
+
+    # only new titles are queried
+    index.prefetch(["Foo", "Baz"])
+    assert db.queries[1:] == [{"Baz"}]
+    index.prefetch(["Foo", "Baz"])
+    assert len(db.queries) == 2
+
+def test_get_on_demand():
+    db = FakeDatabase()
+    index = SectionIndex(db)
+    assert "Foo" not in index
+    assert index.get("Foo")[1] == ["Foo_bar", "Baz", "Baz_2"]
+    assert "Foo" in index
+    assert db.queries == [{"Foo"}]
+
+def test_chunks():
+    db = FakeDatabase()
+    index = SectionIndex(db, chunk_size=2)
+    index.prefetch(["A", "B", "C", "D", "E"])
+    assert len(db.queries) == 3
+    assert set.union(*db.queries) == {"A", "B", "C", "D", "E"}
+
+def test_pretty_anchors():
+    db = FakeDatabase()
+    index = SectionIndex(db)
+    assert index.get_pretty_anchors("Foo") == ["Foo bar", "Baz", "Baz 2"]
+    assert index.get_pretty_anchors("Foo", "_") == ["Foo bar", "Baz", "Baz_2"]
+    assert index.get_pretty_anchors("Bar") is None
+    assert len(db.queries) == 2
+
+def test_fuzzy_index():
+    db = FakeDatabase()
+    index = SectionIndex(db)
+    fuzzy_index = index.get_fuzzy_index("Foo")
+    assert fuzzy_index is index.get_fuzzy_index("Foo")
+    assert fuzzy_index.ranks("Foo_Bar", min_ratio=0.8, limit=2) == [("Foo_bar", 6 / 7)]
+    assert index.get_fuzzy_index("Bar") is None
@@ -0,0 +1,118 @@
+#! /usr/bin/env python3
+
+import argparse
+import hashlib
+import os
+import time
+
+import pytest
+import requests_mock
+
+from ws.checkers.smarter_encryption_list import SmarterEncryptionList, HashSnapshot, build_snapshot
+
+DOMAINS = ["wiki.archlinux.org", "archlinux.org", "Example.COM"]
+
+def test_build_snapshot(tmp_path):
+    path = tmp_path / "se.snapshot"
+    lines = DOMAINS + ["", "# comment", hashlib.sha1(b"hashed.org").hexdigest(), "archlinux.org"]
+    assert build_snapshot(lines, path) == 4
+
+    snapshot = HashSnapshot(path)
+    assert len(snapshot) == 4
+    for domain in ["wiki.archlinux.org", "archlinux.org", "example.com", "hashed.org"]:
+        assert domain in snapshot
+    # the lookup is case-insensitive like the domain names
+    for domain in ["Wiki.ArchLinux.org", "EXAMPLE.COM"]:
+        assert domain in snapshot
+    for domain in ["foo", "bbs.archlinux.org", ""]:
+        assert domain not in snapshot
+    digest = snapshot.digest
+    snapshot.close()
+
+    # the digest identifies the entries
+    build_snapshot(reversed(lines), path)
+    snapshot = HashSnapshot(path)
+    assert snapshot.digest == digest
+    snapshot.close()
+    build_snapshot(DOMAINS, path)
+    snapshot = HashSnapshot(path)
+    assert snapshot.digest != digest
+    snapshot.close()
+
+def test_invalid_snapshot(tmp_path):
+    path = tmp_path / "invalid.snapshot"
+    path.write_bytes(b"x" * 40)
+    with pytest.raises(ValueError):
+        HashSnapshot(path)
+
+def test_snapshot_mode(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("\n".join(DOMAINS))
+    path = tmp_path / "se.snapshot"
+
+    selist = SmarterEncryptionList(timeout=1, max_retries=1, snapshot_path=str(path), snapshot_source=str(source))
+    # no network requests are made in the snapshot mode
+    with requests_mock.Mocker(session=selist.session) as session_mock:
+        assert "wiki.archlinux.org" in selist
+        assert "foo" not in selist
+        assert session_mock.call_count == 0
+
+    # the snapshot is not rebuilt when it is current
+    mtime = os.path.getmtime(path)
+    source.write_text("foo")
+    selist = SmarterEncryptionList(timeout=1, max_retries=1, snapshot_path=str(path), snapshot_source=str(source))
+    assert os.path.getmtime(path) == mtime
+    assert "foo" not in selist
+
+    # stale snapshot is refreshed
+    os.utime(path, (time.time() - 3600, time.time() - 3600))
+    selist = SmarterEncryptionList(timeout=1, max_retries=1, snapshot_path=str(path), snapshot_source=str(source), snapshot_max_age=60)
+    assert "foo" in selist
+    assert "wiki.archlinux.org" not in selist
+
+def test_snapshot_from_url(tmp_path):
+    path = tmp_path / "se.snapshot"
+    url = "https://example.org/smarter_encryption.txt"
+    with requests_mock.Mocker() as mock:
+        mock.get(url, text="\n".join(DOMAINS))
+        selist = SmarterEncryptionList(timeout=1, max_retries=1, snapshot_path=str(path), snapshot_source=url)
+    assert "archlinux.org" in selist
+
+def test_missing_snapshot_falls_back_to_api(tmp_path):
+    selist = SmarterEncryptionList(timeout=1, max_retries=1, snapshot_path=str(tmp_path / "missing"))
+    assert selist.snapshot is None
+    h = hashlib.sha1(b"wiki.archlinux.org").hexdigest()
+    with requests_mock.Mocker(session=selist.session) as session_mock:
+        session_mock.get(selist.endpoint.format(hash_prefix=h[:4]), json=[h])
+        assert "wiki.archlinux.org" in selist
+        assert "wiki.archlinux.org" in selist
+        assert session_mock.call_count == 1
+
+@pytest.mark.parametrize("content", [
+    # empty file
+    b"",
+    # truncated header
+    b"WSSE",
+    # invalid magic
+    b"x" * 40,
+    # truncated entries
+    b"WSSESNP1\x02\x00\x00\x00" + b"x" * 30,
+])
+def test_corrupt_snapshot_falls_back_to_api(tmp_path, content):
+    path = tmp_path / "se.snapshot"
+    path.write_bytes(content)
+    selist = SmarterEncryptionList(timeout=1, max_retries=1, snapshot_path=str(path))
+    assert selist.snapshot is None
+
+def test_argparser(tmp_path):
+    argparser = argparse.ArgumentParser()
+    SmarterEncryptionList.set_argparser(argparser)
+    args = argparser.parse_args(["--smarter-encryption-snapshot", str(tmp_path / "se.snapshot"),
+                                 "--smarter-encryption-source", "https://example.org/list.txt"])
+    assert SmarterEncryptionList.kwargs_from_argparser(args) == {
+        "snapshot_path": str(tmp_path / "se.snapshot"),
+        "snapshot_source": "https://example.org/list.txt",
+        "snapshot_max_age": 7 * 24 * 3600,
+    }
+    args = argparser.parse_args([])
+    assert SmarterEncryptionList.kwargs_from_argparser(args)["snapshot_path"] is None
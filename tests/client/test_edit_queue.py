@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+
+import pytest
+
+from ws.client import APIError
+from ws.client.edit_queue import EditQueue, is_edit_conflict, check_result
+
+class FakeAPI:
+    def __init__(self):
+        self.edits = []
+
+    def edit(self, title, pageid, text, basetimestamp, summary, **kwargs):
+        if not summary:
+            raise Exception("edit summary is mandatory")
+        if text == "conflict":
+            raise APIError({"action": "edit"}, {"code": "editconflict", "info": "Edit conflict."})
+        self.edits.append(title)
+        return {"result": "Success"}
+
+class test_edit_queue:
+    def test_order(self):
+        api = FakeAPI()
+        queue = EditQueue(api)
+        futures = [queue.submit("edit", "Page {}".format(i), i, "text", None, "summary") for i in range(20)]
+        queue.join()
+        assert api.edits == ["Page {}".format(i) for i in range(20)]
+        assert all(check_result(future) is True for future in futures)
+
+    def test_invalid_action(self):
+        queue = EditQueue(FakeAPI())
+        with pytest.raises(ValueError):
+            queue.submit("delete", "Page")
+
+    def test_conflict(self):
+        queue = EditQueue(FakeAPI())
+        future = queue.submit("edit", "Page", 1, "conflict", None, "summary")
+        queue.join()
+        assert is_edit_conflict(future.exception())
+        assert check_result(future) is False
+
+    def test_other_errors(self):
+        api = FakeAPI()
+        queue = EditQueue(api)
+        failed = queue.submit("edit", "Page 1", 1, "text", None, "")
+        ok = queue.submit("edit", "Page 2", 2, "text", None, "summary")
+        queue.join()
+        # the worker continues after the failure, but the error is not lost
+        assert api.edits == ["Page 2"]
+        assert not is_edit_conflict(failed.exception())
+        with pytest.raises(Exception, match="edit summary is mandatory"):
+            check_result(failed)
+        assert check_result(ok) is True
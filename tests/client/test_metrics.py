@@ -0,0 +1,92 @@
+#! /usr/bin/env python3
+
+import json
+
+import pytest
+import requests_mock
+
+from ws.client import Connection, APIError
+from ws.client.metrics import ClientMetrics, get_api_module
+
+@pytest.mark.parametrize("params, expected", [
+    ({"action": "help"}, ""),
+    ({"action": "query", "list": "allpages"}, "allpages"),
+    ({"action": "query", "generator": "allpages", "prop": "revisions|info"}, "allpages+revisions+info"),
+    ({"action": "query", "meta": {"siteinfo", "userinfo"}}, "siteinfo+userinfo"),
+])
+def test_get_api_module(params, expected):
+    assert get_api_module(params) == expected
+
+class test_client_metrics:
+    api_url = "http://wiki-scripts.localhost/api.php"
+    index_url = "http://wiki-scripts.localhost/index.php"
+
+    @pytest.fixture(scope="function")
+    def metrics(self):
+        metrics = ClientMetrics()
+        yield metrics
+        metrics.close()
+
+    def test_connection(self, metrics):
+        session = Connection.make_session()
+        conn = Connection(self.api_url, self.index_url, session, metrics=metrics)
+        with requests_mock.Mocker(session=session) as mock:
+            mock.get(self.api_url, text=json.dumps({"query": {"allpages": []}}))
+            conn.call_api(action="query", list="allpages")
+            conn.call_api(action="query", list="allpages")
+        summary = metrics.summary()
+        assert len(summary["requests"]) == 1
+        entry = summary["requests"][0]
+        assert entry["action"] == "query"
+        assert entry["module"] == "allpages"
+        assert entry["requests"] == 2
+        assert entry["bytes_in"] == 2 * len(json.dumps({"query": {"allpages": []}}))
+        assert entry["bytes_out"] > 0
+
+    def test_api_error(self, metrics):
+        session = Connection.make_session()
+        conn = Connection(self.api_url, self.index_url, session, metrics=metrics)
+        with requests_mock.Mocker(session=session) as mock:
+            mock.get(self.api_url, text=json.dumps({"error": {"code": "foo", "info": "bar"}}))
+            with pytest.raises(APIError):
+                conn.call_api(action="query", list="allpages")
+        entry = metrics.summary()["requests"][0]
+        assert entry["requests"] == 1
+        assert entry["errors"] == 1
+        assert entry["bytes_in"] > 0
+
+    def test_stream(self, metrics):
+        session = Connection.make_session()
+        conn = Connection(self.api_url, self.index_url, session, metrics=metrics)
+        with requests_mock.Mocker(session=session) as mock:
+            mock.get(self.index_url, text="foo bar", headers={"Content-Length": "7"})
+            response = conn.call_index(params={"title": "Foo"}, stream=True)
+            # the body was not consumed by the metrics
+            assert response._content_consumed is False
+            assert response.text == "foo bar"
+        entry = metrics.summary()["requests"][0]
+        assert entry["action"] == "index"
+        assert entry["bytes_in"] == 7
+        assert entry["errors"] == 0
+
+    def test_throttle(self, metrics):
+        metrics.record_throttle("API.edit", 1.5)
+        metrics.record_throttle("API.edit", 2)
+        assert metrics.summary()["throttle"] == [{"function": "API.edit", "count": 2, "seconds": 3.5}]
+
+    def test_prometheus(self, metrics):
+        metrics.record_request("query", "allpages", bytes_in=10)
+        metrics.record_throttle("API.edit", 3)
+        text = metrics.to_prometheus()
+        assert "# TYPE ws_client_requests_total counter" in text
+        assert 'ws_client_requests_total{action="query",module="allpages"} 1' in text
+        assert 'ws_client_bytes_in_total{action="query",module="allpages"} 10' in text
+        assert 'ws_client_throttle_seconds_total{function="API.edit"} 3' in text
+
+    def test_export(self, metrics, tmp_path):
+        metrics.record_request("query", "allpages")
+        path = tmp_path / "metrics.json"
+        metrics.export(str(path))
+        assert json.loads(path.read_text()) == metrics.summary()
+        with pytest.raises(ValueError):
+            metrics.export(str(path), format="foo")
@@ -6,6 +6,7 @@ import sqlalchemy as sa
 import pytest
 
 from ws.client.api import LoginFailed
+from ws.client.edit_queue import is_edit_conflict
 
 class test_simple_queries:
 # TODO: figure out how to restore the fixture state after the test
@@ -97,6 +98,23 @@ class test_actions:
         assert api.oldest_rc_timestamp == timestamp
         assert api.newest_rc_timestamp == new_timestamp
 
+    def test_edit_queue(self, mediawiki):
+        mediawiki.clear()
+        api = mediawiki.api
+        self._create_page(api, "Test page")
+        text, timestamp, pageid = self._get_content_api(api, "Test page")
+
+        future = api.edit_queue.submit("edit", "Test page", pageid, text + "foo", timestamp, "summary 1")
+        api.edit_queue.join()
+        assert future.result()["result"] == "Success"
+        new_text, new_timestamp, _ = self._get_content_api(api, "Test page")
+        assert new_text == text + "foo"
+
+        # creating an existing page results in a conflict
+        future = api.edit_queue.submit("create", "Test page", "bar", "summary 2")
+        api.edit_queue.join()
+        assert is_edit_conflict(future.exception())
+
 class test_query_continue:
     titles = ["Test {}".format(i) for i in range(10)]
 
@@ -138,3 +156,20 @@ class test_query_continue:
     def test_query_continue_params_kwargs(self, mediawiki):
         with pytest.raises(ValueError):
             next(mediawiki.api.query_continue(params={"foo": 0}, bar=1))
+
+    def test_generator_squashing(self, mediawiki):
+        mediawiki.clear()
+        api = mediawiki.api
+
+        links = ["Link {}".format(i) for i in range(3)]
+        content = " ".join("[[{}]]".format(link) for link in links)
+        for title in self.titles:
+            api.create(title, content, title)
+        mediawiki.run_jobs()
+
+        # pllimit=1 forces query-continuation of the prop data
+        pages = list(api.generator(generator="allpages", gaplimit="max", prop="links", pllimit=1))
+        titles = [page["title"] for page in pages]
+        assert titles == self.titles
+        for page in pages:
+            assert [link["title"] for link in page["links"]] == links
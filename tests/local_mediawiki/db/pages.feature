@@ -59,6 +59,7 @@ Feature: Syncing the page tables
         And the allpages lists should match
         # TODO: until we actually check the props...
         And the page_props table should not be empty
+        And the displaytitles should match
         And the revisions should match
 
     Scenario: Syncing page with displaytitle after empty sync
@@ -70,6 +71,7 @@ Feature: Syncing the page tables
         And the allpages lists should match
         # TODO: until we actually check the props...
         And the page_props table should not be empty
+        And the displaytitles should match
         And the revisions should match
 
     Scenario: Syncing protected page
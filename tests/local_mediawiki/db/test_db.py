@@ -3,6 +3,8 @@ import os.path
 import sqlalchemy as sa
 from pytest_bdd import scenarios, given, when, then, parsers
 
+from ws.db.selects.displaytitles import get_displaytitles
+
 scenarios(".")
 
 @given("an api to an empty MediaWiki")
@@ -264,6 +266,17 @@ def check_allpages_match(mediawiki, db):
 
     assert db_list == api_list
 
+@then("the displaytitles should match")
+def check_displaytitles_match(mediawiki, db):
+    api_displaytitles = {}
+    for ns in mediawiki.api.site.namespaces.keys():
+        if ns < 0:
+            continue
+        for page in mediawiki.api.generator(generator="allpages", gaplimit="max", gapnamespace=ns, prop="info", inprop="displaytitle"):
+            api_displaytitles[page["title"]] = page["displaytitle"]
+
+    assert get_displaytitles(db) == api_displaytitles
+
 @then(parsers.parse("the {table} table should be empty"))
 def check_table_not_empty(db, table):
     t = getattr(db, table)
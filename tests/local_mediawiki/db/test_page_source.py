@@ -0,0 +1,50 @@
+#! /usr/bin/env python3
+
+from ws.page_source import APIPageSource, DatabasePageSource
+
+def _sync(mediawiki, db):
+    mediawiki.run_jobs()
+    db.sync_with_api(mediawiki.api, check_needs_update=False)
+    db.sync_revisions_content(mediawiki.api, mode="latest")
+
+def _strip(page):
+    return {
+        "pageid": page["pageid"],
+        "ns": page["ns"],
+        "title": page["title"],
+        "revisions": [{
+            "revid": page["revisions"][0]["revid"],
+            "timestamp": page["revisions"][0]["timestamp"],
+            "slots": {"main": {"*": page["revisions"][0]["slots"]["main"]["*"]}},
+        }],
+    }
+
+def test_database_page_source(mediawiki, db):
+    mediawiki.clear()
+    api = mediawiki.api
+    api.create("Foo", "foo", "create")
+    api.create("Bar", "bar", "create")
+    api.create("Baz", "#REDIRECT [[Foo]]", "create")
+    _sync(mediawiki, db)
+
+    api_source = APIPageSource(api)
+    db_source = DatabasePageSource(api, db)
+
+    for filterredir in ["all", "nonredirects", "redirects"]:
+        api_pages = [_strip(page) for page in api_source.allpages(0, filterredir=filterredir)]
+        db_pages = list(db_source.allpages(0, filterredir=filterredir))
+        assert db_pages == api_pages
+    assert [page["title"] for page in db_source.allpages(0, first="Baz")] == ["Baz", "Foo"]
+
+    pageids = [page["pageid"] for page in api_source.allpages(0)]
+    assert sorted(page["pageid"] for page in db_source.pages_by_ids(pageids)) == sorted(pageids)
+
+    # current pages are confirmed as they are
+    page = next(db_source.allpages(0, first="Foo"))
+    assert db_source.confirm(page) is page
+
+    # outdated pages are fetched from the API
+    api.edit("Foo", page["pageid"], "foo edited", page["revisions"][0]["timestamp"], "edit")
+    current = db_source.confirm(page)
+    assert current is not page
+    assert current["revisions"][0]["slots"]["main"]["*"] == "foo edited"
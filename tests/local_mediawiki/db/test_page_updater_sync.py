@@ -0,0 +1,105 @@
+#! /usr/bin/env python3
+
+import datetime
+import time
+
+from ws.db.page_updater_sync import PageUpdaterSync
+
+def _sync(mediawiki, db):
+    mediawiki.run_jobs()
+    db.sync_with_api(mediawiki.api, with_content=True, check_needs_update=False)
+
+def test_page_updater_sync(mediawiki, db):
+    mediawiki.clear()
+    api = mediawiki.api
+    api.create("Foo", "foo", "create")
+    api.create("Bar", "bar", "create")
+    _sync(mediawiki, db)
+
+    sync = PageUpdaterSync(db, "test")
+    pages = sync.get_pages(0)
+    assert [page["title"] for page in pages] == ["Bar", "Foo"]
+    assert [page["title"] for page in sync.get_pages(0, first="C")] == ["Foo"]
+
+    for page in pages:
+        sync.set_processed(page["pageid"], page["lastrevid"])
+    assert sync.get_pages(0) == []
+    # other configurations are tracked separately
+    assert len(PageUpdaterSync(db, "other").get_pages(0)) == 2
+    # expired pages
+    assert len(sync.get_pages(0, max_age=datetime.timedelta(0))) == 2
+
+    # edited pages are selected again
+    result = api.call_api(action="query", titles="Foo", prop="revisions", rvprop="timestamp")
+    page = list(result["pages"].values())[0]
+    api.edit("Foo", page["pageid"], "foo edited", page["revisions"][0]["timestamp"], "edit")
+    _sync(mediawiki, db)
+    assert [page["title"] for page in sync.get_pages(0)] == ["Foo"]
+
+    sync.reset()
+    assert len(sync.get_pages(0)) == 2
+
+def test_page_updater_sync_results(mediawiki, db):
+    mediawiki.clear()
+    api = mediawiki.api
+    api.create("Foo", "foo", "create")
+    api.create("Bar", "bar", "create")
+    _sync(mediawiki, db)
+
+    sync = PageUpdaterSync(db, "test")
+    foo, bar = sorted(sync.get_pages(0), key=lambda page: page["title"], reverse=True)
+    assert sync.get_result(foo["pageid"], foo["lastrevid"], "state") is None
+
+    sync.set_processed(foo["pageid"], foo["lastrevid"], state="state")
+    sync.set_processed(bar["pageid"], bar["lastrevid"], state="state", text="baz", summary="replace bar")
+    assert sync.get_result(foo["pageid"], foo["lastrevid"], "state") == (None, "")
+    assert sync.get_result(bar["pageid"], bar["lastrevid"], "state") == ("baz", "replace bar")
+    assert sync.get_pages(0) == []
+
+    # results for a different state or revision are not reused
+    assert sync.get_result(foo["pageid"], foo["lastrevid"], "other") is None
+    assert sync.get_result(foo["pageid"], foo["lastrevid"] + 1, "state") is None
+    # expired results
+    assert sync.get_result(foo["pageid"], foo["lastrevid"], "state", max_age=datetime.timedelta(0)) is None
+
+    # results without a state are never reused
+    sync.set_processed(foo["pageid"], foo["lastrevid"], text="foo", summary="summary")
+    assert sync.get_result(foo["pageid"], foo["lastrevid"], None) is None
+
+def test_page_updater_sync_state(mediawiki, db):
+    mediawiki.clear()
+    api = mediawiki.api
+    api.create("Foo", "[[Bar]] [[Baz]]", "create")
+    api.create("Bar", "bar", "create")
+    api.create("Baz", "#REDIRECT [[Qux]]", "create")
+    api.create("Qux", "qux", "create")
+    _sync(mediawiki, db)
+    db.update_parser_cache()
+
+    sync = PageUpdaterSync(db, "test")
+    pages = {page["title"]: page for page in sync.get_pages(0)}
+    foo = pages["Foo"]
+    state = "state:" + sync.get_link_targets_state(foo["pageid"])
+    assert state == "state:2-{}-1-{}".format(pages["Baz"]["lastrevid"], pages["Qux"]["lastrevid"])
+    for page in pages.values():
+        sync.set_processed(page["pageid"], page["lastrevid"], state="state" if page is not foo else state)
+    # the recorded state is compared by prefix
+    assert sync.get_pages(0, state="state", link_targets=True) == []
+    # pages processed with a different state are selected again
+    assert len(sync.get_pages(0, state="other")) == 4
+    assert sync.get_pages(0) == []
+
+    for title in ["Bar", "Qux"]:
+        # the revision timestamps have a resolution of seconds
+        time.sleep(1)
+        result = api.call_api(action="query", titles=title, prop="revisions", rvprop="timestamp")
+        page = list(result["pages"].values())[0]
+        api.edit(title, page["pageid"], title + " edited", page["revisions"][0]["timestamp"], "edit")
+        _sync(mediawiki, db)
+        # pages linking to the edited page (directly or through a redirect) are selected again
+        selected = {page["title"]: page for page in sync.get_pages(0, state="state", link_targets=True)}
+        assert set(selected) == {title, "Foo"}
+        assert [page["title"] for page in sync.get_pages(0, state="state")] == [title]
+        sync.set_processed(selected[title]["pageid"], selected[title]["lastrevid"], state="state")
+        sync.set_processed(foo["pageid"], foo["lastrevid"], state="state:" + sync.get_link_targets_state(foo["pageid"]))
+        assert sync.get_pages(0, state="state", link_targets=True) == []
@@ -34,6 +34,23 @@ class test_encodings:
         e2 = encode(all_, skip_chars=skip)
         assert e1 == e2
 
+    def test_special_map(self):
+        # the cached tables must not be shared between different parameters
+        assert encode("a b", special_map={" ": "+"}) == "%61+%62"
+        assert encode("a b", special_map={" ": "_"}) == "%61_%62"
+        assert encode("a b") == "%61%20%62"
+        assert encode("ěa", encode_chars="ě", special_map={"ě": "e"}) == "ea"
+
+    def test_decode_special_map(self):
+        assert decode("a+b%2B%C4%9B+", special_map={"+": " "}) == "a b+ě "
+        assert decode("a+b%2B", special_map={"+": " ", "ab": "x"}) == "a b+"
+
+    def test_decode_invalid(self):
+        assert urldecode("%G0%4%%") == "%G0%4%%"
+        with pytest.raises(UnicodeDecodeError):
+            urldecode("%C4")
+        assert decode("%C4%9B%C4", errors="replace") == "ě\ufffd"
+
     def test_urlencode(self):
         skipped = string.ascii_letters + string.digits + "-_.~"
         for s in [self.ascii_all, self.unicode_sample]:
@@ -522,6 +522,36 @@ class test_magic_words(common_base):
         expected = "The main article for this category is [[Cat main]]."
         self._do_test(title_context, d, title, expected)
 
+    def test_many(self, title_context):
+        d = {
+            "Template:Foo": "[[{{PAGENAME}}|{{{1}}}]]",
+            "Title": "".join("{{PAGENAME}} {{#if:{{{1|x}}}|[[%d]]}} {{Foo|%d}}\n" % (i, i) for i in range(100)),
+        }
+        title = "Title"
+        expected = "".join("Title [[%d]] [[Title|%d]]\n" % (i, i) for i in range(100))
+        self._do_test(title_context, d, title, expected)
+
+    def test_get_replacement(self, title_context):
+        mw = MagicWords(Title(title_context, "Talk:Foo/Bar"))
+        wikicode = mwparserfromhell.parse("{{PAGENAME}}{{TALKPAGENAME}}{{ #if: x | [[Foo]] }}{{LOCALTIMESTAMP}}")
+        replacements = [mw.get_replacement(template) for template in wikicode.filter_templates()]
+        assert replacements == ["Foo/Bar", "Talk:Foo/Bar", "[[Foo]]", None]
+
+    @pytest.mark.parametrize("text, expected", [
+        ("{{PAGENAME}}", [mwparserfromhell.nodes.Text]),
+        ("{{ #if: x | [[Foo]] bar }}", [mwparserfromhell.nodes.Wikilink, mwparserfromhell.nodes.Text]),
+        ("{{ #if: x | mailto:foo }}", [mwparserfromhell.nodes.ExternalLink]),
+        ("{{urlencode:a b}}", [mwparserfromhell.nodes.Text]),
+        ("{{anchorencode:mailto:a}}", [mwparserfromhell.nodes.ExternalLink]),
+        ("{{ #if: | foo }}", [mwparserfromhell.nodes.Text]),
+    ])
+    def test_evaluate(self, title_context, text, expected):
+        mw = MagicWords(Title(title_context, "Title"))
+        template = mwparserfromhell.parse(text).get(0)
+        replacement = mw.evaluate(template)
+        assert str(replacement) == mw.get_replacement(template)
+        assert [type(node) for node in replacement.nodes] == expected
+
 class test_transclusion_modifiers(common_base):
     @pytest.mark.parametrize("modifier", ["subst", "safesubst"])
     def test_subst_existing_template(self, title_context, modifier):
@@ -1,5 +1,7 @@
 #! /usr/bin/env python3
 
+import copy
+
 import pytest
 
 from ws.parser_helpers.title import *
@@ -508,3 +510,58 @@ def test_format(title_context):
     assert title.format(sectionname=True) == "Main page#section"
     assert title.format(colon=True, iwprefix=True) == ":en:Talk:Main page"
     assert title.format(colon=True, iwprefix=True, sectionname=True) == ":en:Talk:Main page#section"
+
+
+class test_parse_cache:
+    def test_shared_result(self, title_context):
+        title1 = Title(title_context, "Help:Style#section")
+        title2 = Title(title_context, "Help:Style#section")
+        assert title1 == title2
+        # modifying one title must not affect the cached result
+        title1.pagename = "Main page"
+        title1.sectionname = ""
+        assert str(title1) == "Help:Main page"
+        assert str(title2) == "Help:Style#section"
+        assert str(Title(title_context, "Help:Style#section")) == "Help:Style#section"
+
+    def test_hits(self, title_context):
+        title_context._parse_cached.cache_clear()
+        for i in range(3):
+            Title(title_context, "Template:AUR")
+        info = title_context._parse_cached.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+
+    def test_errors_not_cached(self, title_context):
+        for i in range(2):
+            with pytest.raises(InvalidTitleCharError):
+                Title(title_context, "Foo[bar]")
+
+    def test_bounded(self):
+        from fixtures.title_context import interwikimap, namespacenames, namespaces, legaltitlechars
+        context = Context(interwikimap, namespacenames, namespaces, legaltitlechars, parse_cache_size=2)
+        for title in ["Foo", "Bar", "Baz", "Foo"]:
+            Title(context, title)
+        info = context._parse_cached.cache_info()
+        assert info.currsize == 2
+        assert info.misses == 4
+
+    def test_immutable_context(self, title_context):
+        with pytest.raises(TypeError):
+            title_context.namespacenames["Foo"] = 42
+
+class test_slots:
+    def test_no_dict(self, title_context):
+        title = Title(title_context, "Help:Style#section")
+        assert not hasattr(title, "__dict__")
+        with pytest.raises(AttributeError):
+            title.foo = "bar"
+
+    def test_copy(self, title_context):
+        title = Title(title_context, ":Help:Style#section")
+        title2 = copy.copy(title)
+        assert title2 == title
+        assert title2.leading_colon == ":"
+        title2.pagename = "Foo"
+        assert str(title) == "Help:Style#section"
+        assert str(title2) == "Help:Foo#section"
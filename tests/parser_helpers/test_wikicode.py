@@ -1,5 +1,6 @@
 #! /usr/bin/env python3
 
+import pytest
 import mwparserfromhell
 
 from ws.parser_helpers.wikicode import *
@@ -268,6 +269,19 @@ class test_get_anchors:
         result = get_anchors(get_section_headings(snippet))
         assert result == expected
 
+    def test_many_duplicates(self):
+        headings = ["foo", "Foo", "foo 3"] * 100
+        result = get_anchors(headings)
+        assert len(set(r.lower() for r in result)) == len(result)
+        assert result[:6] == ["foo", "Foo_2", "foo_3", "foo_4", "Foo_5", "foo_3_2"]
+        assert result[-3:] == ["foo_200", "Foo_201", "foo_3_100"]
+
+    def test_plain(self):
+        headings = ["a=b", "x__TOC__", "foo: bar (baz)", "=foo", "foo="]
+        expected = ["a=b", "x__TOC__", "foo: bar (baz)", "=foo", "foo="]
+        result = get_anchors(headings, pretty=True)
+        assert result == expected
+
     def test_strip(self):
         snippet = """
 == Section with ''wikicode'' ==
@@ -537,3 +551,86 @@ class test_parented_ifilter:
             templates.append(template)
             assert parent.index(template) >= 0
         assert templates == self.wikicode.filter_templates(recursive=False)
+
+class test_NodeVisitor:
+    snippet = """<span>
+            foo {{bar|some text and {{another|template}}}}
+            </span>
+            [[link]] {{foo|bar}} [http://example.com]
+            """
+
+    def test_all_nodes(self):
+        wikicode = mwparserfromhell.parse(self.snippet)
+        nodes = []
+        for parent, node in NodeVisitor(wikicode):
+            nodes.append(node)
+            assert any(n is node for n in parent.nodes)
+        expected = wikicode.filter(recursive=True)
+        assert len(nodes) == len(expected)
+        assert all(a is b for a, b in zip(nodes, expected))
+
+    def test_types(self):
+        wikicode = mwparserfromhell.parse(self.snippet)
+        types = (mwparserfromhell.nodes.Template, mwparserfromhell.nodes.Wikilink)
+        nodes = [node for parent, node in NodeVisitor(wikicode, types)]
+        assert [str(node) for node in nodes] == [
+            "{{bar|some text and {{another|template}}}}",
+            "{{another|template}}",
+            "[[link]]",
+            "{{foo|bar}}",
+        ]
+
+    def test_replace(self):
+        wikicode = mwparserfromhell.parse(self.snippet)
+        visited = []
+        for parent, node in NodeVisitor(wikicode, mwparserfromhell.nodes.ExternalLink):
+            visited.append(str(node))
+            # replace with a node of a different type, which should not be visited again
+            parent.replace(node, "[[replaced]]")
+        visited_links = []
+        for parent, node in NodeVisitor(wikicode, mwparserfromhell.nodes.Wikilink):
+            visited_links.append(str(node))
+            if str(node) == "[[link]]":
+                parent.replace(node, "[[new link]]")
+                parent.insert_after(parent.get(parent.index("[[new link]]")), " [[inserted]]")
+        assert visited == ["[http://example.com]"]
+        assert visited_links == ["[[link]]", "[[new link]]", "[[inserted]]", "[[replaced]]"]
+
+    def test_get_parent_wikicode(self):
+        wikicode = mwparserfromhell.parse(self.snippet)
+        with NodeVisitor(wikicode) as visitor:
+            for parent, node in visitor:
+                assert visitor.get_parent(node) is parent
+                assert get_parent_wikicode(wikicode, node) is parent
+        # moved nodes are found by the fallback search
+        template = wikicode.filter_templates()[0]
+        inner = wikicode.filter_templates()[1]
+        with NodeVisitor(wikicode) as visitor:
+            list(visitor)
+            template.get(1).value.remove(inner)
+            wikicode.append(inner)
+            assert get_parent_wikicode(wikicode, inner) is wikicode
+
+    def test_get_parent_wikicode_detached(self):
+        wikicode = mwparserfromhell.parse(self.snippet)
+        template = wikicode.filter_templates()[0]
+        inner = wikicode.filter_templates()[1]
+        with NodeVisitor(wikicode) as visitor:
+            list(visitor)
+            # the recorded parent still contains the node, but it is detached
+            wikicode.remove(template)
+            assert visitor.get_parent(inner) is template.get(1).value
+            with pytest.raises(ValueError):
+                get_parent_wikicode(wikicode, inner)
+
+        wikicode = mwparserfromhell.parse(self.snippet)
+        template = wikicode.filter_templates()[0]
+        inner = wikicode.filter_templates()[1]
+        with NodeVisitor(wikicode) as visitor:
+            list(visitor)
+            # the parameter containing the node is removed
+            value = template.get(1).value
+            template.remove(1)
+            assert any(n is inner for n in value.nodes)
+            with pytest.raises(ValueError):
+                get_parent_wikicode(wikicode, inner)
@@ -0,0 +1,169 @@
+#! /usr/bin/env python3
+
+import datetime
+import types
+
+import mwparserfromhell
+import pytest
+
+from ws.client import APIError
+from ws.client.edit_queue import EditQueue
+import ws.pageupdater
+from ws.pageupdater import PageUpdater
+
+
+class FakeAPI:
+    def __init__(self):
+        self.user = types.SimpleNamespace(is_loggedin=True, rights=["bot"])
+        self.edit_queue = EditQueue(self)
+        self.edits = []
+
+    def edit(self, title, pageid, text, basetimestamp, summary, **kwargs):
+        if text == "conflict":
+            raise APIError({"action": "edit"}, {"code": "editconflict", "info": "Edit conflict."})
+        self.edits.append(title)
+        return {"result": "Success"}
+
+class FakeSync:
+    """In-memory replacement of :py:class:`ws.db.page_updater_sync.PageUpdaterSync`."""
+    def __init__(self, db, key):
+        self.db = db
+        self.key = key
+        self.pages = []
+        self.results = {}
+        self.link_targets = {}
+        self.get_pages_calls = []
+
+    def get_pages(self, namespace, **kwargs):
+        self.get_pages_calls.append((namespace, kwargs))
+        return [page for page in self.pages if page["ns"] == namespace]
+
+    def get_link_targets_state(self, pageid):
+        return self.link_targets.get(pageid, "0")
+
+    def get_result(self, pageid, revid, state, *, max_age=None):
+        return self.results.get((pageid, revid, state))
+
+    def set_processed(self, pageid, revid, *, state=None, text=None, summary=None):
+        self.results[(pageid, revid, state)] = (text, summary or "")
+
+class FakePageSource:
+    def __init__(self, pages):
+        self.pages = {page["pageid"]: page for page in pages}
+        self.requested = []
+
+    def pages_by_ids(self, pageids):
+        self.requested.extend(pageids)
+        for pageid in pageids:
+            yield self.pages[pageid]
+
+    def confirm(self, page):
+        return page
+
+def make_page(pageid, title, text, ns=0):
+    return {
+        "pageid": pageid,
+        "ns": ns,
+        "title": title,
+        "revisions": [{"revid": pageid * 10, "timestamp": "2020-01-01T00:00:00Z", "slots": {"main": {"*": text}}}],
+    }
+
+@pytest.fixture
+def updater(monkeypatch):
+    monkeypatch.setattr(ws.pageupdater, "PageUpdaterSync", FakeSync)
+    updater = PageUpdater(FakeAPI(), db=object(), incremental=True, max_age=datetime.timedelta(days=30))
+    # replace "foo" with "bar" instead of running checkers
+    updater.update_page = lambda title, text: (text.replace("foo", "bar"), "replace foo")
+    return updater
+
+def test_incremental_selection(updater):
+    pages = [make_page(1, "Foo", "foo"), make_page(2, "Foo (Español)", "foo"), make_page(3, "Bar", "bar")]
+    updater.page_source = FakePageSource(pages)
+    updater.sync.pages = [{"pageid": p["pageid"], "ns": p["ns"], "title": p["title"]} for p in pages]
+    updater.langnames = {"English"}
+    updater.namespaces = [0]
+
+    assert [page["title"] for page in updater.generate_pages()] == ["Foo", "Bar"]
+    # only the selected pages are fetched
+    assert updater.page_source.requested == [1, 3]
+    # pages processed with a different state are selected again
+    assert updater.sync.get_pages_calls == [(0, {"filterredir": "all", "max_age": datetime.timedelta(days=30), "first": None,
+                                                 "state": updater.state_version, "link_targets": False})]
+
+def test_processed_after_edit(updater):
+    pages = [make_page(1, "Foo", "foo"), make_page(2, "Conflict", "foo"), make_page(3, "Bar", "bar")]
+    updater.page_source = FakePageSource(pages)
+    updater.generate_pages = lambda: iter(pages)
+    # the second edit fails
+    update_page = updater.update_page
+    updater.update_page = lambda title, text: ("conflict", "summary") if title == "Conflict" else update_page(title, text)
+
+    updater.run()
+    assert updater.api.edits == ["Foo"]
+    state = updater.state_version
+    assert updater.sync.results == {
+        (1, 10, state): ("bar", "replace foo"),
+        # unchanged page
+        (3, 30, state): (None, "replace foo"),
+    }
+
+def test_reuse_result(updater):
+    page = make_page(1, "Foo", "foo")
+    updater.page_source = FakePageSource([page])
+    state = updater.state_version
+    updater.sync.results[(1, 10, state)] = ("baz", "stored summary")
+    updater.update_page = lambda title, text: pytest.fail("the stored result should be reused")
+
+    updater.process_page(page)
+    updater.api.edit_queue.join()
+    updater._check_pending_edits(wait=True)
+    assert updater.api.edits == ["Foo"]
+
+    # processed revisions are skipped
+    updater.sync.results[(1, 10, state)] = (None, "")
+    updater.process_page(page)
+    updater.api.edit_queue.join()
+    assert updater.api.edits == ["Foo"]
+
+def test_reuse_only_incremental(updater):
+    page = make_page(1, "Foo", "foo")
+    updater.page_source = FakePageSource([page])
+    updater.incremental = False
+    updater.sync.results[(1, 10, updater.state_version)] = (None, "")
+
+    # the stored result is ignored and replaced
+    updater.process_page(page)
+    updater.api.edit_queue.join()
+    updater._check_pending_edits(wait=True)
+    assert updater.api.edits == ["Foo"]
+    assert updater.sync.results == {(1, 10, updater.state_version): ("bar", "replace foo")}
+
+def test_link_targets_state(updater):
+    updater.add_checker(mwparserfromhell.nodes.Wikilink, types.SimpleNamespace(memoizable=True, depends_on_link_targets=True, get_state=dict))
+    updater.update_page = lambda title, text: (text, "")
+    page = make_page(1, "Foo", "foo")
+    updater.page_source = FakePageSource([page])
+    updater.sync.link_targets[1] = "1"
+    assert updater.get_page_state(1) == updater.state_version + ":1"
+
+    updater.process_page(page)
+    assert updater.sync.results == {(1, 10, updater.state_version + ":1"): (None, "")}
+
+    # the stored result is not reused after a link target changes
+    updater.sync.link_targets[1] = "2"
+    updater.update_page = lambda title, text: (text.replace("foo", "bar"), "replace foo")
+    updater.process_page(page)
+    updater.api.edit_queue.join()
+    updater._check_pending_edits(wait=True)
+    assert updater.api.edits == ["Foo"]
+
+def test_dry_run(monkeypatch):
+    monkeypatch.setattr(ws.pageupdater, "PageUpdaterSync", FakeSync)
+    updater = PageUpdater(FakeAPI(), dry_run=True, db=object())
+    updater.update_page = lambda title, text: ("bar", "replace foo")
+    page = make_page(1, "Foo", "foo")
+    updater.page_source = FakePageSource([page])
+    updater.process_page(page)
+    # dry runs do not mark the pages as processed
+    assert updater.api.edits == []
+    assert updater.sync.results == {}
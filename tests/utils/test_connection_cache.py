@@ -0,0 +1,92 @@
+#! /usr/bin/env python3
+
+import http.server
+import socket
+import threading
+
+import pytest
+import requests
+
+from ws.utils import TLSAdapter
+from ws.utils.connection_cache import DNSCache, TLSSessionCache, CachingHTTPConnection
+
+class test_DNSCache:
+    def test_positive(self, mocker):
+        getaddrinfo = mocker.patch("socket.getaddrinfo", return_value=["result"])
+        cache = DNSCache()
+        assert cache.getaddrinfo("example.org", 80) == ["result"]
+        assert cache.getaddrinfo("example.org", 80) == ["result"]
+        assert getaddrinfo.call_count == 1
+        assert cache.getaddrinfo("example.org", 443) == ["result"]
+        assert getaddrinfo.call_count == 2
+
+    def test_negative(self, mocker):
+        error = socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        getaddrinfo = mocker.patch("socket.getaddrinfo", side_effect=error)
+        cache = DNSCache()
+        for i in range(2):
+            with pytest.raises(socket.gaierror, match="Name or service not known"):
+                cache.getaddrinfo("example.invalid", 80)
+        assert getaddrinfo.call_count == 1
+
+    def test_temporary_failure(self, mocker):
+        error = socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        getaddrinfo = mocker.patch("socket.getaddrinfo", side_effect=error)
+        cache = DNSCache()
+        for i in range(2):
+            with pytest.raises(socket.gaierror):
+                cache.getaddrinfo("example.org", 80)
+        assert getaddrinfo.call_count == 2
+
+    def test_expiration(self, mocker):
+        getaddrinfo = mocker.patch("socket.getaddrinfo", return_value=["result"])
+        cache = DNSCache(ttl=-1)
+        cache.getaddrinfo("example.org", 80)
+        cache.getaddrinfo("example.org", 80)
+        assert getaddrinfo.call_count == 2
+
+    def test_maxsize(self, mocker):
+        mocker.patch("socket.getaddrinfo", return_value=["result"])
+        cache = DNSCache(maxsize=2)
+        for port in range(5):
+            cache.getaddrinfo("example.org", port)
+        assert len(cache._cache) == 2
+
+def test_TLSSessionCache():
+    cache = TLSSessionCache(maxsize=2)
+    cache.put("a", "session a")
+    cache.put("b", "session b")
+    cache.put(None, "ignored")
+    assert cache.get("a") == "session a"
+    cache.put("c", "session c")
+    assert len(cache) == 2
+    assert cache.get("a") is None
+
+def test_shared_cache_adapter():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        CachingHTTPConnection.dns_cache.clear()
+        for i in range(2):
+            session = requests.Session()
+            session.mount("http://", TLSAdapter(shared_cache=True))
+            response = session.get("http://localhost:{}/".format(port))
+            assert response.text == "ok"
+            session.close()
+        keys = list(CachingHTTPConnection.dns_cache._cache)
+        assert [key[:2] for key in keys] == [("localhost", port)]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+
+import difflib
+import random
+
+import pytest
+
+from ws.utils import FuzzyIndex
+
+def linear_ranks(key, items):
+    ranks = []
+    for item in items:
+        ratio = difflib.SequenceMatcher(a=key, b=item).ratio()
+        ranks.append( (item, ratio) )
+    ranks.sort(key=lambda match: match[1], reverse=True)
+    return ranks
+
+ANCHORS = ["Installation", "Installing_packages", "Configuration", "Configuration_2",
+           "Troubleshooting", "Tips_and_tricks", "See_also", ""]
+
+@pytest.mark.parametrize("key", ["Installation", "installation", "Instalation", "Config", "See_Also", "", "xyz"])
+def test_ranks(key):
+    index = FuzzyIndex(ANCHORS)
+    expected = linear_ranks(key, ANCHORS)
+    assert index.ranks(key) == expected
+    assert index.ranks(key, limit=2) == expected[:2]
+    assert index.ranks(key, min_ratio=0.8) == [rank for rank in expected if rank[1] >= 0.8]
+    assert index.ranks(key, min_ratio=0.5, limit=1) == [rank for rank in expected if rank[1] >= 0.5][:1]
+
+def test_ties_keep_order():
+    index = FuzzyIndex(["ab", "ba", "ab"])
+    assert index.ranks("ab", limit=2) == [("ab", 1.0), ("ab", 1.0)]
+    assert [item for item, _ in index.ranks("a")] == ["ab", "ba", "ab"]
+
+def test_random():
+    rand = random.Random(0)
+    items = ["".join(rand.choice("abcde _") for _ in range(rand.randint(0, 20))) for _ in range(500)]
+    index = FuzzyIndex(items)
+    for item in rand.sample(items, 50):
+        key = item[:rand.randint(0, len(item))] + rand.choice(["", "a", "xy"])
+        expected = linear_ranks(key, items)
+        assert index.ranks(key, limit=5) == expected[:5]
+        assert index.ranks(key, min_ratio=0.8) == [rank for rank in expected if rank[1] >= 0.8]
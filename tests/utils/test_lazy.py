@@ -32,3 +32,48 @@ class test_lazy:
     def test_docstrings(self):
         assert test_lazy.lazyprop.__doc__ == "lazyprop docstring"
         assert test_lazy.normalprop.__doc__ == "normalprop docstring"
+
+    def test_set(self):
+        self.lazyprop = "foo"
+        assert self.lazyprop == "foo"
+        del self.lazyprop
+        assert self.lazyprop == 0
+
+def test_no_leak():
+    import gc
+    import weakref
+
+    class Foo:
+        @LazyProperty
+        def foo(self):
+            return [1, 2, 3]
+
+    f = Foo()
+    assert f.foo == [1, 2, 3]
+    ref = weakref.ref(f)
+    del f
+    gc.collect()
+    assert ref() is None
+
+def test_single_flight():
+    import threading
+    import time
+
+    class Foo:
+        calls = 0
+
+        @LazyProperty
+        def foo(self):
+            Foo.calls += 1
+            time.sleep(0.05)
+            return Foo.calls
+
+    f = Foo()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(f.foo)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Foo.calls == 1
+    assert results == [1] * 8
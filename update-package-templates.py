@@ -14,6 +14,7 @@ from ws.client import API, APIError
 from ws.utils import LazyProperty
 from ws.interactive import edit_interactive, require_login, InteractiveQuit
 from ws.autopage import AutoPage
+from ws.page_source import APIPageSource
 from ws.ArchWiki.lang import detect_language, format_title
 from ws.parser_helpers.wikicode import get_parent_wikicode, ensure_flagged_by_template, ensure_unflagged_by_template
 from ws.parser_helpers.title import canonicalize
@@ -167,6 +168,8 @@ class PkgUpdater:
 
     def __init__(self, api, aurpkgs_url, tmpdir, report_dir, report_page, interactive=False):
         self.api = api
+        # source of the page contents (see ws.page_source)
+        self.page_source = APIPageSource(api)
         self.finder = PkgFinder(aurpkgs_url, tmpdir)
         self.report_dir = report_dir
         self.report_page = report_page
@@ -375,8 +378,7 @@ class PkgUpdater:
 
         namespaces = [0, 4, 14, 3000]
         for ns in namespaces:
-            for page in self.api.generator(generator="allpages", gaplimit="100", gapfilterredir="nonredirects", gapnamespace=ns,
-                                           prop="revisions", rvprop="content|timestamp", rvslots="main"):
+            for page in self.page_source.allpages(ns, filterredir="nonredirects"):
                 title = page["title"]
                 if title in self.blacklist_pages:
                     logger.info("skipping blacklisted page [[{}]]".format(title))
@@ -3,6 +3,7 @@
 import mwparserfromhell
 
 from ws.checkers import ExtlinkReplacements
+from ws.checkers.smarter_encryption_list import SmarterEncryptionList
 from ws.pageupdater import PageUpdater
 
 class Updater(PageUpdater):
@@ -22,8 +23,8 @@ if __name__ == "__main__":
 
     argparser = ws.config.getArgParser(description="Parse all pages on the wiki and replace URLs")
     Updater.set_argparser(argparser)
-    # checkers don't have their own set_argparser method at the moment,
-    # they just reuse API's and PageUpdater's options
+    SmarterEncryptionList.set_argparser(argparser)
+    # checkers reuse also API's and PageUpdater's options
 
     args = ws.config.parse_args(argparser)
 
@@ -32,7 +33,8 @@ if __name__ == "__main__":
 
     # create updater and add checkers
     updater = Updater.from_argparser(args)
-    checker = ExtlinkReplacements(updater.api, None, timeout=args.connection_timeout, max_retries=args.connection_max_retries)
+    checker = ExtlinkReplacements(updater.api, None, timeout=args.connection_timeout, max_retries=args.connection_max_retries,
+                                  **SmarterEncryptionList.kwargs_from_argparser(args))
     updater.add_checker(mwparserfromhell.nodes.ExternalLink, checker)
 
     try:
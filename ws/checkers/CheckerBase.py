@@ -1,6 +1,7 @@
 #! /usr/bin/env python3
 
 import contextlib
+import hashlib
 import threading
 
 import mwparserfromhell
@@ -13,15 +14,84 @@ from ws.parser_helpers.wikicode import get_parent_wikicode, get_adjacent_node
 __all__ = ["get_edit_summary_tracker", "localize_flag", "CheckerBase"]
 
 
+def _get_node_region(wikicode, node):
+    """
+    Get the region of the parent wikicode which may be changed when handling
+    ``node``: the node itself, the previous node and the following nodes up to
+    the first node which is not whitespace (e.g. a flag template). The region
+    is delimited by the nodes just outside of it (``None`` means the start or
+    end of the parent), so that nodes inserted into the region (or removed
+    from it) do not affect the boundaries.
+
+    :returns: a ``(parent, left, right)`` tuple
+    :raises ValueError: if ``node`` is not a descendant of ``wikicode``
+    """
+    parent = get_parent_wikicode(wikicode, node)
+    nodes = parent.nodes
+    for index, n in enumerate(nodes):
+        if n is node:
+            break
+    else:
+        raise ValueError("node {!r} not found in the parent wikicode".format(node))
+    last = index + 1
+    while last < len(nodes) and str(nodes[last]).isspace():
+        last += 1
+    left = nodes[index - 2] if index >= 2 else None
+    right = nodes[last + 1] if last + 1 < len(nodes) else None
+    return parent, left, right
+
+def _get_region_text(parent, left, right):
+    """
+    Get the text of the region of ``parent`` between the ``left`` and
+    ``right`` nodes (exclusive), or ``None`` if the boundary nodes are not
+    present in the parent anymore.
+    """
+    nodes = parent.nodes
+    start = 0
+    end = len(nodes)
+    if left is not None:
+        start = next((i + 1 for i, n in enumerate(nodes) if n is left), None)
+        if start is None:
+            return None
+    if right is not None:
+        end = next((i for i in range(start, len(nodes)) if nodes[i] is right), None)
+        if end is None:
+            return None
+    return "".join(str(nodes[i]) for i in range(start, end))
+
 # WARNING: using the context manager is not thread-safe
-def get_edit_summary_tracker(wikicode, summary_parts):
+def get_edit_summary_tracker(wikicode, summary_parts, node=None):
+    """
+    Get a context manager factory which appends the given summary to
+    ``summary_parts`` if the wikicode was changed inside the context.
+
+    :param wikicode: a :py:class:`mwparserfromhell.wikicode.Wikicode` object
+    :param list summary_parts: list of edit summary parts
+    :param node:
+        a :py:class:`mwparserfromhell.nodes.Node` object being handled by the
+        checker. When specified, only the text of the node and its
+        neighbourhood in the parent wikicode is compared instead of the whole
+        ``wikicode``, so the changes must be limited to them (as done by the
+        functions in :py:mod:`ws.parser_helpers.wikicode`).
+    """
+    def get_snapshot():
+        if node is not None:
+            try:
+                region = _get_node_region(wikicode, node)
+                return lambda: _get_region_text(*region)
+            except ValueError:
+                # the node is not in the wikicode, compare the whole text
+                pass
+        return lambda: str(wikicode)
+
     @contextlib.contextmanager
     def checker(summary):
-        text = str(wikicode)
+        snapshot = get_snapshot()
+        before = snapshot()
         try:
             yield
         finally:
-            if text != str(wikicode):
+            if before != snapshot():
                 summary_parts.append(summary)
     return checker
 
@@ -48,6 +118,22 @@ def localize_flag(wikicode, node, template_name):
 
 
 class CheckerBase:
+    # whether the results of handle_node depend only on the content of the
+    # page and on the state returned by get_state (if True, PageUpdater may
+    # reuse the results for unchanged revisions)
+    memoizable = False
+
+    # whether the results of handle_node depend also on the pages linked from
+    # the page (their existence, redirects and sections), which are not
+    # covered by get_state (PageUpdater then tracks the link targets of each
+    # page separately)
+    depends_on_link_targets = False
+
+    # version of the checker, should be increased when a change in the code
+    # may produce different results for the same input (every class in the
+    # hierarchy may define its own version)
+    version = 1
+
     def __init__(self, api, db, *, interactive=False, **kwargs):
         self.api = api
         self.db = db
@@ -61,9 +147,31 @@ class CheckerBase:
 
     @LazyProperty
     def _alltemplates(self):
-        result = self.api.generator(generator="allpages", gapnamespace=10, gaplimit="max", gapfilterredir="nonredirects")
+        params = {
+            "generator": "allpages",
+            "gapnamespace": 10,
+            "gaplimit": "max",
+            "gapfilterredir": "nonredirects",
+        }
+        # use the local mirror if available
+        if self.db is not None:
+            result = self.db.query(params)
+        else:
+            result = self.api.generator(params)
         return {page["title"].split(":", maxsplit=1)[1] for page in result}
 
+    def get_state(self):
+        """
+        Get a dictionary describing the external state which the results of
+        :py:meth:`handle_node` depend on. The values must be JSON-serializable.
+        Subclasses should extend the dictionary returned by the parent class.
+        """
+        versions = {klass.__qualname__: klass.__dict__["version"]
+                    for klass in type(self).__mro__ if "version" in klass.__dict__}
+        # the localized flags depend on the existing templates
+        templates = hashlib.sha1("\n".join(sorted(self._alltemplates)).encode("utf-8")).hexdigest()
+        return {"versions": versions, "templates": templates}
+
     def get_localized_template(self, template, language="English"):
         assert(canonicalize(template) in self._alltemplates)
         localized = lang.format_title(template, language)
@@ -3,7 +3,6 @@
 import re
 import logging
 import os.path
-import json
 import enum
 
 import mwparserfromhell
@@ -12,9 +11,10 @@ from hstspreload import in_hsts_preload
 
 from .CheckerBase import get_edit_summary_tracker
 from .ExtlinkStatusChecker import ExtlinkStatusChecker
-from .https_everywhere.rules import Ruleset
+from .https_everywhere.index import load_index
 from .https_everywhere.rule_trie import RuleTrie
 from .smarter_encryption_list import SmarterEncryptionList
+from .host_rule_index import HostRuleIndex
 from ws.utils import LazyProperty
 from ws.parser_helpers.wikicode import ensure_unflagged_by_template
 from ws.parser_helpers.encodings import querydecode
@@ -199,6 +199,8 @@ class ExtlinkReplacements(ExtlinkStatusChecker):
     ]
 
     https_everywhere_rules_path = os.path.join(os.path.dirname(__file__), "https_everywhere/default.rulesets.json")
+    # precompiled index of the rules, (re)built automatically from the JSON file
+    https_everywhere_index_path = os.path.join(os.path.dirname(__file__), "https_everywhere/default.rulesets.idx")
     https_everywhere_rules = None
 
     def __init__(self, api, db, **kwargs):
@@ -209,30 +211,39 @@ class ExtlinkReplacements(ExtlinkStatusChecker):
             compiled = re.compile(url_regex)
             _extlink_replacements.append( (compiled, text_cond, text_cond_flags, replacement) )
         self.extlink_replacements = _extlink_replacements
+        self.extlink_replacements_index = HostRuleIndex([r[0] for r in self.extlink_replacements])
 
+        # compile the replacement templates ahead of time
+        env = jinja2.Environment(trim_blocks=True, lstrip_blocks=True)
         _url_replacements = []
         for edit_summary, url_regex, url_replacement in self.url_replacements:
             compiled = re.compile(url_regex)
-            _url_replacements.append( (edit_summary, compiled, url_replacement) )
+            template = env.from_string(url_replacement)
+            _url_replacements.append( (edit_summary, compiled, template) )
         self.url_replacements = _url_replacements
+        self.url_replacements_index = HostRuleIndex([r[1] for r in self.url_replacements])
 
-        # initialize HTTPS Everywhere rules as a klass (static) attribute, because it is rather expensive
+        # initialize HTTPS Everywhere rules as a klass (static) attribute
         # (note that the class is initialized many times in tests)
         if ExtlinkReplacements.https_everywhere_rules is None:
+            # empty rules are set first, so if the rules file is missing, only
+            # the first initialization fails
             ExtlinkReplacements.https_everywhere_rules = RuleTrie()
-            data = json.load(open(self.https_everywhere_rules_path, "r"))
-            for r in data:
-                ruleset = Ruleset(r, "<unknown file>")
-                if ruleset.defaultOff:
-                    logging.debug("Skipping HTTPS Everywhere rule '{}', reason: {}".format(ruleset.name, ruleset.defaultOff))
-                    continue
-                self.https_everywhere_rules.addRuleset(ruleset)
-
-        # pass timeout and max_retries
+            ExtlinkReplacements.https_everywhere_rules = load_index(self.https_everywhere_rules_path, self.https_everywhere_index_path)
+
+        # pass timeout, max_retries and the snapshot_* options
         self.selist = SmarterEncryptionList(**kwargs)
         assert "wiki.archlinux.org" in self.selist
         assert "foo" not in self.selist
 
+    def get_state(self):
+        state = super().get_state()
+        # the empty RuleTrie is used only when the index could not be loaded
+        state["https_everywhere_rules"] = getattr(self.https_everywhere_rules, "digest", None)
+        if self.selist.snapshot is not None:
+            state["smarter_encryption_snapshot"] = self.selist.snapshot.digest
+        return state
+
     @LazyProperty
     def wikisite_extlink_regex(self):
         general = self.api.site.general
@@ -287,7 +298,12 @@ class ExtlinkReplacements(ExtlinkStatusChecker):
     def check_extlink_replacements(self, wikicode, extlink, url):
         repl = None
 
-        for url_regex, text_cond, text_cond_flags, replacement in self.extlink_replacements:
+        # decode unicode characters in the URL before matching
+        decoded_url = querydecode(url.url)
+
+        # try only the rules which may apply to the host of the URL
+        for i in self.extlink_replacements_index.candidates(decoded_url):
+            url_regex, text_cond, text_cond_flags, replacement = self.extlink_replacements[i]
             assert text_cond is not None
             # regex requires extlink.title
             if isinstance(text_cond, str) and extlink.title is None:
@@ -298,8 +314,7 @@ class ExtlinkReplacements(ExtlinkStatusChecker):
             # check ExtlinkBehaviour.NO_BRACKETS
             if text_cond == self.ExtlinkBehaviour.NO_BRACKETS and extlink.brackets:
                 continue
-            # decode unicode characters in the URL before matching
-            match = url_regex.fullmatch(querydecode(url.url))
+            match = url_regex.fullmatch(decoded_url)
             if match:
                 if extlink.title is None:
                     repl = replacement.format(*match.groups())
@@ -325,66 +340,105 @@ class ExtlinkReplacements(ExtlinkStatusChecker):
             # TODO: make sure that the link is unflagged after replacement
             return True
 
-    def check_url_replacements(self, wikicode, extlink, url):
-        for edit_summary, url_regex, url_replacement in self.url_replacements:
+    def get_url_replacement(self, url):
+        """
+        Get the replacement of a URL by the first matching rule in
+        :py:attr:`url_replacements`.
+
+        :param url: a :py:class:`urllib3.util.url.Url` object
+        :returns: a tuple ``(edit_summary, new_url)``, or ``None`` if no rule
+                  matches
+        """
+        # try only the rules which may apply to the host of the URL
+        for i in self.url_replacements_index.candidates(url.url):
+            edit_summary, url_regex, template = self.url_replacements[i]
             match = url_regex.fullmatch(url.url)
             if match:
-                env = jinja2.Environment(trim_blocks=True, lstrip_blocks=True)
-                template = env.from_string(url_replacement)
-                new_url = template.render(m=match.groups(), **match.groupdict())
-
-                # check if the resulting URL is valid
-                # (irc:// and ircs:// cannot be validated - requests throws requests.exceptions.InvalidSchema)
-                if not new_url.startswith("irc://") and not new_url.startswith("ircs://") and not self.check_url(new_url, allow_redirects=True):
-                    logger.warning("URL not replaced: {}".format(url))
-                    return False
-
-                # post-processing for gitlab.archlinux.org links
-                #   - gitlab uses "blob" for files and "tree" for directories
-                #   - if "blob" or "tree" is used incorrectly, gitlab gives 302 to the correct one
-                #     (so we should replace new_url with what gitlab gives us)
-                #   - the "/-/" disambiguator (which is added by gitlab's redirects) is ugly and should be removed thereafter
-                #   - gitlab gives 302 to the master branch instead of 404 for non-existent files/directories
-                if new_url.startswith("https://gitlab.archlinux.org"):
-                    # use same query as ExtlinkStatusChecker.check_url
-                    response = self.session.get(new_url, headers=self.headers, timeout=self.timeout, stream=True, allow_redirects=True)
-                    # explicitly close the responses to release the connection back to the pool
-                    # (this is important, especially when we use pool_block=True)
-                    response.close()
-                    if len(response.history) > 0:
-                        if response.url.endswith("/master"):
-                            # this is gitlab's "404" in most cases
-                            logger.warning("URL not replaced (Gitlab redirected to a master branch): {}".format(url))
-                            return False
-                        new_url = response.url
-                    new_url = new_url.replace("/-/", "/", 1)
-
-                # some patterns match even the target
-                # (e.g. links on addons.mozilla.org which already do not have a language code)
-                if url.url == new_url:
-                    return False
+                return edit_summary, template.render(m=match.groups(), **match.groupdict())
+        return None
 
-                extlink.url = new_url
-                ensure_unflagged_by_template(wikicode, extlink, "Dead link", match_only_prefix=True)
-                return edit_summary
-        return False
+    def get_https_url(self, url, text=None):
+        """
+        Get the HTTPS variant of a ``http://`` URL if the host is known to
+        support HTTPS.
 
-    def check_http_to_https(self, wikicode, extlink, url):
+        :param url: a :py:class:`urllib3.util.url.Url` object
+        :param str text: the URL as written on the page (default: ``url.url``)
+        :returns: the new URL, or ``None``
+        """
         if url.scheme != "http":
-            return
+            return None
+        if text is None:
+            text = url.url
+        host = url.netloc.lower()
 
         # check HSTS preload list first
         # (Chromium's static list of sites supporting HTTP Strict Transport Security)
-        if in_hsts_preload(url.netloc.lower()):
-            new_url = str(extlink.url).replace("http://", "https://", 1)
+        if in_hsts_preload(host):
+            return text.replace("http://", "https://", 1)
         # check HTTPS Everywhere rules next
-        elif self.https_everywhere_rules.matchingRulesets(url.netloc.lower()):
-            match = self.https_everywhere_rules.transformUrl(url)
-            new_url = match.url
+        elif self.https_everywhere_rules.matchingRulesets(host):
+            return self.https_everywhere_rules.transformUrl(url).url
         # check the Smarter Encryption list
-        elif url.netloc.lower() in self.selist:
-            new_url = str(extlink.url).replace("http://", "https://", 1)
-        else:
+        elif host in self.selist:
+            return text.replace("http://", "https://", 1)
+        return None
+
+    def get_checked_urls(self, urls):
+        # the page pass checks the replaced URLs instead of the original ones
+        for url in urls:
+            replacement = self.get_url_replacement(url)
+            if replacement is not None:
+                new_url = replacement[1]
+                if not new_url.startswith("irc://") and not new_url.startswith("ircs://"):
+                    yield new_url
+            new_url = self.get_https_url(url)
+            if new_url is not None:
+                yield new_url
+
+    def check_url_replacements(self, wikicode, extlink, url):
+        replacement = self.get_url_replacement(url)
+        if replacement is None:
+            return False
+        edit_summary, new_url = replacement
+        # check if the resulting URL is valid
+        # (irc:// and ircs:// cannot be validated - requests throws requests.exceptions.InvalidSchema)
+        if not new_url.startswith("irc://") and not new_url.startswith("ircs://") and not self.check_url(new_url, allow_redirects=True):
+            logger.warning("URL not replaced: {}".format(url))
+            return False
+
+        # post-processing for gitlab.archlinux.org links
+        #   - gitlab uses "blob" for files and "tree" for directories
+        #   - if "blob" or "tree" is used incorrectly, gitlab gives 302 to the correct one
+        #     (so we should replace new_url with what gitlab gives us)
+        #   - the "/-/" disambiguator (which is added by gitlab's redirects) is ugly and should be removed thereafter
+        #   - gitlab gives 302 to the master branch instead of 404 for non-existent files/directories
+        if new_url.startswith("https://gitlab.archlinux.org"):
+            # use same query as ExtlinkStatusChecker.check_url
+            response = self.session.get(new_url, headers=self.headers, timeout=self.timeout, stream=True, allow_redirects=True)
+            # explicitly close the responses to release the connection back to the pool
+            # (this is important, especially when we use pool_block=True)
+            response.close()
+            if len(response.history) > 0:
+                if response.url.endswith("/master"):
+                    # this is gitlab's "404" in most cases
+                    logger.warning("URL not replaced (Gitlab redirected to a master branch): {}".format(url))
+                    return False
+                new_url = response.url
+            new_url = new_url.replace("/-/", "/", 1)
+
+        # some patterns match even the target
+        # (e.g. links on addons.mozilla.org which already do not have a language code)
+        if url.url == new_url:
+            return False
+
+        extlink.url = new_url
+        ensure_unflagged_by_template(wikicode, extlink, "Dead link", match_only_prefix=True)
+        return edit_summary
+
+    def check_http_to_https(self, wikicode, extlink, url):
+        new_url = self.get_https_url(url, str(extlink.url))
+        if new_url is None:
             return
 
         # there is no reason to update broken links
@@ -399,7 +453,7 @@ class ExtlinkReplacements(ExtlinkStatusChecker):
         if url is None:
             return
 
-        summary = get_edit_summary_tracker(wikicode, summary_parts)
+        summary = get_edit_summary_tracker(wikicode, summary_parts, extlink)
 
         # FIXME: this can break templates because of "=", e.g. https://wiki.archlinux.org/index.php?title=Systemd_(Espa%C3%B1ol)/User_(Espa%C3%B1ol)&diff=629483&oldid=617318
         # see https://wiki.archlinux.org/index.php/User:Lahwaacz/Notes#Double_brackets_escape_template-breaking_characters
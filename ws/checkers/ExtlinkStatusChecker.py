@@ -3,7 +3,6 @@
 # TODO:
 # - cache the status results in the database, limit the number of checks per URL per day (and week/month too)
 # - GRRR: When you get 404, unless you have Javascript enabled, in which case the code loaded on the 404 page might execute a redirection to a different address. Example: https://nzbget.net/Performance_tips
-# - handle 429 (Too Many Requests), often returned by archive.is
 
 import logging
 import datetime
@@ -13,9 +12,11 @@ import ssl
 import mwparserfromhell
 import requests
 import requests.packages.urllib3 as urllib3
+import sqlalchemy as sa
 from ws.utils import TLSAdapter
 
 from .CheckerBase import get_edit_summary_tracker, localize_flag, CheckerBase
+from .domain_scheduler import DomainScheduler
 import ws.ArchWiki.lang as lang
 from ws.parser_helpers.wikicode import get_parent_wikicode, ensure_flagged_by_template, ensure_unflagged_by_template
 from ws.diff import diff_highlighted
@@ -26,6 +27,12 @@ logger = logging.getLogger(__name__)
 
 
 class ExtlinkStatusChecker(CheckerBase):
+    # the status of the links changes over time and cannot be versioned
+    memoizable = False
+
+    # number of retries for requests throttled by the server (status 429 or 503)
+    throttle_retries = 2
+
     def __init__(self, api, db, *, timeout=60, max_retries=3,
                  num_pools=100, max_connections_per_host=10,
                  **kwargs):
@@ -44,11 +51,17 @@ class ExtlinkStatusChecker(CheckerBase):
             "pool_connections": num_pools,
             "pool_maxsize": max_connections_per_host,
             "pool_block": True,
+            # share the DNS cache and TLS sessions with other sessions
+            "shared_cache": True,
         }
         adapter = TLSAdapter(**adapter_params)
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
 
+        # per-host concurrency limits and backoff (the pool for each host is
+        # large enough for the scheduler's limit, so pool_block never blocks)
+        self.scheduler = DomainScheduler(max_connections_per_host=max_connections_per_host)
+
         self.headers = {
             # fake user agent to bypass servers responding differently or not at all to non-browser user agents
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.116 Safari/537.36",
@@ -65,10 +78,22 @@ class ExtlinkStatusChecker(CheckerBase):
         self.deadlink_params = [now.year, now.month, now.day]
         self.deadlink_params = ["{:02d}".format(i) for i in self.deadlink_params]
 
-    def prepare_url(self, wikicode, extlink, *, allow_schemes=None):
-        if allow_schemes is None:
-            allow_schemes = ["http", "https"]
+    @staticmethod
+    def set_argparser(argparser):
+        """
+        Add arguments for the bulk checking of external links to an instance
+        of :py:class:`argparse.ArgumentParser`.
+
+        See also the :py:mod:`ws.config` module.
 
+        :param argparser: an instance of :py:class:`argparse.ArgumentParser`
+        """
+        group = argparser.add_argument_group(title="External links")
+        group.add_argument("--check-all-extlinks", action="store_true",
+                help="check the status of all external links recorded in the wiki-scripts database concurrently "
+                     "before processing the pages (requires the database, ignored in the incremental mode)")
+
+    def prepare_url(self, wikicode, extlink, *, allow_schemes=None):
         # make a copy of the URL object (the skip_style_flags parameter is False,
         # so we will also properly parse URLs terminated by a wiki markup)
         url = mwparserfromhell.parse(str(extlink.url))
@@ -112,10 +137,25 @@ class ExtlinkStatusChecker(CheckerBase):
         for entity in url.ifilter_html_entities(recursive=True):
             url.replace(entity, entity.normalize())
 
+        return self.parse_url(str(url), allow_schemes=allow_schemes)
+
+    @staticmethod
+    def parse_url(url, *, allow_schemes=None):
+        """
+        Parse a URL string and check if it is suitable for checking.
+
+        :param str url: the URL to parse
+        :param list allow_schemes: allowed URL schemes (default: http and https)
+        :returns: a :py:class:`urllib3.util.url.Url` object, or ``None`` if the
+                  URL is invalid or should be skipped
+        """
+        if allow_schemes is None:
+            allow_schemes = ["http", "https"]
+
         try:
             # try to parse the URL - fails e.g. if port is not a number
             # reference: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#urllib3.util.parse_url
-            url = urllib3.util.url.parse_url(str(url))
+            url = urllib3.util.url.parse_url(url)
         except urllib3.exceptions.LocationParseError:
             logger.debug("skipped invalid URL: {}".format(url))
             return
@@ -175,13 +215,21 @@ class ExtlinkStatusChecker(CheckerBase):
             return None
 
         try:
-            # We need to use GET requests instead of HEAD, because many servers just return 404
-            # (or do not reply at all) to HEAD requests. Instead, we skip the downloading of the
-            # response body content using the ``stream=True`` parameter.
-            response = self.session.get(url, headers=self.headers, timeout=self.timeout, stream=True, allow_redirects=allow_redirects)
-            # explicitly close the responses to release the connection back to the pool
-            # (this is important, especially when we use pool_block=True)
-            response.close()
+            with self.scheduler.slot(url.host):
+                for attempt in range(self.throttle_retries + 1):
+                    # wait if the host asked us to slow down
+                    self.scheduler.wait(url.host)
+                    # We need to use GET requests instead of HEAD, because many servers just return 404
+                    # (or do not reply at all) to HEAD requests. Instead, we skip the downloading of the
+                    # response body content using the ``stream=True`` parameter.
+                    response = self.session.get(url, headers=self.headers, timeout=self.timeout, stream=True, allow_redirects=allow_redirects)
+                    # explicitly close the responses to release the connection back to the pool
+                    # (this is important, especially when we use pool_block=True)
+                    response.close()
+                    if response.status_code not in {429, 503}:
+                        self.scheduler.reset(url.host)
+                        break
+                    self.scheduler.throttle(url.host, response.headers.get("Retry-After"))
         # SSLError inherits from ConnectionError so it has to be checked first
         except requests.exceptions.SSLError as e:
             logger.error("SSLError ({}) for URL {}".format(e, url))
@@ -207,6 +255,10 @@ class ExtlinkStatusChecker(CheckerBase):
         if response.status_code >= 200 and response.status_code < 300:
             self.cache_valid_urls.add(url)
             return True
+        elif response.status_code == 429:
+            logger.warning("status code 429 (Too Many Requests) for URL {}".format(url))
+            self.cache_indeterminate_urls.add(url)
+            return None
         elif response.status_code >= 400 and response.status_code < 500:
             # detect cloudflare captcha https://github.com/pielco11/fav-up/issues/13
             if "CF-Chl-Bypass" in response.headers:
@@ -227,6 +279,84 @@ class ExtlinkStatusChecker(CheckerBase):
             self.cache_indeterminate_urls.add(url)
             return None
 
+    def check_urls(self, urls, *, max_workers=32):
+        """
+        Check the status of many URLs concurrently and store the results in the
+        URL status caches, so that subsequent calls to :py:meth:`check_url` for
+        the same URLs do not need any network I/O.
+
+        Each distinct URL (after dropping the fragment) is checked at most once
+        and URLs which are already cached are skipped. Note that connections to
+        the same host are limited by the ``max_connections_per_host``
+        parameter of the checker and the URLs are dispatched by the
+        :py:class:`DomainScheduler <ws.checkers.domain_scheduler.DomainScheduler>`,
+        so that slow or throttling hosts do not hold up the checks of other
+        hosts.
+
+        :param urls: an iterable of URL strings or
+                     :py:class:`urllib3.util.url.Url` objects
+        :param int max_workers: number of threads for the HTTP requests
+        :returns: the number of URLs which were checked
+        """
+        pending = set()
+        for url in urls:
+            if not isinstance(url, urllib3.util.url.Url):
+                url = urllib3.util.url.parse_url(url)
+            if url.fragment:
+                url = urllib3.util.url.parse_url(url.url.rsplit("#", maxsplit=1)[0])
+            if url in self.cache_valid_urls or url in self.cache_invalid_urls or url in self.cache_indeterminate_urls:
+                continue
+            pending.add(url)
+
+        logger.info("Checking the status of {} distinct URLs...".format(len(pending)))
+        # sort the URLs to get a deterministic order of the requests for each host
+        self.scheduler.map(self.check_url, sorted(pending, key=str), host=lambda url: url.host, max_workers=max_workers)
+        logger.info("URL status check finished: {} valid, {} invalid, {} indeterminate".format(
+                    len(self.cache_valid_urls), len(self.cache_invalid_urls), len(self.cache_indeterminate_urls)))
+        return len(pending)
+
+    def get_checked_urls(self, urls):
+        """
+        Get the URLs which are checked when the pages containing the given
+        external links are processed. Subclasses which check different URLs
+        than those on the pages (e.g. the rewritten URLs in
+        :py:class:`ExtlinkReplacements <ws.checkers.ExtlinkReplacements.ExtlinkReplacements>`)
+        override this method.
+
+        :param urls: a list of :py:class:`urllib3.util.url.Url` objects
+        :returns: an iterable of URL strings or :py:class:`urllib3.util.url.Url`
+                  objects
+        """
+        return urls
+
+    def check_all_extlinks(self, *, max_workers=32):
+        """
+        Check the status of the URLs which are checked for the external links
+        on the wiki (see :py:meth:`get_checked_urls`), as recorded in the
+        ``externallinks`` table of the database. This should be called after
+        :py:meth:`ws.db.database.Database.update_parser_cache` and before the
+        pages are processed, so that the status checks during the processing
+        of the pages can use the cached results.
+
+        Note that the URLs in the ``externallinks`` table are normalized by the
+        parser cache (e.g. percent-decoded), so a URL that is written
+        differently on a page may still be checked later by
+        :py:meth:`check_url`.
+
+        :param int max_workers: number of threads for the HTTP requests
+        :returns: the number of URLs which were checked
+        """
+        if self.db is None:
+            raise ValueError("checking all external links requires a database")
+        el = self.db.externallinks
+        query = sa.select([el.c.el_to]).distinct()
+        urls = []
+        for row in self.db.engine.execute(query):
+            url = self.parse_url(row.el_to)
+            if url is not None:
+                urls.append(url)
+        return self.check_urls(self.get_checked_urls(urls), max_workers=max_workers)
+
     def check_extlink_status(self, wikicode, extlink, src_title):
         with self.lock_wikicode:
             url = self.prepare_url(wikicode, extlink)
@@ -269,6 +399,6 @@ class ExtlinkStatusChecker(CheckerBase):
 
     def handle_node(self, src_title, wikicode, node, summary_parts):
         if isinstance(node, mwparserfromhell.nodes.ExternalLink):
-            summary = get_edit_summary_tracker(wikicode, summary_parts)
+            summary = get_edit_summary_tracker(wikicode, summary_parts, node)
             with summary("update status of external links"):
                 self.check_extlink_status(wikicode, node, src_title)
@@ -19,6 +19,10 @@ class ManTemplateChecker(ExtlinkStatusChecker):
     def __init__(self, api, db, **kwargs):
         super().__init__(api, db, **kwargs)
 
+    def get_checked_urls(self, urls):
+        # the {{man}} templates are rendered as links to man.archlinux.org
+        return [url for url in urls if url.url.startswith(self.man_url_prefix)]
+
     def update_man_template(self, wikicode, template, src_title):
         if template.name.lower() != "man":
             return
@@ -81,6 +85,6 @@ class ManTemplateChecker(ExtlinkStatusChecker):
 
     def handle_node(self, src_title, wikicode, node, summary_parts):
         if isinstance(node, mwparserfromhell.nodes.Template):
-            summary = get_edit_summary_tracker(wikicode, summary_parts)
+            summary = get_edit_summary_tracker(wikicode, summary_parts, node)
             with summary("updated man page links"):
                 self.update_man_template(wikicode, node, src_title)
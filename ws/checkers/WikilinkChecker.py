@@ -4,18 +4,22 @@
 #   detect self-redirects (definitely interactive only)
 #   warn if the link leads to an archived page
 
-import difflib
+import hashlib
+import json
 import logging
 import re
 
 import mwparserfromhell
 
 from .CheckerBase import get_edit_summary_tracker, CheckerBase
+from .section_index import SectionIndex
 import ws.ArchWiki.lang as lang
 from ws.parser_helpers.encodings import dotencode
 from ws.parser_helpers.title import canonicalize, TitleError, InvalidTitleCharError
-from ws.parser_helpers.wikicode import get_anchors, ensure_flagged_by_template, ensure_unflagged_by_template, is_flagged_by_template
+from ws.utils import FuzzyIndex
+from ws.parser_helpers.wikicode import ensure_flagged_by_template, ensure_unflagged_by_template, is_flagged_by_template
 from ws.db.selects.interwiki_redirects import get_interwiki_redirects
+from ws.db.selects.displaytitles import get_displaytitles
 
 __all__ = ["WikilinkChecker"]
 
@@ -34,14 +38,7 @@ def get_ranks(key, iterable):
         order, where ``item`` is an item from ``iterable`` and ``ratio`` its
         similarity ratio
     """
-    sm = difflib.SequenceMatcher(a=key)
-    ranks = []
-    for item in iterable:
-        sm.set_seq2(item)
-        ratio = sm.ratio()
-        ranks.append( (item, ratio) )
-    ranks.sort(key=lambda match: match[1], reverse=True)
-    return ranks
+    return FuzzyIndex(iterable).ranks(key)
 
 
 class WikilinkChecker(CheckerBase):
@@ -55,22 +52,35 @@ class WikilinkChecker(CheckerBase):
     # article status templates, lowercase
     skip_templates = ["accuracy", "archive", "bad translation", "expansion", "laptop style", "merge", "move", "out of date", "remove", "stub", "style", "translateme"]
 
+    memoizable = True
+    depends_on_link_targets = True
+
     def __init__(self, api, db, **kwargs):
         super().__init__(api, db, **kwargs)
 
-        # mapping of canonical titles to displaytitles
-        self.displaytitles = {}
-        for ns in self.api.site.namespaces.keys():
-            if ns < 0:
-                continue
-            for page in self.api.generator(generator="allpages", gaplimit="max", gapnamespace=ns, prop="info", inprop="displaytitle"):
-                self.displaytitles[page["title"]] = page["displaytitle"]
+        # mapping of canonical titles to displaytitles (the page_props table
+        # is synchronized by the grabbers, so there is no need to query the API)
+        self.displaytitles = get_displaytitles(self.db)
 
         # mapping of interwiki redirects (the API does not have a query for this)
         self.interwiki_redirects = get_interwiki_redirects(self.db)
 
         self.void_update_cache = set()
 
+        # section headings and anchors of the link targets, shared by all pages
+        self.section_index = SectionIndex(self.db)
+        # wikicode of the page whose link targets were prefetched last
+        self._prefetched_wikicode = None
+
+    def get_state(self):
+        state = super().get_state()
+        # the titles, redirects and sections of the link targets are tracked
+        # for each page (see depends_on_link_targets), only the interwiki
+        # redirects are global
+        data = json.dumps(sorted(self.interwiki_redirects.items()))
+        state["interwiki_redirects"] = hashlib.sha1(data.encode("utf-8")).hexdigest()
+        return state
+
     def check_trivial(self, wikilink, title):
         """
         Perform trivial simplification, replace `[[Foo|foo]]` with `[[foo]]`.
@@ -243,25 +253,16 @@ class WikilinkChecker(CheckerBase):
                     wikilink.title = first_letter + wikilink.title[1:]
             title.parse(wikilink.title)
 
-    def check_anchor(self, src_title, wikilink, title):
+    def get_anchor_target(self, src_title, title):
         """
+        Determine the page whose sections should be checked for the section
+        fragment of the given title.
+
         :returns:
-            ``True`` if the anchor is correct or has been corrected, ``False``
-            if it is definitely broken, ``None`` if it can't be checked at all
-            or the check was indecisive and a warning/error has been printed to
-            the log.
+            ``None`` if the target can't be checked, otherwise a tuple
+            ``(target_title, anchor_on_redirect_to_section)``, where the second
+            item indicates that the link points to a redirect to a section
         """
-        # TODO: beware of https://phabricator.wikimedia.org/T20431
-
-        # we can't check interwiki links
-        if title.iwprefix:
-            return None
-
-        # empty sectionname is always valid
-        if title.sectionname == "":
-            return None
-
-        # determine target page
         _target_title = title.make_absolute(src_title)
 
         # we can't check interwiki links
@@ -278,18 +279,60 @@ class WikilinkChecker(CheckerBase):
             _target_title = self.api.Title(self.api.redirects.resolve(_target_title.fullpagename))
             # check double-anchor redirects
             if _target_title.sectionname:
-                logger.warning("warning: section fragment placed on a redirect to possibly different section: {}".format(wikilink))
                 anchor_on_redirect_to_section = True
 
+        return _target_title, anchor_on_redirect_to_section
+
+    def prefetch_sections(self, src_title, wikicode):
+        """
+        Load the sections of all pages targeted by wikilinks with a section
+        fragment in the wikicode into the :py:attr:`section_index` at once.
+        """
+        targets = set()
+        for wikilink in wikicode.ifilter_wikilinks(recursive=True):
+            try:
+                title = self.api.Title(wikilink.title)
+            except TitleError:
+                continue
+            if title.iwprefix or not title.sectionname:
+                continue
+            target = self.get_anchor_target(src_title, title)
+            if target is not None:
+                targets.add(target[0].fullpagename)
+        self.section_index.prefetch(targets)
+
+    def check_anchor(self, src_title, wikilink, title):
+        """
+        :returns:
+            ``True`` if the anchor is correct or has been corrected, ``False``
+            if it is definitely broken, ``None`` if it can't be checked at all
+            or the check was indecisive and a warning/error has been printed to
+            the log.
+        """
+        # TODO: beware of https://phabricator.wikimedia.org/T20431
+
+        # we can't check interwiki links
+        if title.iwprefix:
+            return None
+
+        # empty sectionname is always valid
+        if title.sectionname == "":
+            return None
+
+        # determine target page
+        target = self.get_anchor_target(src_title, title)
+        if target is None:
+            return None
+        _target_title, anchor_on_redirect_to_section = target
+        if anchor_on_redirect_to_section is True:
+            logger.warning("warning: section fragment placed on a redirect to possibly different section: {}".format(wikilink))
+
         # get lists of section headings and anchors
-        _result = self.db.query(titles=_target_title.fullpagename, prop="sections", secprop={"title", "anchor"})
-        _result = list(_result)
-        assert len(_result) == 1
-        if "missing" in _result[0]:
+        sections = self.section_index.get(_target_title.fullpagename)
+        if sections is None:
             logger.error("could not find content of page: '{}' (wikilink {})".format(_target_title.fullpagename, wikilink))
             return None
-        headings = [section["title"] for section in _result[0].get("sections", [])]
-        anchors = [section["anchor"] for section in _result[0].get("sections", [])]
+        headings, anchors = sections
 
         if len(headings) == 0:
             logger.warning("wikilink with broken section fragment: {}".format(wikilink))
@@ -311,8 +354,9 @@ class WikilinkChecker(CheckerBase):
         # otherwise try case-insensitive match to detect differences in capitalization
         elif self.interactive is True:
             # FIXME: first detect section renaming properly, fuzzy search should be only the last resort to deal with typos and such
-            ranks = get_ranks(anchor, anchors)
-            ranks = list(filter(lambda rank: rank[1] >= 0.8, ranks))
+            # only the two best matches are needed to decide
+            fuzzy_index = self.section_index.get_fuzzy_index(_target_title.fullpagename)
+            ranks = fuzzy_index.ranks(anchor, min_ratio=0.8, limit=2)
             if len(ranks) == 1 or ( len(ranks) >= 2 and ranks[0][1] - ranks[1][1] > 0.2 ):
                 logger.debug("wikilink {}: replacing anchor '{}' with '{}' on similarity level {}".format(wikilink, anchor, ranks[0][0], ranks[0][1]))
                 anchor = ranks[0][0]
@@ -336,7 +380,7 @@ class WikilinkChecker(CheckerBase):
         else:
             suffix_sep = " "
         # get_anchors makes sure to strip markup and handle duplicate section names
-        new_fragment = get_anchors(headings, pretty=True, suffix_sep=suffix_sep)[anchors.index(anchor)]
+        new_fragment = self.section_index.get_pretty_anchors(_target_title.fullpagename, suffix_sep)[anchors.index(anchor)]
 
         # Avoid beautification if there is alternative text and the link
         # actually works.
@@ -403,7 +447,7 @@ class WikilinkChecker(CheckerBase):
         if title.iwprefix in self.api.site.interlanguagemap.keys():
             return
 
-        summary = get_edit_summary_tracker(wikicode, summary_parts)
+        summary = get_edit_summary_tracker(wikicode, summary_parts, wikilink)
 
         with summary("simplification and beautification of wikilinks"):
             # beautify if urldecoded
@@ -462,6 +506,11 @@ class WikilinkChecker(CheckerBase):
         if isinstance(parent, mwparserfromhell.nodes.template.Template) and parent.name.lower() in self.skip_templates:
             return
 
+        # load the sections of all link targets on the page in one query
+        if wikicode is not self._prefetched_wikicode:
+            self._prefetched_wikicode = wikicode
+            self.prefetch_sections(src_title, wikicode)
+
         if isinstance(node, mwparserfromhell.nodes.Wikilink):
             try:
                 self.update_wikilink(wikicode, node, src_title, summary_parts)
@@ -0,0 +1,239 @@
+#! /usr/bin/env python3
+
+import collections
+import contextlib
+import datetime
+import email.utils
+import logging
+import threading
+import time
+
+__all__ = ["DomainScheduler", "parse_retry_after"]
+
+logger = logging.getLogger(__name__)
+
+def parse_retry_after(value):
+    """
+    Parse the value of the ``Retry-After`` HTTP header.
+
+    :param str value: the header value, either a number of seconds or a HTTP date
+    :returns: the number of seconds to wait, or ``None`` if the value is invalid
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (date - now).total_seconds())
+
+class _HostState:
+    __slots__ = ("active", "not_before", "backoff")
+
+    def __init__(self):
+        # number of requests in progress
+        self.active = 0
+        # time.monotonic() value before which no new request may be started
+        self.not_before = 0
+        # current delay for the exponential backoff (0 when the host is not throttling)
+        self.backoff = 0
+
+class DomainScheduler:
+    """
+    Politeness scheduler for HTTP requests to many different hosts.
+
+    Each host has its own concurrency cap and its own backoff state, which is
+    set when the host responds with ``429 Too Many Requests`` or
+    ``503 Service Unavailable`` (see :py:meth:`throttle`). A slow or throttling
+    host therefore blocks only the requests to the same host.
+
+    Individual requests should be wrapped in the :py:meth:`slot` context
+    manager. To process many items concurrently, use :py:meth:`map`, which
+    keeps a separate queue for each host and dispatches the items to the
+    worker threads only from the hosts which are currently available, so that
+    the workers are not blocked waiting for a busy host.
+
+    :param int max_connections_per_host: maximum number of concurrent requests
+                                         to the same host
+    :param float initial_backoff: the first backoff delay (in seconds) used when
+                                  the host does not send a ``Retry-After`` header
+    :param float max_backoff: upper bound for all backoff delays (in seconds)
+    """
+
+    def __init__(self, *, max_connections_per_host=4, initial_backoff=1, max_backoff=120):
+        self.max_connections_per_host = max_connections_per_host
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._hosts = collections.defaultdict(_HostState)
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    @staticmethod
+    def _key(host):
+        return host.lower() if host else ""
+
+    def _is_available(self, state, now):
+        return state.active < self.max_connections_per_host and now >= state.not_before
+
+    def acquire(self, host):
+        """
+        Block until a request to the given host may be started and reserve a
+        connection slot for it.
+        """
+        with self._cond:
+            state = self._hosts[self._key(host)]
+            while True:
+                now = time.monotonic()
+                if self._is_available(state, now):
+                    break
+                if state.active < self.max_connections_per_host:
+                    self._cond.wait(state.not_before - now)
+                else:
+                    self._cond.wait()
+            state.active += 1
+
+    def release(self, host):
+        """
+        Release a connection slot reserved by :py:meth:`acquire`.
+        """
+        with self._cond:
+            self._hosts[self._key(host)].active -= 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, host):
+        """
+        Context manager for a request to the given host. It is reentrant in
+        the sense that the nested slots for the same host in the same thread
+        (e.g. when the item processed by :py:meth:`map` makes a request) do not
+        reserve another connection.
+        """
+        held = self._local.__dict__.setdefault("hosts", set())
+        key = self._key(host)
+        if key in held:
+            yield
+            return
+        self.acquire(key)
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            self.release(key)
+
+    def wait(self, host):
+        """
+        Sleep until the backoff period of the given host has passed. This is
+        used before retrying a throttled request while holding the slot.
+        """
+        with self._cond:
+            state = self._hosts[self._key(host)]
+            while True:
+                remaining = state.not_before - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+    def throttle(self, host, retry_after=None):
+        """
+        Record that the host asked us to slow down. No new requests to the host
+        will be started until the delay has passed.
+
+        :param str host: the host name
+        :param retry_after: value of the ``Retry-After`` header (or ``None``)
+        :returns: the delay in seconds
+        """
+        with self._cond:
+            state = self._hosts[self._key(host)]
+            delay = parse_retry_after(retry_after)
+            if delay is None:
+                if state.backoff:
+                    delay = state.backoff * 2
+                else:
+                    delay = self.initial_backoff
+            delay = min(delay, self.max_backoff)
+            state.backoff = delay
+            state.not_before = max(state.not_before, time.monotonic() + delay)
+            self._cond.notify_all()
+        logger.warning("host {} is throttling requests, waiting {:.1f} seconds".format(host, delay))
+        return delay
+
+    def reset(self, host):
+        """
+        Reset the backoff state of the host after a successful request.
+        """
+        with self._cond:
+            self._hosts[self._key(host)].backoff = 0
+
+    def map(self, func, items, *, host, max_workers=32):
+        """
+        Call ``func`` for all items concurrently, respecting the limits of
+        each host. The items of each host are processed in the given order,
+        but the order across hosts is not deterministic.
+
+        :param func: the function to call with each item
+        :param items: an iterable of items
+        :param host: a function returning the host name for an item
+        :param int max_workers: number of worker threads
+        :returns: a list of results in the order of ``items``
+        """
+        queues = collections.OrderedDict()
+        results = []
+        for index, item in enumerate(items):
+            results.append(None)
+            queues.setdefault(self._key(host(item)), collections.deque()).append((index, item))
+        errors = []
+
+        def next_item():
+            # round-robin over the hosts which can accept a new request
+            with self._cond:
+                while queues:
+                    now = time.monotonic()
+                    timeout = None
+                    for key in list(queues):
+                        state = self._hosts[key]
+                        if self._is_available(state, now):
+                            queue = queues.pop(key)
+                            index, item = queue.popleft()
+                            if queue:
+                                # move the host to the end
+                                queues[key] = queue
+                            state.active += 1
+                            return key, index, item
+                        if state.active < self.max_connections_per_host:
+                            remaining = state.not_before - now
+                            timeout = remaining if timeout is None else min(timeout, remaining)
+                    self._cond.wait(timeout)
+            return None
+
+        def worker():
+            held = self._local.__dict__.setdefault("hosts", set())
+            while not errors:
+                task = next_item()
+                if task is None:
+                    return
+                key, index, item = task
+                held.add(key)
+                try:
+                    results[index] = func(item)
+                except BaseException as e:
+                    errors.append(e)
+                finally:
+                    held.discard(key)
+                    self.release(key)
+
+        threads = [threading.Thread(target=worker, name="DomainScheduler-{}".format(i), daemon=True)
+                   for i in range(min(max_workers, len(results)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+        return results
@@ -0,0 +1,191 @@
+#! /usr/bin/env python3
+
+import re
+from functools import lru_cache
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+__all__ = ["HostRuleIndex", "split_host_pattern"]
+
+
+def _tokenize(pattern):
+    """
+    Split a regular expression into top-level tokens. Yields tuples
+    ``(value, start, end)``, where ``value`` is the literal character for plain
+    or escaped punctuation characters and ``None`` for everything else (groups,
+    character classes, escape sequences like ``\\d``). Only tokens at the
+    paren depth 0 are yielded.
+    """
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        start = i
+        if c == "\\":
+            i += 2
+            escaped = pattern[start + 1:i]
+            value = escaped if escaped and not escaped.isalnum() else None
+        elif c == "[":
+            i += 1
+            # "]" right after "[" or "[^" is a literal
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            value = None
+        else:
+            i += 1
+            if c == "(":
+                depth += 1
+                continue
+            elif c == ")":
+                depth -= 1
+                continue
+            value = c
+        if depth == 0:
+            yield value, start, i
+
+
+_SAFE_CATEGORIES = {sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_WORD, sre_parse.CATEGORY_SPACE}
+
+def _can_match_slash(items):
+    """
+    Check if a parsed regular expression can consume the "/" character.
+    Unknown constructs (including lookarounds) are conservatively treated as
+    if they could.
+    """
+    slash = ord("/")
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            if av == slash:
+                return True
+        elif op is sre_parse.AT:
+            continue
+        elif op is sre_parse.IN:
+            for set_op, set_av in av:
+                if set_op is sre_parse.LITERAL:
+                    if set_av == slash:
+                        return True
+                elif set_op is sre_parse.RANGE:
+                    if set_av[0] <= slash <= set_av[1]:
+                        return True
+                elif set_op is sre_parse.CATEGORY:
+                    if set_av not in _SAFE_CATEGORIES:
+                        return True
+                else:
+                    # NEGATE and everything else
+                    return True
+        elif op is sre_parse.BRANCH:
+            if any(_can_match_slash(branch) for branch in av[1]):
+                return True
+        elif op is sre_parse.SUBPATTERN:
+            if _can_match_slash(av[-1]):
+                return True
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if _can_match_slash(av[2]):
+                return True
+        else:
+            return True
+    return False
+
+def split_host_pattern(pattern):
+    """
+    Extract the part of a URL regex which matches the scheme and the host of
+    the URL, i.e. everything before the first "/" following "://".
+
+    The extraction succeeds only if it is safe to assume that whenever the
+    whole pattern matches (using :py:func:`re.fullmatch`) a URL string, the
+    returned host pattern matches (using :py:func:`re.fullmatch`) the prefix
+    of the URL up to the first "/" following the first "://".
+
+    :param str pattern: the regular expression
+    :returns: the host pattern as a string, or ``None``
+    """
+    tokens = list(_tokenize(pattern))
+    values = [t[0] for t in tokens]
+    # top-level alternation would break the split
+    if "|" in values:
+        return None
+    for i in range(len(tokens) - 2):
+        if values[i:i + 3] == [":", "/", "/"]:
+            sep_start = tokens[i + 1][1]
+            sep_end = tokens[i + 2][2]
+            break
+    else:
+        return None
+    for j in range(i + 3, len(tokens)):
+        if values[j] == "/":
+            slash_start, slash_end = tokens[j][1], tokens[j][2]
+            break
+    else:
+        return None
+    # the slash must be mandatory
+    if pattern[slash_end:slash_end + 1] in {"?", "*", "+", "{"}:
+        return None
+
+    scheme = pattern[:sep_start]
+    host = pattern[sep_end:slash_start]
+    try:
+        if _can_match_slash(sre_parse.parse(scheme)) or _can_match_slash(sre_parse.parse(host)):
+            return None
+        re.compile(pattern[:slash_start])
+    except re.error:
+        return None
+    return pattern[:slash_start]
+
+def _get_prefix(url):
+    """
+    Return the prefix of the URL up to the first "/" following the first "://".
+    """
+    sep = url.find("://")
+    if sep < 0:
+        return url
+    slash = url.find("/", sep + 3)
+    if slash < 0:
+        return url
+    return url[:slash]
+
+
+class HostRuleIndex:
+    """
+    Index of URL-matching rules, which allows to select only the rules that
+    may apply to the scheme and host of a given URL.
+
+    For each rule, the part of the regular expression matching the scheme and
+    the host is extracted (see :py:func:`split_host_pattern`). The candidate
+    rules for each distinct URL prefix (scheme and host) are computed once and
+    cached. Rules whose host part could not be extracted are always
+    candidates.
+
+    :param patterns: list of regular expressions (strings or compiled) for the
+                     rules in order
+    :param int cache_size: maximum number of cached URL prefixes
+    """
+
+    def __init__(self, patterns, cache_size=4096):
+        self._host_regexes = []
+        for pattern in patterns:
+            if isinstance(pattern, re.Pattern):
+                pattern = pattern.pattern
+            host_pattern = split_host_pattern(pattern)
+            if host_pattern is not None:
+                self._host_regexes.append(re.compile(host_pattern))
+            else:
+                self._host_regexes.append(None)
+        self._candidates_cached = lru_cache(maxsize=cache_size)(self._candidates)
+
+    def _candidates(self, prefix):
+        return tuple(i for i, regex in enumerate(self._host_regexes)
+                     if regex is None or regex.fullmatch(prefix))
+
+    def candidates(self, url):
+        """
+        :param str url: the URL string to be matched by the rules
+        :returns: a tuple of indexes of the rules which may match the URL
+        """
+        return self._candidates_cached(_get_prefix(url))
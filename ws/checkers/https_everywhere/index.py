@@ -0,0 +1,245 @@
+#! /usr/bin/env python3
+
+"""
+Precompiled index of HTTPS Everywhere rulesets
+
+Parsing the whole ``default.rulesets.json`` file and building the
+:py:class:`RuleTrie <.rule_trie.RuleTrie>` takes several seconds and a lot of
+memory. The index is a compact binary file built once from the JSON file,
+which is memory-mapped at runtime. Only the rulesets which are actually needed
+for the looked up domains are decoded (and their regular expressions are
+compiled only on the first match).
+
+File format (all integers are unsigned 32-bit little-endian):
+
+- header: magic bytes, number of targets, number of rulesets
+- target table: sorted by the target string, each entry is
+  ``(key offset, key length, ids offset, ids count)`` where the ids point to
+  the ruleset table
+- ruleset table: each entry is ``(offset, length)`` of the JSON-encoded ruleset
+- data: target strings (UTF-8), arrays of ruleset ids, JSON-encoded rulesets
+
+The index can be built manually with::
+
+    python -m ws.checkers.https_everywhere.index default.rulesets.json default.rulesets.idx
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from ws.utils import LazyProperty
+
+from .rules import Ruleset
+from .rule_trie import RulesetMatcher
+
+__all__ = ["build_index", "RulesetIndex", "load_index"]
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"WSHTEIX1"
+HEADER = struct.Struct("<8sII")
+TARGET_ENTRY = struct.Struct("<IIII")
+RULESET_ENTRY = struct.Struct("<II")
+RULESET_ID = struct.Struct("<I")
+
+# keys of the JSON ruleset elements needed at runtime
+_RULESET_KEYS = ["name", "platform", "target", "rule", "exclusion"]
+
+
+def build_index(rulesets, path):
+    """Build the index file from the JSON rulesets.
+
+    @param rulesets: list of JSON dicts corresponding to the <ruleset> elements
+    @param path: path to the output file (written atomically)
+    @returns: number of rulesets in the index
+    """
+    targets = {}
+    encoded_rulesets = []
+    for element in rulesets:
+        if element.get("default_off"):
+            logger.debug("Skipping HTTPS Everywhere rule '{}', reason: {}".format(element.get("name"), element["default_off"]))
+            continue
+        ruleset_id = len(encoded_rulesets)
+        data = {key: element[key] for key in _RULESET_KEYS if key in element}
+        encoded_rulesets.append(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        for target in element.get("target", []):
+            ids = targets.setdefault(target.encode("utf-8"), [])
+            if ruleset_id not in ids:
+                ids.append(ruleset_id)
+
+    keys = sorted(targets)
+    data_offset = HEADER.size + len(keys) * TARGET_ENTRY.size + len(encoded_rulesets) * RULESET_ENTRY.size
+    target_table = bytearray()
+    ruleset_table = bytearray()
+    data = bytearray()
+
+    for key in keys:
+        key_offset = data_offset + len(data)
+        data += key
+        ids = targets[key]
+        ids_offset = data_offset + len(data)
+        for ruleset_id in ids:
+            data += RULESET_ID.pack(ruleset_id)
+        target_table += TARGET_ENTRY.pack(key_offset, len(key), ids_offset, len(ids))
+
+    for encoded in encoded_rulesets:
+        ruleset_table += RULESET_ENTRY.pack(data_offset + len(data), len(encoded))
+        data += encoded
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".idx")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(keys), len(encoded_rulesets)))
+            f.write(target_table)
+            f.write(ruleset_table)
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(encoded_rulesets)
+
+
+def _candidate_targets(fqdn):
+    """Generate all target patterns which may match the given FQDN, following
+    the semantics of the RuleTrie: each "*" label matches exactly one label,
+    except a leading "*" of a target with at least 3 labels, which matches any
+    number of labels.
+    """
+    labels = fqdn.split(".")
+    yield fqdn
+    for i in range(len(labels)):
+        yield ".".join(labels[:i] + ["*"] + labels[i + 1:])
+    for i in range(1, len(labels) - 1):
+        yield "*." + ".".join(labels[i:])
+
+
+class RulesetIndex(RulesetMatcher):
+    """Memory-mapped index of rulesets, see the module docstring for details.
+    """
+
+    def __init__(self, path, cache_size=4096):
+        super().__init__(cache_size)
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._num_targets, self._num_rulesets = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError("file '{}' is not a valid HTTPS Everywhere index".format(path))
+        self._rulesets_offset = HEADER.size + self._num_targets * TARGET_ENTRY.size
+        # cache of decoded rulesets
+        self._rulesets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._num_rulesets
+
+    @LazyProperty
+    def digest(self):
+        """SHA-1 digest of the index file, which identifies the rulesets."""
+        return hashlib.sha1(self._mmap).hexdigest()
+
+    def close(self):
+        self._mmap.close()
+
+    def _find_target(self, target):
+        """Binary search in the target table, returns list of ruleset ids."""
+        key = target.encode("utf-8")
+        lo = 0
+        hi = self._num_targets
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_offset, key_length, ids_offset, ids_count = TARGET_ENTRY.unpack_from(self._mmap, HEADER.size + mid * TARGET_ENTRY.size)
+            mid_key = self._mmap[key_offset:key_offset + key_length]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return [RULESET_ID.unpack_from(self._mmap, ids_offset + i * RULESET_ID.size)[0] for i in range(ids_count)]
+        return []
+
+    def getRuleset(self, ruleset_id):
+        """Return the rules.Ruleset instance with given id (decoded on first use).
+        """
+        with self._lock:
+            ruleset = self._rulesets.get(ruleset_id)
+            if ruleset is None:
+                offset, length = RULESET_ENTRY.unpack_from(self._mmap, self._rulesets_offset + ruleset_id * RULESET_ENTRY.size)
+                element = json.loads(self._mmap[offset:offset + length].decode("utf-8"))
+                ruleset = self._rulesets[ruleset_id] = Ruleset(element, "<index>")
+            return ruleset
+
+    def _matchingRulesets(self, fqdn):
+        # the rulesets are returned in the order of the source file
+        ids = set()
+        for target in set(_candidate_targets(fqdn)):
+            ids.update(self._find_target(target))
+        return tuple(self.getRuleset(ruleset_id) for ruleset_id in sorted(ids))
+
+
+def _is_current(index_path, json_path):
+    """Check if the index file exists and is not older than the JSON file.
+    """
+    try:
+        return os.path.getmtime(index_path) >= os.path.getmtime(json_path)
+    except FileNotFoundError:
+        # the JSON file may be missing when only the index is distributed
+        return os.path.isfile(index_path) and not os.path.isfile(json_path)
+
+def _fallback_index_path(json_path):
+    """Return the path of the index file used when the index cannot be
+    written next to the JSON file. The path is stable for the JSON file, so
+    the fallback index is reused by the following runs.
+    """
+    digest = hashlib.sha1(os.path.abspath(json_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), "ws-https-everywhere-{}.idx".format(digest))
+
+def load_index(json_path, index_path):
+    """Load the index for given JSON file, (re)building it if it does not
+    exist or is older than the JSON file.
+
+    If the index cannot be written to ``index_path`` (e.g. when the package
+    is installed read-only), it is written into the temporary directory and
+    reused from there by the following calls.
+
+    @param json_path: path to the default.rulesets.json file
+    @param index_path: path to the index file
+    @returns: RulesetIndex instance
+    @raises FileNotFoundError: if neither the index nor the JSON file exists
+    """
+    if not _is_current(index_path, json_path):
+        fallback_path = _fallback_index_path(json_path)
+        if _is_current(fallback_path, json_path) and os.path.isfile(json_path):
+            index_path = fallback_path
+        else:
+            logger.info("Building HTTPS Everywhere index {} from {}".format(index_path, json_path))
+            with open(json_path, "r") as f:
+                rulesets = json.load(f)
+            try:
+                build_index(rulesets, index_path)
+            except OSError as e:
+                logger.warning("Failed to write HTTPS Everywhere index to {}: {}".format(index_path, e))
+                logger.info("Building HTTPS Everywhere index {} from {}".format(fallback_path, json_path))
+                build_index(rulesets, fallback_path)
+                index_path = fallback_path
+    return RulesetIndex(index_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argparser = argparse.ArgumentParser(description="Build the index of HTTPS Everywhere rulesets")
+    argparser.add_argument("json_path", help="path to the default.rulesets.json file")
+    argparser.add_argument("index_path", help="path to the output index file")
+    args = argparser.parse_args()
+
+    with open(args.json_path, "r") as f:
+        count = build_index(json.load(f), args.index_path)
+    print("Written {} rulesets into {}".format(count, args.index_path))
@@ -38,9 +38,11 @@ exactly.
 Assuming complexity of lookup in dict is O(1), lookup of FQDN consisting
 of N parts is O(N) if there are no * in the tree. Otherwise in theory
 it could be O(2^N), but the HTTPS Everywhere rules require only one *, so we
-still get O(N).
+still get O(N). The lookup is iterative and its results are cached per FQDN.
 """
 
+from functools import lru_cache
+
 
 class RuleTransformError(ValueError):
     """Thrown when invalid scheme like file:/// is attempted to be
@@ -70,47 +72,46 @@ class DomainNode(object):
         """Find matching rulesets for domain in this subtree.
         @param domain: domain to search for in this node's subtrees;
         empty string matches this node. Must not contain wildcards.
-        @return: set of applicate rulesets
+        @return: list of applicable rulesets (without duplicates)
         """
-        # we are the leaf that matched
-        if domain == "":
-            return self.rulesets
-
-        applicableRules = set()
-
-        # Wildcard node can expand to any number of subdomains per
-        # HTE rulesets, if it's at least 3-rd level domain.
-        # E.g. *.fbcdn.net target will also cover profile.ak.fbcdn.net
-        #
-        # See:
-        #  https://gitweb.torproject.org/https-everywhere.git/commitdiff/6ca405d010062d2b2cb91b2024d4ebf7d405dee7
-        #  https://www.eff.org/https-everywhere/rulesets (see also footnote)
-        #
-        # Currently there should be no targets with wildcard in the
-        # middle in HTE rules, like bla.*.something.tld
-        if self.depth >= 3 and self.subDomain == "*":
-            applicableRules.update(self.rulesets)
-
-        parts = domain.rsplit(".", 1)
-
-        if len(parts) == 1:  # direct match on children
-            childDomain = domain
-            subLevelDomain = ""
-        else:
-            subLevelDomain, childDomain = parts
-
-        wildcardChild = self.children.get("*")
-        ruleChild = self.children.get(childDomain)
-
-        # we need to consider direct matches as well as wildcard matches so
-        # that match for things like "bla.google.*" work
-        if ruleChild:
-            applicableRules.update(ruleChild.matchingRulesets(subLevelDomain))
-        if wildcardChild:
-            applicableRules.update(
-                wildcardChild.matchingRulesets(subLevelDomain))
-
-        return applicableRules
+        labels = domain.split(".") if domain else []
+        # rulesets are hashed by name, a dict is used as an ordered set
+        applicableRules = {}
+
+        # iterative depth-first search, the stack contains pairs of nodes and
+        # the number of domain labels which remain to be matched below them
+        stack = [(self, len(labels))]
+        while stack:
+            node, remaining = stack.pop()
+
+            # we are the leaf that matched
+            if remaining == 0:
+                applicableRules.update(dict.fromkeys(node.rulesets))
+                continue
+
+            # Wildcard node can expand to any number of subdomains per
+            # HTE rulesets, if it's at least 3-rd level domain.
+            # E.g. *.fbcdn.net target will also cover profile.ak.fbcdn.net
+            #
+            # See:
+            #  https://gitweb.torproject.org/https-everywhere.git/commitdiff/6ca405d010062d2b2cb91b2024d4ebf7d405dee7
+            #  https://www.eff.org/https-everywhere/rulesets (see also footnote)
+            #
+            # Currently there should be no targets with wildcard in the
+            # middle in HTE rules, like bla.*.something.tld
+            if node.depth >= 3 and node.subDomain == "*":
+                applicableRules.update(dict.fromkeys(node.rulesets))
+
+            # we need to consider direct matches as well as wildcard matches so
+            # that match for things like "bla.google.*" work
+            wildcardChild = node.children.get("*")
+            if wildcardChild:
+                stack.append((wildcardChild, remaining - 1))
+            ruleChild = node.children.get(labels[remaining - 1])
+            if ruleChild:
+                stack.append((ruleChild, remaining - 1))
+
+        return list(applicableRules)
 
     def prettyPrint(self, offset=0):
         """Pretty print for debugging"""
@@ -141,42 +142,29 @@ class RuleMatch(object):
         self.ruleset = ruleset
 
 
-class RuleTrie(object):
-    """Suffix trie for rulesets."""
+class RulesetMatcher(object):
+    """Base class for objects resolving the rulesets applicable for FQDN.
+    Subclasses must implement the _matchingRulesets method, the results are
+    cached per FQDN in a LRU cache.
 
-    def __init__(self):
-        self.root = DomainNode("", [], 0)
+    @param cache_size: maximum number of FQDNs in the cache
+    """
+
+    def __init__(self, cache_size=4096):
+        self._matchingRulesetsCached = lru_cache(maxsize=cache_size)(self._matchingRulesets)
+
+    def _matchingRulesets(self, fqdn):
+        raise NotImplementedError
 
     def matchingRulesets(self, fqdn):
         """Return rulesets applicable for FQDN. Wildcards not allowed.
+        @returns: tuple of rules.Ruleset instances
         """
-        return self.root.matchingRulesets(fqdn)
-
-    def addRuleset(self, ruleset):
-        """Creates structure for given ruleset in the trie.
-        @param ruleset: rules.Ruleset instance
-        """
-        for target in ruleset.targets:
-            node = self.root
-            # enumerate parts so we know when we hit leaf where
-            # rulesets are to be stored
-            parts = list(enumerate(target.split(".")))
-            depth = 0
-
-            for (idx, part) in reversed(parts):
-                depth += 1
-                partNode = node.children.get(part)
-
-                # create node if not existing already and stuff
-                # the rulesets in leaf
-                if not partNode:
-                    partNode = DomainNode(part, [], depth)
-                    node.addChild(partNode)
-                if idx == 0:
-                    # there should be only one ruleset, but...
-                    partNode.rulesets.append(ruleset)
+        return self._matchingRulesetsCached(fqdn)
 
-                node = partNode
+    def clearCache(self):
+        """Clear the cache of matchingRulesets results."""
+        self._matchingRulesetsCached.cache_clear()
 
     def acceptedScheme(self, url):
         """Returns True iff the scheme in URL is accepted (http, https).
@@ -207,5 +195,45 @@ class RuleTrie(object):
                 return RuleMatch(newUrl, ruleset)
         return RuleMatch(str(url), None)
 
+
+class RuleTrie(RulesetMatcher):
+    """Suffix trie for rulesets."""
+
+    def __init__(self, cache_size=4096):
+        super().__init__(cache_size)
+        self.root = DomainNode("", [], 0)
+
+    def _matchingRulesets(self, fqdn):
+        return tuple(self.root.matchingRulesets(fqdn))
+
+    def addRuleset(self, ruleset):
+        """Creates structure for given ruleset in the trie.
+        @param ruleset: rules.Ruleset instance
+        """
+        for target in ruleset.targets:
+            node = self.root
+            # enumerate parts so we know when we hit leaf where
+            # rulesets are to be stored
+            parts = list(enumerate(target.split(".")))
+            depth = 0
+
+            for (idx, part) in reversed(parts):
+                depth += 1
+                partNode = node.children.get(part)
+
+                # create node if not existing already and stuff
+                # the rulesets in leaf
+                if not partNode:
+                    partNode = DomainNode(part, [], depth)
+                    node.addChild(partNode)
+                if idx == 0:
+                    # there should be only one ruleset, but...
+                    partNode.rulesets.append(ruleset)
+
+                node = partNode
+
+        # cached results may be affected by the new ruleset
+        self.clearCache()
+
     def prettyPrint(self):
         self.root.prettyPrint()
@@ -3,8 +3,14 @@ from urllib.parse import urlparse
 
 #import regex
 import re as regex  # TODO: check that we don't use any additional functionality of `regex`
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
 import socket
 
+from ws.utils import LazyProperty
+
 
 class Rule(object):
     """Represents one from->to rule element."""
@@ -18,10 +24,14 @@ class Rule(object):
         # The \g<1> named capture is used instead of \1 because it would
         # break for rules whose domain begins with a digit.
         self.toPattern = regex.sub(r"\$(\d)", r"\\g<\1>", ruleElem["to"])
-        self.fromRe = regex.compile(self.fromPattern)
         # Test cases that this rule applies to.
         self.tests = []
 
+    @LazyProperty
+    def fromRe(self):
+        """Compiled regex of the rule (compiled on first use)."""
+        return regex.compile(self.fromPattern)
+
     def apply(self, url):
         """Apply rule to URL string and return result."""
         return self.fromRe.sub(self.toPattern, url)
@@ -33,7 +43,7 @@ class Rule(object):
         return self.fromRe.search(url) is not None
 
     def __repr__(self):
-        return "<Rule from '{}' to '{}'>".format(self.fromRe.pattern, self.toPattern)
+        return "<Rule from '{}' to '{}'>".format(self.fromPattern, self.toPattern)
 
     def __str__(self):
         return self.__repr__()
@@ -57,10 +67,14 @@ class Exclusion(object):
         @param pattern: <exclusion> element from lxml tree
         """
         self.exclusionPattern = pattern
-        self.exclusionRe = regex.compile(self.exclusionPattern)
         # Test cases that this exclusion applies to.
         self.tests = []
 
+    @LazyProperty
+    def exclusionRe(self):
+        """Compiled regex of the exclusion (compiled on first use)."""
+        return regex.compile(self.exclusionPattern)
+
     def matches(self, url):
         """Returns true iff this exclusion rule matches given url
         @param url: URL to check as string
@@ -151,8 +165,62 @@ class Ruleset(object):
 
         self._addTests()
 
+    # patterns containing backreferences cannot be combined, because the
+    # group numbers change in the combined regex
+    _backrefRe = regex.compile(r"\\[1-9]|\(\?P=")
+
+    @staticmethod
+    def _isAnchored(pattern):
+        """Returns True iff the pattern can match only at the beginning of the
+        string (i.e. it starts with "^" which is not inside a top-level branch).
+        """
+        try:
+            parsed = sre_parse.parse(pattern)
+        except regex.error:
+            return False
+        return len(parsed.data) > 0 and parsed.data[0] == (sre_parse.AT, sre_parse.AT_BEGINNING)
+
+    @LazyProperty
+    def _combinedExclusionRe(self):
+        """Single regex matching iff any of the exclusions matches, or None if
+        the exclusion patterns cannot be combined.
+        """
+        patterns = [exclusion.exclusionPattern for exclusion in self.exclusions]
+        if len(patterns) < 2 or any(self._backrefRe.search(p) for p in patterns):
+            return None
+        try:
+            return regex.compile("|".join("(?:{})".format(p) for p in patterns))
+        except regex.error:
+            return None
+
+    @LazyProperty
+    def _combinedRuleRe(self):
+        """Single alternation regex of all rules, where the alternative for
+        the i-th rule is wrapped in a group named "_r<i>". It is used to find
+        the first rule that matches the URL with one regex search. None is
+        returned if the rules cannot be combined.
+
+        All patterns must be anchored at the beginning (which is the case for
+        virtually all HTTPS Everywhere rules), otherwise the leftmost match
+        found by the alternation might not belong to the first matching rule.
+        """
+        patterns = [rule.fromPattern for rule in self.rules]
+        if len(patterns) < 2:
+            return None
+        for p in patterns:
+            if self._backrefRe.search(p) or not self._isAnchored(p):
+                return None
+        try:
+            return regex.compile("|".join("(?P<_r{}>{})".format(i, p) for i, p in enumerate(patterns)))
+        except regex.error:
+            # e.g. duplicate group names or global flags in the middle
+            return None
+
     def excludes(self, url):
         """Returns True iff one of exclusion patterns matches the url."""
+        combined = self._combinedExclusionRe
+        if combined is not None:
+            return combined.search(url) is not None
         return any((exclusion.matches(url) for exclusion in self.exclusions))
 
     def apply(self, url):
@@ -164,7 +232,17 @@ class Ruleset(object):
         if self.excludes(url):
             return url
 
-        for rule in self.rules:
+        rules = self.rules
+        combined = self._combinedRuleRe
+        if combined is not None:
+            match = combined.match(url)
+            if match is None:
+                return url  # nothing rewritten
+            # dispatch to the first matching rule; the following rules are
+            # still tried in case the rewrite does not change the URL
+            rules = rules[int(match.lastgroup[2:]):]
+
+        for rule in rules:
             try:
                 newUrl = rule.apply(url)
                 if url != newUrl:
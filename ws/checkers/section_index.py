@@ -0,0 +1,115 @@
+#! /usr/bin/env python3
+
+import threading
+
+from ws.utils import iter_chunks, FuzzyIndex
+from ws.parser_helpers.wikicode import get_anchors
+
+__all__ = ["SectionIndex"]
+
+
+class SectionIndex:
+    """
+    In-memory index of section headings and anchors of the pages in the
+    ``section`` table of the wiki-scripts database.
+
+    The sections of many pages can be loaded in one query with
+    :py:meth:`prefetch` (e.g. for all link targets on a page) and they are
+    kept for the whole lifetime of the object, so that further lookups for the
+    same pages do not touch the database. The database is assumed not to
+    change while the index is used.
+
+    :param db: a :py:class:`ws.db.database.Database` instance
+    :param int chunk_size: maximum number of titles per query
+    """
+
+    def __init__(self, db, chunk_size=500):
+        self.db = db
+        self.chunk_size = chunk_size
+        # mapping of page titles to (headings, anchors) tuples or None for missing pages
+        self._sections = {}
+        # mapping of (title, suffix_sep) to the pretty anchors
+        self._pretty_anchors = {}
+        # mapping of titles to FuzzyIndex objects of the anchors
+        self._fuzzy_indexes = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, title):
+        return title in self._sections
+
+    def clear(self):
+        with self._lock:
+            self._sections.clear()
+            self._pretty_anchors.clear()
+            self._fuzzy_indexes.clear()
+
+    def prefetch(self, titles):
+        """
+        Load the sections of all given pages which are not in the index yet.
+
+        :param titles: an iterable of full page names (strings)
+        """
+        titles = {title for title in titles if title not in self._sections}
+        for chunk in iter_chunks(titles, self.chunk_size):
+            chunk = set(chunk)
+            sections = {}
+            result = self.db.query(titles=chunk, prop="sections", secprop={"title", "anchor"})
+            for page in result:
+                if "missing" in page:
+                    continue
+                _sections = page.get("sections", [])
+                headings = [section["title"] for section in _sections]
+                anchors = [section["anchor"] for section in _sections]
+                sections[page["title"]] = (headings, anchors)
+            with self._lock:
+                for title in chunk:
+                    self._sections[title] = sections.get(title)
+
+    def get(self, title):
+        """
+        :param str title: full page name
+        :returns: a ``(headings, anchors)`` tuple of lists, or ``None`` if the
+                  page does not exist
+        """
+        if title not in self._sections:
+            self.prefetch([title])
+        return self._sections[title]
+
+    def get_pretty_anchors(self, title, suffix_sep=" "):
+        """
+        Like :py:meth:`get`, but returns the anchors produced by
+        :py:func:`get_anchors <ws.parser_helpers.wikicode.get_anchors>` with
+        ``pretty=True`` (cached).
+
+        :param str title: full page name
+        :param str suffix_sep: passed to ``get_anchors``
+        :returns: a list of anchors, or ``None`` if the page does not exist
+        """
+        key = (title, suffix_sep)
+        try:
+            return self._pretty_anchors[key]
+        except KeyError:
+            pass
+        sections = self.get(title)
+        if sections is None:
+            return None
+        anchors = self._pretty_anchors[key] = get_anchors(sections[0], pretty=True, suffix_sep=suffix_sep)
+        return anchors
+
+    def get_fuzzy_index(self, title):
+        """
+        Get a :py:class:`FuzzyIndex <ws.utils.fuzzy.FuzzyIndex>` of the
+        anchors on the given page (cached).
+
+        :param str title: full page name
+        :returns: a ``FuzzyIndex`` object, or ``None`` if the page does not exist
+        """
+        try:
+            return self._fuzzy_indexes[title]
+        except KeyError:
+            pass
+        sections = self.get(title)
+        if sections is None:
+            return None
+        index = self._fuzzy_indexes[title] = FuzzyIndex(sections[1])
+        return index
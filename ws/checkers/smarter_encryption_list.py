@@ -3,40 +3,236 @@
 import logging
 from functools import lru_cache
 import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
 
 import requests
 import ssl
-from ws.utils import TLSAdapter
+from ws.utils import TLSAdapter, LazyProperty
 
-__all__ = ["SmarterEncryptionList"]
+__all__ = ["SmarterEncryptionList", "HashSnapshot", "build_snapshot"]
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_MAGIC = b"WSSESNP1"
+SNAPSHOT_HEADER = struct.Struct("<8sI")
+SHA1_SIZE = 20
+
+
+def build_snapshot(lines, path):
+    """
+    Build a snapshot file of the Smarter Encryption list.
+
+    The snapshot is a sorted array of unique SHA-1 digests of the domains,
+    which can be memory-mapped by :py:class:`HashSnapshot`.
+
+    :param lines: an iterable of strings, each being either a domain name or
+                  a hex-encoded SHA-1 digest of the domain name (empty lines
+                  and lines starting with ``#`` are ignored)
+    :param path: path to the output file (written atomically)
+    :returns: number of entries in the snapshot
+    """
+    digests = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if len(line) == 2 * SHA1_SIZE:
+            try:
+                digests.add(bytes.fromhex(line))
+                continue
+            except ValueError:
+                pass
+        digests.add(hashlib.sha1(bytes(line.lower(), encoding="utf-8")).digest())
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".snapshot")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(digests)))
+            for digest in sorted(digests):
+                f.write(digest)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(digests)
+
+
+class HashSnapshot:
+    """
+    Memory-mapped snapshot of the Smarter Encryption list created by
+    :py:func:`build_snapshot`. Membership is tested by binary search.
+
+    :param path: path to the snapshot file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC or len(self._mmap) != SNAPSHOT_HEADER.size + self._count * SHA1_SIZE:
+            self._mmap.close()
+            raise ValueError("file '{}' is not a valid Smarter Encryption snapshot".format(path))
+
+    def __len__(self):
+        return self._count
+
+    @LazyProperty
+    def digest(self):
+        """SHA-1 digest of the snapshot file, which identifies its entries."""
+        return hashlib.sha1(self._mmap).hexdigest()
+
+    def close(self):
+        self._mmap.close()
+
+    def contains_digest(self, digest):
+        lo = 0
+        hi = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = SNAPSHOT_HEADER.size + mid * SHA1_SIZE
+            value = self._mmap[offset:offset + SHA1_SIZE]
+            if value < digest:
+                lo = mid + 1
+            elif value > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, domain):
+        # domain names are lowercased by build_snapshot too
+        return self.contains_digest(hashlib.sha1(bytes(domain.lower(), encoding="utf-8")).digest())
+
+
 class SmarterEncryptionList:
     """
     Reference: https://help.duckduckgo.com/duckduckgo-help-pages/privacy/smarter-encryption/
+
+    By default, each domain is checked by a hash-prefix query to the online
+    API. Alternatively, a local snapshot of the list can be used (see
+    :py:class:`HashSnapshot`), which makes the membership test an offline
+    lookup.
+
+    :param snapshot_path:
+        path to the snapshot file; if it does not exist or is older than
+        ``snapshot_max_age``, it is (re)built from ``snapshot_source``
+    :param snapshot_source:
+        URL or local path of a text file with one domain name or hex-encoded
+        SHA-1 digest per line, used to build the snapshot
+    :param snapshot_max_age:
+        maximum age of the snapshot file (in seconds) before it is refreshed
+        from the source
     """
 
     endpoint = "https://duckduckgo.com/smarter_encryption.js?pv1={hash_prefix}"
 
-    def __init__(self, *, timeout, max_retries, **kwargs):
+    def __init__(self, *, timeout, max_retries, snapshot_path=None, snapshot_source=None,
+                 snapshot_max_age=7 * 24 * 3600, **kwargs):
         self.timeout = timeout
 
         self.session = requests.Session()
         # disallow TLS1.0 and TLS1.1, allow only TLS1.2 (and newer if suported
         # by the used openssl version)
         ssl_options = ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
-        adapter = TLSAdapter(ssl_options=ssl_options, max_retries=max_retries)
+        adapter = TLSAdapter(ssl_options=ssl_options, max_retries=max_retries, shared_cache=True)
         self.session.mount("https://", adapter)
 
-    @lru_cache(maxsize=1024)
+        # per-instance caches (caching the methods directly would keep all
+        # instances alive via the class-level cache)
+        self._contains_cached = lru_cache(maxsize=1024)(self._contains)
+        self._query_hash_prefix_cached = lru_cache(maxsize=128)(self._query_hash_prefix)
+
+        self.snapshot = None
+        if snapshot_path is not None:
+            self.snapshot = self._load_snapshot(snapshot_path, snapshot_source, snapshot_max_age)
+
+    @staticmethod
+    def set_argparser(argparser):
+        """
+        Add arguments for the Smarter Encryption snapshot to an instance of
+        :py:class:`argparse.ArgumentParser`.
+
+        See also the :py:mod:`ws.config` module.
+
+        :param argparser: an instance of :py:class:`argparse.ArgumentParser`
+        """
+        import ws.config
+        group = argparser.add_argument_group(title="Smarter Encryption list")
+        group.add_argument("--smarter-encryption-snapshot", type=ws.config.argtype_dirname_must_exist, metavar="PATH",
+                help="path to a local snapshot of the Smarter Encryption list (default: query the online API for each domain)")
+        group.add_argument("--smarter-encryption-source", metavar="URL_OR_PATH",
+                help="URL or local path of a list of domains (or their SHA-1 digests) used to (re)build the snapshot (default: %(default)s)")
+        group.add_argument("--smarter-encryption-max-age", type=int, default=7, metavar="DAYS",
+                help="rebuild the snapshot from the source when it is older than DAYS days (default: %(default)s)")
+
+    @staticmethod
+    def kwargs_from_argparser(args):
+        """
+        Return the keyword arguments for the constructor corresponding to the
+        arguments parsed by the :py:class:`argparse.ArgumentParser` configured
+        with :py:meth:`set_argparser`.
+
+        :param args: an instance of :py:class:`argparse.Namespace`
+        """
+        return {
+            "snapshot_path": args.smarter_encryption_snapshot,
+            "snapshot_source": args.smarter_encryption_source,
+            "snapshot_max_age": args.smarter_encryption_max_age * 24 * 3600,
+        }
+
+    def _load_snapshot(self, path, source, max_age):
+        try:
+            is_current = time.time() - os.path.getmtime(path) < max_age
+        except FileNotFoundError:
+            is_current = False
+        if not is_current and source is not None:
+            try:
+                self.refresh_snapshot(path, source)
+            except (OSError, requests.exceptions.RequestException) as e:
+                logger.warning("Failed to refresh the Smarter Encryption snapshot from {}: {}".format(source, e))
+        if os.path.isfile(path):
+            try:
+                return HashSnapshot(path)
+            except (ValueError, struct.error) as e:
+                logger.warning("Failed to load the Smarter Encryption snapshot {}, falling back to online queries: {}".format(path, e))
+                return None
+        logger.warning("Smarter Encryption snapshot {} is not available, falling back to online queries".format(path))
+        return None
+
+    def refresh_snapshot(self, path, source):
+        """
+        (Re)build the snapshot file from the given source.
+
+        :param path: path to the snapshot file
+        :param source: URL or local path of the source file
+        """
+        logger.info("Building Smarter Encryption snapshot {} from {}".format(path, source))
+        if source.startswith("http://") or source.startswith("https://"):
+            response = self.session.get(source, timeout=self.timeout)
+            response.raise_for_status()
+            count = build_snapshot(response.text.splitlines(), path)
+        else:
+            with open(source, "r") as f:
+                count = build_snapshot(f, path)
+        logger.info("Smarter Encryption snapshot contains {} entries".format(count))
+
     def __contains__(self, value):
+        return self._contains_cached(value)
+
+    def _contains(self, value):
+        if self.snapshot is not None:
+            return value in self.snapshot
         logger.debug("checking domain {} in the SmarterEncryptionList".format(value))
         h = hashlib.sha1(bytes(value, encoding="utf-8"))
-        data = self._query_hash_prefix(h.hexdigest()[:4])
+        data = self._query_hash_prefix_cached(h.hexdigest()[:4])
         return h.hexdigest() in data
 
-    @lru_cache(maxsize=128)
     def _query_hash_prefix(self, value):
         url = self.endpoint.format(hash_prefix=value)
         response = self.session.get(url, timeout=self.timeout)
@@ -3,13 +3,14 @@
 import hashlib
 import logging
 
-from ..utils import RateLimited, LazyProperty
+from ..utils import RateLimited, LazyProperty, dmerge
 
 from .connection import Connection, APIError
 from .site import Site
 from .user import User
 from .tags import Tags
 from .redirects import Redirects
+from .edit_queue import EditQueue
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +92,14 @@ class API(Connection):
         """
         return Redirects(self)
 
+    @LazyProperty
+    def edit_queue(self):
+        """
+        A :py:class:`ws.client.edit_queue.EditQueue` instance for asynchronous
+        submission of the write operations.
+        """
+        return EditQueue(self)
+
     @LazyProperty
     def max_ids_per_query(self):
         """
@@ -170,6 +179,17 @@ class API(Connection):
             return None
         return recentchanges[0]["timestamp"]
 
+    @LazyProperty
+    def title_context(self):
+        """
+        A :py:class:`ws.parser_helpers.title.Context` instance for the current
+        wiki, shared by all titles created with :py:meth:`API.Title`.
+        """
+        # lazy import - ws.parser_helpers.title imports mwparserfromhell which is
+        # an optional dependency
+        from ..parser_helpers.title import Context
+        return Context.from_api(self)
+
     def Title(self, title):
         """
         Parse a MediaWiki title.
@@ -177,10 +197,8 @@ class API(Connection):
         :param str title: page title to be parsed
         :returns: a :py:class:`ws.parser_helpers.title.Title` object
         """
-        # lazy import - ws.parser_helpers.title imports mwparserfromhell which is
-        # an optional dependency
-        from ..parser_helpers.title import Context, Title
-        return Title(Context.from_api(self), title)
+        from ..parser_helpers.title import Title
+        return Title(self.title_context, title)
 
 
     def call_api_autoiter_ids(self, params=None, *, expand_result=True, **kwargs):
@@ -274,6 +292,15 @@ class API(Connection):
 
         .. _`query-continue feature`: https://www.mediawiki.org/wiki/API:Query#Continuing_queries
         """
+        for result in self._query_continue(params, **kwargs):
+            if "query" in result:
+                yield result["query"]
+
+    def _query_continue(self, params=None, **kwargs):
+        """
+        Same as :py:meth:`query_continue`, but yields full API responses
+        including the ``batchcomplete`` and ``continue`` parts.
+        """
         if params is None:
             params = kwargs
         elif not isinstance(params, dict):
@@ -295,8 +322,7 @@ class API(Connection):
             params_copy.update(last_continue)
             # call the API and handle the result
             result = self.call_api(params_copy, expand_result=False)
-            if "query" in result:
-                yield result["query"]
+            yield result
             if "continue" not in result:
                 break
             last_continue = result["continue"]
@@ -318,25 +344,44 @@ class API(Connection):
         generator's maximum and specifying multiple props generally results in
         exceeding the value of ``$wgAPIMaxResultSize``.
 
-        Although there is an automated query continuation via
-        :py:meth:`query_continue`, the overlapping data is not squashed
-        automatically in order to avoid keeping big data in memory (this is the
-        point of API:Generators). As a result, a page may be yielded multiple
-        times. For applications where this matters, see
-        :py:meth:`ws.interlanguage.InterlanguageLinks.InterlanguageLinks._get_allpages`
-        for an example of proper handling of this case.
+        The partial data is squashed automatically: the pages of the current
+        generator batch are collected in a dictionary keyed by the page ID and
+        the pieces of prop data from subsequent continuations are merged into
+        them. Pages are yielded (sorted by title) once the batch is complete,
+        i.e. each page is yielded exactly once and only the current batch is
+        kept in memory.
         """
         generator_ = kwargs.get("generator") if params is None else params.get("generator")
         if generator_ is None:
             raise ValueError("param 'generator' must be supplied")
 
-        for snippet in self.query_continue(params, **kwargs):
+        # pages of the current batch
+        batch = {}
+
+        def flush():
+            yield from sorted(batch.values(), key=lambda d: d["title"])
+            batch.clear()
+
+        for result in self._query_continue(params, **kwargs):
             # API generator returns dict !!!
             # for example:  snippet === {"pages":
             #       {"9693": {"title": "Page title", "ns": 0, "pageid": "9693"},
             #        "1165", {"title": ...
-            snippet = sorted(snippet["pages"].values(), key=lambda d: d["title"])
-            yield from snippet
+            pages = result.get("query", {}).get("pages", {})
+            for page in pages.values():
+                # missing pages don't have a pageid
+                key = page.get("pageid", page["title"])
+                if key in batch:
+                    dmerge(page, batch[key])
+                else:
+                    batch[key] = page
+            # the "batchcomplete" key indicates that all data for the current
+            # set of pages has been returned
+            if "batchcomplete" in result:
+                yield from flush()
+
+        # older MediaWiki versions don't indicate complete batches
+        yield from flush()
 
     def list(self, params=None, **kwargs):
         """
@@ -16,9 +16,11 @@ import ssl
 import http.cookiejar as cookielib
 import logging
 import copy
+import time
 
 from ws import __version__, __url__
 from ws.utils import TLSAdapter, RateLimited, parse_timestamps_in_struct, serialize_timestamps_in_struct
+from .metrics import ClientMetrics, get_api_module
 
 logger = logging.getLogger(__name__)
 
@@ -92,13 +94,17 @@ class Connection:
     :param str index_url: URL path to the wiki's ``index.php`` entry point
     :param requests.Session session: session created by :py:meth:`make_session`
     :param int timeout: connection timeout in seconds
+    :param metrics:
+        an optional :py:class:`ws.client.metrics.ClientMetrics` instance for
+        recording per-request statistics
     """
 
-    def __init__(self, api_url, index_url, session, timeout=60):
+    def __init__(self, api_url, index_url, session, timeout=60, metrics=None):
         self.api_url = api_url
         self.index_url = index_url
         self.session = session
         self.timeout = timeout
+        self.metrics = metrics
 
     @staticmethod
     def make_session(user_agent=DEFAULT_UA, max_retries=0,
@@ -172,6 +178,10 @@ class Connection:
                 help="connection timeout in seconds (default: %(default)s)")
         group.add_argument("--cookie-file", type=ws.config.argtype_dirname_must_exist, metavar="PATH",
                 help="path to cookie file (default: %(default)s)")
+        group.add_argument("--metrics-file", type=ws.config.argtype_dirname_must_exist, metavar="PATH",
+                help="path to a file where per-request metrics are written at exit (default: %(default)s)")
+        group.add_argument("--metrics-format", choices=["json", "prometheus"], default="json",
+                help="format of the metrics file (default: %(default)s)")
         # TODO: expose also user_agent, http_user, http_password?
 
     @classmethod
@@ -185,7 +195,11 @@ class Connection:
         """
         session = Connection.make_session(max_retries=args.connection_max_retries,
                                           cookie_file=args.cookie_file)
-        return klass(args.api_url, args.index_url, session=session, timeout=args.connection_timeout)
+        metrics = None
+        if args.metrics_file:
+            metrics = ClientMetrics()
+            metrics.export_at_exit(args.metrics_file, args.metrics_format)
+        return klass(args.api_url, args.index_url, session=session, timeout=args.connection_timeout, metrics=metrics)
 
     @RateLimited(10, 3)
     def request(self, method, url, **kwargs):
@@ -275,15 +289,25 @@ class Connection:
         else:
             result = self.request("GET", self.api_url, params=params)
 
+        response = result
+        decode_start = time.perf_counter()
         try:
             result = result.json()
         except ValueError:
+            if self.metrics is not None:
+                self.metrics.record_request(action, get_api_module(params), errors=1,
+                                            **self._response_metrics(response))
             raise APIJsonError("Failed to decode server response. Please make "
                                "sure that the API is enabled on the wiki and "
                                "that the API URL is correct.")
+        decode_time = time.perf_counter() - decode_start
 
         # see if there are errors/warnings
         if "error" in result:
+            if self.metrics is not None:
+                self.metrics.record_request(action, get_api_module(params), errors=1,
+                                            decode_time=decode_time,
+                                            **self._response_metrics(response))
             raise APIError(params, result["error"])
         if check_warnings is True and "warnings" in result:
             msg = "API warning(s) for query {}:".format(params)
@@ -292,8 +316,15 @@ class Connection:
             logger.warning(msg)
 
         # parse timestamps
+        timestamp_start = time.perf_counter()
         parse_timestamps_in_struct(result)
 
+        if self.metrics is not None:
+            self.metrics.record_request(action, get_api_module(params),
+                                        decode_time=decode_time,
+                                        timestamp_time=time.perf_counter() - timestamp_start,
+                                        **self._response_metrics(response))
+
         if expand_result is True:
             if action in result:
                 return result[action]
@@ -313,7 +344,29 @@ class Connection:
 
         .. _`MediaWiki`: https://www.mediawiki.org/wiki/Manual:Parameters_to_index.php
         """
-        return self.request(method, self.index_url, **kwargs)
+        response = self.request(method, self.index_url, **kwargs)
+        if self.metrics is not None:
+            self.metrics.record_request("index", "", **self._response_metrics(response, stream=kwargs.get("stream", False)))
+        return response
+
+    @staticmethod
+    def _response_metrics(response, stream=False):
+        """
+        Auxiliary method for collecting the transport metrics of a response.
+
+        The body of a streamed response is not read, its size is taken from
+        the ``Content-Length`` header (if available).
+        """
+        body = response.request.body or b""
+        if stream is True:
+            bytes_in = int(response.headers.get("Content-Length", 0))
+        else:
+            bytes_in = len(response.content)
+        return {
+            "bytes_out": len(response.request.url) + len(body),
+            "bytes_in": bytes_in,
+            "server_time": response.elapsed.total_seconds(),
+        }
 
     def get_hostname(self):
         """
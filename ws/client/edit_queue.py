@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from .connection import APIError
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["EditQueue", "is_edit_conflict", "check_result"]
+
+def is_edit_conflict(exception):
+    """
+    Check if an exception raised by a write operation represents an edit
+    conflict.
+
+    :param exception: the exception obtained from a future returned by
+                      :py:meth:`EditQueue.submit`
+    :returns: ``True`` for edit conflicts, otherwise ``False``
+    """
+    if not isinstance(exception, APIError):
+        return False
+    return exception.server_response.get("code") in {"editconflict", "pagedeleted", "articleexists"}
+
+def check_result(future):
+    """
+    Wait for an operation submitted into the :py:class:`EditQueue` and handle
+    its failure the same way as the scripts handle the failures of the
+    synchronous API calls: :py:exc:`APIError <ws.client.connection.APIError>`
+    (e.g. an edit conflict, which is already logged by the API method) means
+    that the operation is skipped, all other exceptions are re-raised.
+
+    :param future: a future returned by :py:meth:`EditQueue.submit`
+    :returns: ``True`` if the operation succeeded, ``False`` if it failed with
+              an :py:exc:`APIError <ws.client.connection.APIError>`
+    """
+    exception = future.exception()
+    if exception is None:
+        return True
+    if isinstance(exception, APIError):
+        return False
+    raise exception
+
+class EditQueue:
+    """
+    Asynchronous queue for the rate-limited write operations of the
+    :py:class:`API <ws.client.api.API>`.
+
+    The write methods of the API (:py:meth:`edit <ws.client.api.API.edit>`,
+    :py:meth:`create <ws.client.api.API.create>`,
+    :py:meth:`move <ws.client.api.API.move>` and
+    :py:meth:`set_page_language <ws.client.api.API.set_page_language>`) are
+    rate-limited and block the calling thread for the whole rate-limit window.
+    This class executes the prepared write operations in a background thread,
+    so that the caller can fetch and process further pages while the previous
+    edits are being submitted. The operations are executed in the order of
+    submission at the rate permitted by the
+    :py:class:`@RateLimited <ws.utils.rate.RateLimited>` decorators of the
+    API methods. The cached CSRF token of the API is reused for all operations.
+
+    Errors, most notably edit conflicts (see :py:func:`is_edit_conflict`), are
+    reported back to the caller via the :py:class:`concurrent.futures.Future`
+    objects returned by :py:meth:`submit`. The caller should check them (e.g.
+    with :py:func:`check_result`), otherwise the errors would pass silently.
+    The worker is a daemon thread, so the caller should also call
+    :py:meth:`join` before exiting (even on errors), otherwise the pending
+    operations would be discarded.
+
+    :param api: an :py:class:`API <ws.client.api.API>` instance
+    :param int maxsize:
+        maximum number of pending operations; :py:meth:`submit` blocks when
+        the queue is full so that the caller does not keep too many page
+        contents in memory
+    """
+
+    # API methods which can be submitted into the queue
+    actions = {"edit", "create", "move", "set_page_language"}
+
+    def __init__(self, api, maxsize=10):
+        self._api = api
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                # daemon thread - pending operations are discarded on exit, call
+                # join() to wait for them
+                self._worker = threading.Thread(target=self._run, name="EditQueue", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            future, action, args, kwargs = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = getattr(self._api, action)(*args, **kwargs)
+                    except Exception as e:
+                        if is_edit_conflict(e):
+                            logger.warning("EditQueue: {} operation failed due to a conflict: {}".format(action, e.server_response["info"]))
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, action, *args, **kwargs):
+        """
+        Submit a prepared write operation into the queue.
+
+        :param str action:
+            name of the API method to call, one of :py:attr:`actions`
+        :param args: positional arguments for the API method
+        :param kwargs: keyword arguments for the API method
+        :returns:
+            a :py:class:`concurrent.futures.Future` object holding the result
+            of the API method or the raised exception
+        """
+        if action not in self.actions:
+            raise ValueError("invalid action '{}' (valid actions are: {})".format(action, sorted(self.actions)))
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((future, action, args, kwargs))
+        return future
+
+    def join(self):
+        """
+        Block until all submitted operations have been processed.
+        """
+        self._queue.join()
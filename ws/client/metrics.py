@@ -0,0 +1,160 @@
+#! /usr/bin/env python3
+
+"""
+The :py:mod:`ws.client.metrics` module provides per-request instrumentation of
+the :py:class:`Connection <ws.client.connection.Connection>` class. The
+collected numbers can be exported in the `Prometheus text format`_ or as a JSON
+summary, optionally at the exit of the script.
+
+.. _`Prometheus text format`: https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+import atexit
+import json
+import logging
+import threading
+
+from ws.utils import add_throttle_hook, remove_throttle_hook
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ClientMetrics", "get_api_module"]
+
+def get_api_module(params):
+    """
+    Return a string identifying the API modules used in a query, e.g.
+    ``"allpages+revisions"`` for ``generator=allpages&prop=revisions``.
+
+    :param dict params: the API query parameters
+    :returns: a :py:obj:`str` object (empty for actions without submodules)
+    """
+    modules = []
+    for key in ["list", "generator", "prop", "meta"]:
+        value = params.get(key)
+        if value:
+            if not isinstance(value, str):
+                value = "|".join(sorted(str(v) for v in value))
+            modules.extend(value.split("|"))
+    return "+".join(modules)
+
+class ClientMetrics:
+    """
+    Collector of per-request statistics, aggregated by the API action and
+    module (see :py:func:`get_api_module`).
+
+    The following numbers are tracked for each ``(action, module)`` pair:
+
+    - ``requests``: number of HTTP requests
+    - ``errors``: number of requests which failed with an API error or an
+      invalid response
+    - ``bytes_out``: size of the request URLs and bodies
+    - ``bytes_in``: size of the response bodies (for streamed responses, the
+      ``Content-Length`` header is used if available, the body is not read)
+    - ``server_time``: time between sending the request and receiving the
+      response headers, in seconds
+    - ``decode_time``: time spent in JSON decoding, in seconds
+    - ``timestamp_time``: time spent in the conversion of timestamps, in seconds
+
+    Additionally, the time spent sleeping in functions decorated with
+    :py:func:`RateLimited <ws.utils.rate.RateLimited>` is tracked per function.
+    Note that the rate-limiting state is global, so each instance records the
+    throttling of all rate-limited functions in the process.
+    """
+
+    counters = ["requests", "errors", "bytes_out", "bytes_in", "server_time", "decode_time", "timestamp_time"]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.throttle = {}
+        add_throttle_hook(self.record_throttle)
+
+    def close(self):
+        """
+        Stop recording the rate-limiting sleeps.
+        """
+        remove_throttle_hook(self.record_throttle)
+
+    def record_request(self, action, module, **values):
+        """
+        Add values of the :py:attr:`counters` for the given action and module.
+        The number of requests is incremented automatically.
+        """
+        with self._lock:
+            stats = self.requests.setdefault((action, module), dict.fromkeys(self.counters, 0))
+            stats["requests"] += 1
+            for key, value in values.items():
+                stats[key] += value
+
+    def record_throttle(self, name, seconds):
+        """
+        Add the time spent sleeping in a rate-limited function.
+        """
+        with self._lock:
+            stats = self.throttle.setdefault(name, {"count": 0, "seconds": 0})
+            stats["count"] += 1
+            stats["seconds"] += seconds
+
+    def summary(self):
+        """
+        :returns: a JSON-serializable summary of the collected metrics
+        """
+        with self._lock:
+            requests = [dict(action=action, module=module, **stats)
+                        for (action, module), stats in sorted(self.requests.items())]
+            throttle = [dict(function=name, **stats)
+                        for name, stats in sorted(self.throttle.items())]
+        return {"requests": requests, "throttle": throttle}
+
+    def to_json(self):
+        """
+        :returns: the :py:meth:`summary` serialized as JSON
+        """
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self):
+        """
+        :returns: the collected metrics in the Prometheus text format
+        """
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+        def labels(**kwargs):
+            return ",".join("{}=\"{}\"".format(key, escape(value)) for key, value in kwargs.items())
+
+        summary = self.summary()
+        lines = []
+        for counter in self.counters:
+            name = "ws_client_{}_total".format(counter)
+            lines.append("# TYPE {} counter".format(name))
+            for entry in summary["requests"]:
+                lines.append("{}{{{}}} {}".format(name, labels(action=entry["action"], module=entry["module"]), entry[counter]))
+        for counter in ["count", "seconds"]:
+            name = "ws_client_throttle_{}_total".format(counter)
+            lines.append("# TYPE {} counter".format(name))
+            for entry in summary["throttle"]:
+                lines.append("{}{{{}}} {}".format(name, labels(function=entry["function"]), entry[counter]))
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, format="json"):
+        """
+        Write the collected metrics into a file.
+
+        :param str path: path to the output file
+        :param str format: either ``"json"`` or ``"prometheus"``
+        """
+        if format == "json":
+            text = self.to_json()
+        elif format == "prometheus":
+            text = self.to_prometheus()
+        else:
+            raise ValueError("unknown format: '{}'".format(format))
+        with open(path, "w") as f:
+            f.write(text)
+        logger.info("Client metrics written to {}".format(path))
+
+    def export_at_exit(self, path, format="json"):
+        """
+        Register :py:meth:`export` to be called at the exit of the program.
+        """
+        atexit.register(self.export, path, format)
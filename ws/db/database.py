@@ -20,6 +20,7 @@ import alembic.migration
 
 from . import schema, selects, grabbers, parser_cache
 from ..parser_helpers.title import Context, Title
+from ..utils import LazyProperty
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +74,7 @@ class Database:
                 sys.exit(1)
 
     @staticmethod
-    def set_argparser(argparser):
+    def set_argparser(argparser, *, required=True):
         """
         Add arguments for constructing a :py:class:`Database` object to an
         instance of :py:class:`argparse.ArgumentParser`.
@@ -81,6 +82,9 @@ class Database:
         See also the :py:mod:`ws.config` module.
 
         :param argparser: an instance of :py:class:`argparse.ArgumentParser`
+        :param bool required: whether the ``--db-name`` argument is required
+            (scripts which can run without the database should check if
+            ``db_name`` is ``None`` before calling :py:meth:`from_argparser`)
         """
         group = argparser.add_argument_group(title="Database parameters")
         group.add_argument("--db-dialect", metavar="DIALECT", choices=["postgresql"], default="postgresql",
@@ -95,7 +99,7 @@ class Database:
                 help="hostname of the database server (default: %(default)s)")
         group.add_argument("--db-port", metavar="PORT", default=5432,
                 help="port on which the database server listens (default: %(default)s)")
-        group.add_argument("--db-name", metavar="DATABASE", required=True,
+        group.add_argument("--db-name", metavar="DATABASE", required=required,
                 help="name of the database (default: %(default)s)")
 
     @classmethod
@@ -171,12 +175,13 @@ class Database:
         """
         return selects.query(self, *args, **kwargs)
 
-    def Title(self, title):
+    @LazyProperty
+    def title_context(self):
         """
-        Parse a MediaWiki title.
-
-        :param str title: page title to be parsed
-        :returns: a :py:class:`ws.parser_helpers.title.Title` object
+        A :py:class:`ws.parser_helpers.title.Context` instance for the wiki
+        stored in the database, shared by all titles created with
+        :py:meth:`Database.Title`. It is reset when the namespaces or
+        interwiki prefixes are synchronized by :py:meth:`sync_with_api`.
         """
         iwmap = selects.get_interwikimap(self)
         namespacenames = selects.get_namespacenames(self)
@@ -184,8 +189,16 @@ class Database:
         # legaltitlechars are not stored in the database, it will hardly ever
         # change so let's just hardcode it
         legaltitlechars = " %!\"$&'()*,\\-.\\/0-9:;=?@A-Z\\\\^_`a-z~\\x80-\\xFF+"
-        context = Context(iwmap, namespacenames, namespaces, legaltitlechars)
-        return Title(context, title)
+        return Context(iwmap, namespacenames, namespaces, legaltitlechars)
+
+    def Title(self, title):
+        """
+        Parse a MediaWiki title.
+
+        :param str title: page title to be parsed
+        :returns: a :py:class:`ws.parser_helpers.title.Title` object
+        """
+        return Title(self.title_context, title)
 
     def update_parser_cache(self):
         """
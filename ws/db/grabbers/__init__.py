@@ -27,12 +27,15 @@ def synchronize(db, api, *, with_content=False, check_needs_update=True):
         return
 
     GrabberNamespaces(api, db).update()
+    # the title context is built from the namespace and interwiki tables
+    del db.title_context
     GrabberTags(api, db).update()
     GrabberRecentChanges(api, db).update()
     GrabberUsers(api, db).update()
     GrabberLogging(api, db).update()
     GrabberUserMerge(api, db).update()
     GrabberInterwiki(api, db).update()
+    del db.title_context
     GrabberIPBlocks(api, db).update()
     GrabberPages(api, db).update()
     GrabberProtectedTitles(api, db).update()
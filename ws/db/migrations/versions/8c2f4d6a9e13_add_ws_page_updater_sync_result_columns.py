@@ -0,0 +1,28 @@
+"""add ws_page_updater_sync result columns
+
+Revision ID: 8c2f4d6a9e13
+Revises: e3a5c1f07b2d
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2f4d6a9e13'
+down_revision = 'e3a5c1f07b2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ws_page_updater_sync', sa.Column('wspu_state', sa.UnicodeText(), nullable=True))
+    op.add_column('ws_page_updater_sync', sa.Column('wspu_text', sa.UnicodeText(), nullable=True))
+    op.add_column('ws_page_updater_sync', sa.Column('wspu_summary', sa.UnicodeText(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('ws_page_updater_sync', 'wspu_summary')
+    op.drop_column('ws_page_updater_sync', 'wspu_text')
+    op.drop_column('ws_page_updater_sync', 'wspu_state')
@@ -0,0 +1,31 @@
+"""create ws_page_updater_sync table
+
+Revision ID: e3a5c1f07b2d
+Revises: 1124ae67cc01
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a5c1f07b2d'
+down_revision = '1124ae67cc01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ws_page_updater_sync',
+    sa.Column('wspu_key', sa.UnicodeText(), nullable=False),
+    sa.Column('wspu_page_id', sa.Integer(), nullable=False),
+    sa.Column('wspu_rev_id', sa.Integer(), nullable=False),
+    sa.Column('wspu_timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['wspu_page_id'], ['page.page_id'], ondelete='CASCADE', initially='DEFERRED', deferrable=True),
+    sa.PrimaryKeyConstraint('wspu_key', 'wspu_page_id')
+    )
+
+
+def downgrade():
+    op.drop_table('ws_page_updater_sync')
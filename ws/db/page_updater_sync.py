@@ -0,0 +1,232 @@
+#! /usr/bin/env python3
+
+import datetime
+import logging
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["PageUpdaterSync"]
+
+class PageUpdaterSync:
+    """
+    Tracks which page revisions were processed by a
+    :py:class:`ws.pageupdater.PageUpdater` in the ``ws_page_updater_sync``
+    table, so that the next run can select only the pages which changed since
+    then. The result of the processing can be stored too, so that it can be
+    reused for the same revision if the external state which the result
+    depends on did not change.
+
+    :param db: a :py:class:`ws.db.database.Database` instance
+    :param str key: key identifying the configuration of the updater (pages
+                    processed with a different configuration are tracked
+                    separately)
+    """
+
+    def __init__(self, db, key):
+        self.db = db
+        self.key = key
+
+        wspu = self.db.ws_page_updater_sync
+        wspu_ins = insert(wspu)
+        self.sql_insert = wspu_ins.on_conflict_do_update(
+                constraint=wspu.primary_key,
+                set_={
+                    "wspu_rev_id": wspu_ins.excluded.wspu_rev_id,
+                    "wspu_timestamp": wspu_ins.excluded.wspu_timestamp,
+                    "wspu_state": wspu_ins.excluded.wspu_state,
+                    "wspu_text": wspu_ins.excluded.wspu_text,
+                    "wspu_summary": wspu_ins.excluded.wspu_summary,
+                }
+        )
+
+    def get_pages(self, namespace, *, filterredir="all", max_age=None, first=None, state=None, link_targets=False):
+        """
+        Get the pages in the given namespace which have not been processed
+        yet, whose latest revision changed since they were processed, or which
+        were processed more than ``max_age`` ago.
+
+        If ``state`` is given, also the pages which were processed with a
+        different state are selected. The recorded state may be extended with
+        the state of the link targets (see :py:meth:`get_link_targets_state`),
+        so only its prefix is compared. If ``link_targets`` is ``True``, also
+        the pages with a link to a page (or through a redirect) which was
+        created or edited since they were processed are selected. Deleted link
+        targets are not detected, such pages are selected after ``max_age``.
+
+        :param int namespace: the namespace number
+        :param str filterredir: either ``"all"``, ``"nonredirects"``, or ``"redirects"``
+        :param datetime.timedelta max_age: maximum age of the last processing,
+                                           ``None`` means no limit
+        :param str first: skip pages whose title (without the namespace
+                          prefix) is sorted before this title
+        :param str state: the current state of the updater, ``None`` means
+                          that the state is not checked
+        :param bool link_targets: whether to check the changes of the link
+                                  targets
+        :returns: a list of dictionaries with the ``pageid``, ``ns``,
+                  ``title`` and ``lastrevid`` keys, sorted by the title
+        """
+        assert filterredir in {"all", "nonredirects", "redirects"}
+        page = self.db.page
+        nss = self.db.namespace_starname
+        wspu = self.db.ws_page_updater_sync
+
+        condition = ( wspu.c.wspu_rev_id == None ) | ( wspu.c.wspu_rev_id != page.c.page_latest )
+        if max_age is not None:
+            condition |= wspu.c.wspu_timestamp < datetime.datetime.utcnow() - max_age
+        if state is not None:
+            condition |= ( wspu.c.wspu_state == None ) | \
+                         ( ( wspu.c.wspu_state != state ) & ~wspu.c.wspu_state.startswith(state + ":") )
+        if link_targets is True:
+            pl = self.db.pagelinks
+            rd = self.db.redirect
+            rev = self.db.revision
+            target = page.alias("target")
+            rd_target = page.alias("rd_target")
+            # link targets edited since the last processing
+            condition |= sa.exists().select_from(
+                pl.join(target, ( pl.c.pl_namespace == target.c.page_namespace ) &
+                                ( pl.c.pl_title == target.c.page_title ))
+                  .join(rev, target.c.page_latest == rev.c.rev_id)
+            ).where(
+                ( pl.c.pl_from == page.c.page_id ) &
+                ( rev.c.rev_timestamp > wspu.c.wspu_timestamp )
+            )
+            # targets of redirects edited since the last processing
+            condition |= sa.exists().select_from(
+                pl.join(target, ( pl.c.pl_namespace == target.c.page_namespace ) &
+                                ( pl.c.pl_title == target.c.page_title ))
+                  .join(rd, target.c.page_id == rd.c.rd_from)
+                  .join(rd_target, ( rd.c.rd_namespace == rd_target.c.page_namespace ) &
+                                   ( rd.c.rd_title == rd_target.c.page_title ))
+                  .join(rev, rd_target.c.page_latest == rev.c.rev_id)
+            ).where(
+                ( pl.c.pl_from == page.c.page_id ) &
+                ( rev.c.rev_timestamp > wspu.c.wspu_timestamp )
+            )
+
+        query = sa.select([page.c.page_id, page.c.page_namespace, page.c.page_title, page.c.page_latest, nss.c.nss_name]) \
+                .select_from(
+                    page.outerjoin(nss, page.c.page_namespace == nss.c.nss_id)
+                        .outerjoin(wspu, ( page.c.page_id == wspu.c.wspu_page_id ) &
+                                         ( wspu.c.wspu_key == self.key ))
+                ).where(
+                    ( page.c.page_namespace == namespace ) & condition
+                ).order_by(page.c.page_title.asc())
+        if filterredir == "redirects":
+            query = query.where(page.c.page_is_redirect == True)
+        elif filterredir == "nonredirects":
+            query = query.where(page.c.page_is_redirect == False)
+        if first:
+            query = query.where(page.c.page_title >= first)
+
+        pages = []
+        with self.db.engine.connect() as conn:
+            for row in conn.execute(query):
+                if row["nss_name"]:
+                    title = "{}:{}".format(row["nss_name"], row["page_title"])
+                else:
+                    title = row["page_title"]
+                pages.append({
+                    "pageid": row["page_id"],
+                    "ns": row["page_namespace"],
+                    "title": title,
+                    "lastrevid": row["page_latest"],
+                })
+        return pages
+
+    def get_link_targets_state(self, pageid):
+        """
+        Get a string identifying the state of the pages linked from the given
+        page, as recorded in the ``pagelinks`` table by the parser cache. It
+        consists of the number of the existing link targets and redirect
+        targets and of their latest revision IDs, so it changes when a link
+        target is created, deleted, moved or edited, or when the target of a
+        redirect among them is edited.
+
+        :param int pageid: the page ID
+        :returns: a string
+        """
+        page = self.db.page
+        pl = self.db.pagelinks
+        rd = self.db.redirect
+        target = page.alias("target")
+        rd_target = page.alias("rd_target")
+        query = sa.select([sa.func.count(target.c.page_id), sa.func.max(target.c.page_latest),
+                           sa.func.count(rd_target.c.page_id), sa.func.max(rd_target.c.page_latest)]) \
+                .select_from(
+                    pl.outerjoin(target, ( pl.c.pl_namespace == target.c.page_namespace ) &
+                                         ( pl.c.pl_title == target.c.page_title ))
+                      .outerjoin(rd, target.c.page_id == rd.c.rd_from)
+                      .outerjoin(rd_target, ( rd.c.rd_namespace == rd_target.c.page_namespace ) &
+                                            ( rd.c.rd_title == rd_target.c.page_title ))
+                ).where(pl.c.pl_from == pageid)
+        with self.db.engine.connect() as conn:
+            row = conn.execute(query).fetchone()
+        return "-".join(str(value) for value in row)
+
+    def get_result(self, pageid, revid, state, *, max_age=None):
+        """
+        Get the stored result of processing the given revision of the page.
+
+        :param int pageid: the page ID
+        :param int revid: the revision ID of the current content
+        :param str state: the current version of the external state
+        :param datetime.timedelta max_age: maximum age of the result, ``None``
+                                           means no limit
+        :returns: ``None`` if there is no usable result, otherwise a
+                  ``(text, summary)`` tuple, where ``text`` is ``None`` if the
+                  processing did not change the content
+        """
+        if state is None:
+            return None
+        wspu = self.db.ws_page_updater_sync
+        query = sa.select([wspu.c.wspu_text, wspu.c.wspu_summary]) \
+                .where(
+                    ( wspu.c.wspu_key == self.key ) &
+                    ( wspu.c.wspu_page_id == pageid ) &
+                    ( wspu.c.wspu_rev_id == revid ) &
+                    ( wspu.c.wspu_state == state )
+                )
+        if max_age is not None:
+            query = query.where(wspu.c.wspu_timestamp >= datetime.datetime.utcnow() - max_age)
+        with self.db.engine.connect() as conn:
+            row = conn.execute(query).fetchone()
+        if row is None:
+            return None
+        return row["wspu_text"], row["wspu_summary"] or ""
+
+    def set_processed(self, pageid, revid, *, state=None, text=None, summary=None):
+        """
+        Record that the given revision of the page was processed.
+
+        :param int pageid: the page ID
+        :param int revid: the revision ID of the processed content
+        :param str state: version of the external state which the result
+                          depends on, ``None`` if the result must not be reused
+        :param str text: the new content proposed by the processing, ``None``
+                         if the content was not changed
+        :param str summary: the edit summary for the new content
+        """
+        entry = {
+            "wspu_key": self.key,
+            "wspu_page_id": pageid,
+            "wspu_rev_id": revid,
+            "wspu_timestamp": datetime.datetime.utcnow(),
+            "wspu_state": state,
+            "wspu_text": text if state is not None else None,
+            "wspu_summary": summary if state is not None and text is not None else None,
+        }
+        with self.db.engine.begin() as conn:
+            conn.execute(self.sql_insert, entry)
+
+    def reset(self):
+        """
+        Forget all processed pages for the key.
+        """
+        wspu = self.db.ws_page_updater_sync
+        with self.db.engine.begin() as conn:
+            conn.execute(wspu.delete().where(wspu.c.wspu_key == self.key))
@@ -106,6 +106,26 @@ def create_custom_tables(metadata):
         Column("wss_timestamp", DateTime, nullable=False)
     )
 
+    # custom table tracking which page revision was last processed by
+    # PageUpdater with given configuration (used for incremental runs and for
+    # reusing the results of unchanged revisions)
+    Table("ws_page_updater_sync", metadata,
+        # key identifying the PageUpdater configuration
+        Column("wspu_key", UnicodeText, nullable=False),
+        Column("wspu_page_id", Integer, ForeignKey("page.page_id", ondelete="CASCADE", deferrable=True, initially="DEFERRED"), nullable=False),
+        # the revision ID of the processed content
+        Column("wspu_rev_id", Integer, nullable=False),
+        # timestamp of the processing
+        Column("wspu_timestamp", DateTime, nullable=False),
+        # version of the external state the result depends on (NULL if the
+        # result cannot be reused)
+        Column("wspu_state", UnicodeText),
+        # the proposed new content and edit summary (NULL if there was no change)
+        Column("wspu_text", UnicodeText),
+        Column("wspu_summary", UnicodeText),
+        PrimaryKeyConstraint("wspu_key", "wspu_page_id")
+    )
+
 
 def create_site_tables(metadata):
     # MW incompatibility: dropped the iw_wikiid column
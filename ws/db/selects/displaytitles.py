@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+import sqlalchemy as sa
+
+def get_displaytitles(db):
+    """
+    Get the mapping of titles of all pages to their display titles, like
+    ``generator=allpages&prop=info&inprop=displaytitle`` in all namespaces.
+    Pages without the ``displaytitle`` page property are mapped to their
+    title.
+    """
+    nss = db.namespace_starname
+    page = db.page
+    pp = db.page_props
+    nested_sel = pp.select().where(pp.c.pp_propname == "displaytitle").alias("requested_page_props")
+    query = sa.select([nss.c.nss_name, page.c.page_title, nested_sel.c.pp_value]) \
+            .select_from(
+                page.outerjoin(nss, page.c.page_namespace == nss.c.nss_id)
+                    .outerjoin(nested_sel, page.c.page_id == nested_sel.c.pp_page)
+            )
+
+    displaytitles = {}
+
+    conn = db.engine.connect()
+    for row in conn.execute(query):
+        if row["nss_name"]:
+            title = "{}:{}".format(row["nss_name"], row["page_title"])
+        else:
+            title = row["page_title"]
+        displaytitles[title] = row["pp_value"] or title
+
+    return displaytitles
@@ -71,19 +71,10 @@ class InterlanguageLinks:
     def _get_allpages(self):
         logger.info("Fetching langlinks property of all pages...")
         allpages = []
-        # not necessary to wrap in each iteration since lists are mutable
-        wrapped_titles = ws.utils.ListOfDictsAttrWrapper(allpages, "title")
-
         for ns in self.content_namespaces:
+            # API.generator squashes the partial results, each page is yielded once
             g = self.api.generator(generator="allpages", gapfilterredir="nonredirects", gapnamespace=ns, gaplimit="max", prop="langlinks", lllimit="max")
-            for page in g:
-                # the same page may be yielded multiple times with different pieces
-                # of the information, hence the ws.utils.dmerge
-                try:
-                    db_page = ws.utils.bisect_find(allpages, page["title"], index_list=wrapped_titles)
-                    ws.utils.dmerge(page, db_page)
-                except IndexError:
-                    ws.utils.bisect_insert_or_replace(allpages, page["title"], data_element=page, index_list=wrapped_titles)
+            allpages.extend(g)
 
         # sort by title
         allpages.sort(key=lambda page: page["title"])
@@ -0,0 +1,180 @@
+#! /usr/bin/env python3
+
+"""
+Sources of page contents for the scripts which process many pages, such as
+the :py:class:`ws.pageupdater.PageUpdater`.
+
+All sources yield the pages in the format of the ``page`` part of the API
+response for ``prop=revisions&rvprop=content|timestamp|ids&rvslots=main``,
+i.e. dictionaries with the ``pageid``, ``ns`` and ``title`` keys and a
+``revisions`` list containing one revision with the ``revid``, ``timestamp``
+and ``slots`` keys.
+"""
+
+import logging
+
+import sqlalchemy as sa
+
+import ws.utils
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["APIPageSource", "DatabasePageSource"]
+
+class APIPageSource:
+    """
+    Page source which fetches the content of the pages from the API.
+
+    :param ws.client.api.API api: interface to the wiki
+    """
+
+    def __init__(self, api):
+        self.api = api
+
+    def allpages(self, namespace, *, first=None, filterredir="all"):
+        """
+        Generate all pages in the given namespace, sorted by the title.
+
+        :param int namespace: the namespace number
+        :param str first: the title (without the namespace prefix) of the
+                          first page to be generated
+        :param str filterredir: either ``"all"``, ``"nonredirects"``, or ``"redirects"``
+        """
+        for page in self.api.generator(generator="allpages", gaplimit="100", gapnamespace=namespace, gapfrom=first, gapfilterredir=filterredir,
+                                       prop="revisions", rvprop="content|timestamp|ids", rvslots="main"):
+            # API.generator squashes the partial results of query-continuation,
+            # so pages without revisions can be only those deleted in the meantime
+            if "revisions" not in page:
+                continue
+            yield page
+
+    def pages_by_ids(self, pageids):
+        """
+        Generate the pages with the given IDs in the given order. Pages which
+        do not exist are skipped.
+
+        :param pageids: a list of page IDs
+        """
+        for chunk in ws.utils.list_chunks(pageids, self.api.max_ids_per_query):
+            result = self.api.call_api(action="query", pageids="|".join(str(pageid) for pageid in chunk),
+                                       prop="revisions", rvprop="content|timestamp|ids", rvslots="main")
+            # MediaWiki does not return ordered results for the pageids= parameter
+            for pageid in chunk:
+                page = result["pages"].get(str(pageid))
+                # pages without revisions can be only those deleted in the meantime
+                if page is None or "revisions" not in page:
+                    continue
+                yield page
+
+    def confirm(self, page):
+        """
+        Make sure that the content of the page is current before it is
+        edited.
+
+        :param dict page: a page generated by this source
+        :returns: the page if it is current, an updated page if it was edited
+                  in the meantime, or ``None`` if it was deleted
+        """
+        return page
+
+
+class DatabasePageSource(APIPageSource):
+    """
+    Page source which reads the content of the pages from the local mirror in
+    the ``page``, ``revision`` and ``text`` tables. The mirror should be
+    synchronized beforehand using
+    :py:meth:`Database.sync_with_api <ws.db.database.Database.sync_with_api>`
+    and
+    :py:meth:`Database.sync_revisions_content <ws.db.database.Database.sync_revisions_content>`.
+
+    The API is used only by :py:meth:`confirm` to check that the page was not
+    edited after the synchronization, and to fetch the content of pages which
+    is missing in the mirror.
+
+    :param ws.client.api.API api: interface to the wiki
+    :param ws.db.database.Database db: the local mirror
+    """
+
+    def __init__(self, api, db):
+        super().__init__(api)
+        self.db = db
+
+    def _select(self):
+        page = self.db.page
+        nss = self.db.namespace_starname
+        rev = self.db.revision
+        text = self.db.text
+        return sa.select([page.c.page_id, page.c.page_namespace, page.c.page_title, nss.c.nss_name,
+                          rev.c.rev_id, rev.c.rev_timestamp, text.c.old_text]) \
+                .select_from(
+                    page.outerjoin(nss, page.c.page_namespace == nss.c.nss_id)
+                        .join(rev, page.c.page_latest == rev.c.rev_id)
+                        .outerjoin(text, rev.c.rev_text_id == text.c.old_id)
+                )
+
+    def _execute(self, query):
+        """
+        Execute the query and generate pages in the API format. Pages whose
+        content is not available in the mirror are fetched from the API after
+        all other pages.
+        """
+        missing = []
+        # stream the results using a server-side cursor instead of loading
+        # the content of all pages into memory
+        with self.db.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(query)
+            for row in result:
+                if row["old_text"] is None:
+                    missing.append(row["page_id"])
+                    continue
+                if row["nss_name"]:
+                    title = "{}:{}".format(row["nss_name"], row["page_title"])
+                else:
+                    title = row["page_title"]
+                yield {
+                    "pageid": row["page_id"],
+                    "ns": row["page_namespace"],
+                    "title": title,
+                    "revisions": [{
+                        "revid": row["rev_id"],
+                        "timestamp": ws.utils.format_date(row["rev_timestamp"]),
+                        "slots": {"main": {"*": row["old_text"]}},
+                    }],
+                }
+        if missing:
+            logger.warning("The content of {} pages is missing in the database, fetching it from the API".format(len(missing)))
+            yield from super().pages_by_ids(missing)
+
+    def allpages(self, namespace, *, first=None, filterredir="all"):
+        assert filterredir in {"all", "nonredirects", "redirects"}
+        page = self.db.page
+        query = self._select().where(page.c.page_namespace == namespace) \
+                              .order_by(page.c.page_title.asc())
+        if filterredir == "redirects":
+            query = query.where(page.c.page_is_redirect.is_(True))
+        elif filterredir == "nonredirects":
+            query = query.where(page.c.page_is_redirect.is_(False))
+        if first:
+            query = query.where(page.c.page_title >= first)
+        yield from self._execute(query)
+
+    def pages_by_ids(self, pageids):
+        # the results of the individual chunks are sorted by the page ID
+        # instead of the given order, but the order does not matter here
+        page = self.db.page
+        for chunk in ws.utils.list_chunks(pageids, 500):
+            query = self._select().where(page.c.page_id.in_(chunk))
+            yield from self._execute(query)
+
+    def confirm(self, page):
+        revision = page["revisions"][0]
+        result = self.api.call_api(action="query", pageids=page["pageid"], prop="revisions", rvprop="ids|timestamp")
+        current = result["pages"].get(str(page["pageid"]))
+        if current is None or "revisions" not in current:
+            return None
+        if current["revisions"][0]["revid"] == revision["revid"]:
+            return page
+        logger.info("The content of page [[{}]] in the database is outdated, fetching the current revision from the API".format(page["title"]))
+        for current in super().pages_by_ids([page["pageid"]]):
+            return current
+        return None
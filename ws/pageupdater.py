@@ -5,15 +5,25 @@
 
 import logging
 import asyncio
+import collections
+import datetime
+import functools
+import hashlib
+import json
 from concurrent.futures import ThreadPoolExecutor
 
 import mwparserfromhell
 
 from ws.client import API, APIError
+from ws.client.edit_queue import check_result
+from ws.db.page_updater_sync import PageUpdaterSync
+from ws.page_source import APIPageSource, DatabasePageSource
 from ws.interactive import require_login, edit_interactive
 from ws.diff import diff_highlighted
+from ws.utils import LazyProperty
 import ws.ArchWiki.lang as lang
 from ws.parser_helpers.title import canonicalize
+from ws.parser_helpers.wikicode import NodeVisitor
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +55,8 @@ class PageUpdater:
     # one edit summary.
     threads_update_page = 1
 
-    def __init__(self, api, interactive=False, dry_run=False, first=None, title=None, langnames=None):
+    def __init__(self, api, interactive=False, dry_run=False, first=None, title=None, langnames=None,
+                 db=None, incremental=False, max_age=None, page_source="api"):
         if not dry_run:
             # ensure that we are authenticated
             require_login(api)
@@ -59,12 +70,35 @@ class PageUpdater:
         self.title = title
         self.langnames = langnames
 
+        # parameters for incremental runs (see generate_pages)
+        if incremental is True and db is None:
+            raise ValueError("the incremental mode requires a database")
+        self.db = db
+        self.incremental = incremental
+        self.max_age = max_age
+        self._sync = None
+
+        # source of the page contents (see ws.page_source)
+        if page_source == "api":
+            self.page_source = APIPageSource(api)
+        elif page_source == "db":
+            if db is None:
+                raise ValueError("the 'db' page source requires a database")
+            self.page_source = DatabasePageSource(api, db)
+        else:
+            raise ValueError("invalid page source: {}".format(page_source))
+
         self.namespaces = [0, 4, 14, 3000]
         if self.interactive is True:
             self.namespaces.append(12)
 
         # mapping of mwparserfromhell node types to lists of checker objects
         self.checkers = {}
+        # cache of the checkers for each concrete node type (see _get_checkers)
+        self._checkers_by_type = {}
+
+        # (future, on_success) tuples for the edits submitted into the edit queue
+        self._pending_edits = collections.deque()
 
     @classmethod
     def set_argparser(klass, argparser):
@@ -86,9 +120,20 @@ class PageUpdater:
                 help="the title of the only page to be processed")
         group.add_argument("--lang", default=None,
                 help="comma-separated list of language tags to process (default: all, choices: {})".format(lang.get_internal_tags()))
+        # the options requiring the wiki-scripts database are available only
+        # if the script sets up the database (see from_argparser)
+        if "Database parameters" in present_groups:
+            group.add_argument("--incremental", action="store_true",
+                    help="process only pages which changed since they were last processed")
+            group.add_argument("--max-age", type=int, default=30, metavar="DAYS",
+                    help="in the incremental mode, process also pages which were last processed more than DAYS days ago "
+                         "and do not reuse results stored more than DAYS days ago (default: %(default)s)")
+            group.add_argument("--page-source", choices=["api", "db"], default="api",
+                    help="source of the page contents: either the API, or the wiki-scripts database synchronized beforehand "
+                         "(the API is then used only to check that the pages were not edited in the meantime) (default: %(default)s)")
 
     @classmethod
-    def from_argparser(klass, args, api=None):
+    def from_argparser(klass, args, api=None, db=None):
         if api is None:
             api = API.from_argparser(args)
         if args.lang:
@@ -101,7 +146,12 @@ class PageUpdater:
         else:
             langnames = set()
         interactive = args.interactive if klass.force_interactive is False else True
-        return klass(api, interactive=interactive, dry_run=args.dry_run, first=args.first, title=args.title, langnames=langnames)
+        # the options requiring the database are not set if the script does not set up the database
+        if "incremental" not in args:
+            return klass(api, interactive=interactive, dry_run=args.dry_run, first=args.first, title=args.title, langnames=langnames)
+        max_age = datetime.timedelta(days=args.max_age)
+        return klass(api, interactive=interactive, dry_run=args.dry_run, first=args.first, title=args.title, langnames=langnames,
+                     db=db, incremental=args.incremental, max_age=max_age, page_source=args.page_source)
 
     def add_checker(self, node_type, checker):
         """
@@ -118,6 +168,23 @@ class PageUpdater:
             raise TypeError("node_type must be a subclass of `mwparserfromhell.nodes.Node`")
         checker.interactive = self.interactive
         self.checkers.setdefault(node_type, []).append(checker)
+        self._checkers_by_type.clear()
+        del self.state_version
+
+    def _get_checkers(self, node):
+        """
+        Get the list of checkers registered for the type of the given node
+        (including its base types), in the order of registration.
+        """
+        klass = type(node)
+        try:
+            return self._checkers_by_type[klass]
+        except KeyError:
+            checkers = [checker for node_type, checkers in self.checkers.items()
+                                if issubclass(klass, node_type)
+                                for checker in checkers]
+            self._checkers_by_type[klass] = checkers
+            return checkers
 
     def update_page(self, src_title, text):
         """
@@ -128,10 +195,11 @@ class PageUpdater:
         :returns: a (text, edit_summary) tuple, where text is the updated content
             and edit_summary is the description of performed changes
         """
-        if lang.detect_language(src_title)[0] in self.skip_pages:
+        pure_title = lang.detect_language(src_title)[0]
+        if pure_title in self.skip_pages:
             logger.info("Skipping blacklisted page [[{}]]".format(src_title))
             return text, ""
-        if lang.detect_language(src_title)[0] in self.interactive_only_pages and self.interactive is False:
+        if pure_title in self.interactive_only_pages and self.interactive is False:
             logger.info("Skipping page [[{}]] which is blacklisted for non-interactive mode".format(src_title))
             return text, ""
 
@@ -141,14 +209,16 @@ class PageUpdater:
         summary_parts = []
 
         def gen_nodes():
-            for node_type, checkers in self.checkers.items():
-                for node in wikicode.ifilter(recursive=True, forcetype=node_type):
+            # walk the tree only once, the visitor also records the parents
+            # of the nodes for get_parent_wikicode
+            with NodeVisitor(wikicode, tuple(self.checkers)) as visitor:
+                for parent, node in visitor:
                     # skip templates that may be added or removed
-                    if node_type is mwparserfromhell.nodes.Template and \
+                    if isinstance(node, mwparserfromhell.nodes.Template) and \
                             any(canonicalize(node.name).startswith(prefix) for prefix in self.skip_templates):
                         continue
                     # handle the node with all registered checkers
-                    for checker in checkers:
+                    for checker in self._get_checkers(node):
                         yield checker, node
 
         async def async_exec():
@@ -191,8 +261,16 @@ class PageUpdater:
 
         return str(wikicode), edit_summary
 
-    def _edit(self, title, pageid, text_new, text_old, timestamp, edit_summary):
+    def _edit(self, title, pageid, text_new, text_old, timestamp, edit_summary, on_success=None):
+        """
+        Edit the page (or only show the diff in the dry-run mode).
+
+        :param on_success: a function called without arguments when the page
+                           was edited or when there was nothing to edit
+        """
         if text_old == text_new:
+            if on_success is not None:
+                on_success()
             return
 
         if self.dry_run:
@@ -208,19 +286,109 @@ class PageUpdater:
         if "bot" in self.api.user.rights and edit_summary == "update http to https":
             interactive = False
 
+        if interactive is False:
+            # submit asynchronously so that the next pages can be fetched
+            # and processed while waiting for the rate limit
+            # (the result is checked in _check_pending_edits)
+            future = self.api.edit_queue.submit("edit", title, pageid, text_new, timestamp, edit_summary, bot="")
+            self._pending_edits.append((future, on_success))
+            return
+
+        # print the info message
+        print("\nSuggested edit for page [[{}]]. Please double-check all changes before accepting!".format(title))
+
         try:
-            if interactive is False:
-                self.api.edit(title, pageid, text_new, timestamp, edit_summary, bot="")
+            if "bot" in self.api.user.rights:
+                edit_interactive(self.api, title, pageid, text_old, text_new, timestamp, edit_summary, bot="")
             else:
-                # print the info message
-                print("\nSuggested edit for page [[{}]]. Please double-check all changes before accepting!".format(title))
-
-                if "bot" in self.api.user.rights:
-                    edit_interactive(self.api, title, pageid, text_old, text_new, timestamp, edit_summary, bot="")
-                else:
-                    edit_interactive(self.api, title, pageid, text_old, text_new, timestamp, edit_summary)
+                edit_interactive(self.api, title, pageid, text_old, text_new, timestamp, edit_summary)
         except APIError:
-            pass
+            # the error is logged by API.edit
+            return
+        if on_success is not None:
+            on_success()
+
+    def _check_pending_edits(self, wait=False):
+        """
+        Check the results of the edits submitted into the edit queue, in the
+        order of submission. Failed edits are skipped (API errors are logged
+        by :py:meth:`API.edit <ws.client.api.API.edit>`), other exceptions are
+        re-raised.
+
+        :param bool wait: whether to wait for all pending edits or only check
+                          those which were already completed
+        """
+        while self._pending_edits:
+            future, on_success = self._pending_edits[0]
+            if wait is False and not future.done():
+                break
+            self._pending_edits.popleft()
+            if check_result(future) and on_success is not None:
+                on_success()
+
+    def get_sync_key(self):
+        """
+        Get the key identifying the configuration of the updater for the
+        tracking of processed pages. It consists of the class names of the
+        updater and its checkers and the interactive mode.
+        """
+        checkers = sorted({type(checker).__qualname__ for checkers in self.checkers.values() for checker in checkers})
+        key = "{}.{}:{}".format(type(self).__module__, type(self).__qualname__, ",".join(checkers))
+        if self.interactive is True:
+            key += ":interactive"
+        return key
+
+    @LazyProperty
+    def state_version(self):
+        """
+        Hash of the states of all checkers (see
+        :py:meth:`ws.checkers.CheckerBase.get_state`), which identifies the
+        results stored in the database for reuse. It is ``None`` if some
+        checker is not memoizable or the database is not available.
+        """
+        if self.db is None:
+            return None
+        checkers = {id(checker): checker for checkers in self.checkers.values() for checker in checkers}
+        if not all(getattr(checker, "memoizable", False) for checker in checkers.values()):
+            return None
+        states = sorted((type(checker).__qualname__, checker.get_state()) for checker in checkers.values())
+        data = json.dumps(states, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @property
+    def depends_on_link_targets(self):
+        """
+        Whether some checker depends on the pages linked from the processed
+        pages (see :py:attr:`ws.checkers.CheckerBase.depends_on_link_targets`).
+        """
+        checkers = (checker for checkers in self.checkers.values() for checker in checkers)
+        return any(getattr(checker, "depends_on_link_targets", False) for checker in checkers)
+
+    def get_page_state(self, pageid):
+        """
+        Get the state identifying the result stored for the given page. It is
+        the :py:attr:`state_version`, extended with the state of the pages
+        linked from the given page if some checker depends on them (see
+        :py:meth:`ws.db.page_updater_sync.PageUpdaterSync.get_link_targets_state`).
+        """
+        if self.state_version is None:
+            return None
+        if self.depends_on_link_targets:
+            return "{}:{}".format(self.state_version, self.sync.get_link_targets_state(pageid))
+        return self.state_version
+
+    @property
+    def sync(self):
+        """
+        The :py:class:`ws.db.page_updater_sync.PageUpdaterSync` object for
+        the current configuration, or ``None`` if the database is not available.
+        """
+        if self.db is None:
+            return None
+        key = self.get_sync_key()
+        if self._sync is None or self._sync.key != key:
+            self._sync = PageUpdaterSync(self.db, key)
+        return self._sync
 
     def process_page(self, page):
         """
@@ -230,13 +398,50 @@ class PageUpdater:
         """
         timestamp = page["revisions"][0]["timestamp"]
         text_old = page["revisions"][0]["slots"]["main"]["*"]
-        text_new, edit_summary = self.update_page(page["title"], text_old)
-        self._edit(page["title"], page["pageid"], text_new, text_old, timestamp, edit_summary)
+
+        # reuse the result for the same revision and state if available
+        # (only in the incremental mode, otherwise all pages are processed)
+        result = None
+        revid = page["revisions"][0].get("revid")
+        state = self.get_page_state(page["pageid"])
+        if self.incremental is True and state is not None and revid is not None:
+            result = self.sync.get_result(page["pageid"], revid, state, max_age=self.max_age)
+        if result is not None:
+            text_new, edit_summary = result
+            if text_new is None:
+                logger.debug("Skipping page [[{}]], revision {} was already processed.".format(page["title"], revid))
+                return
+            logger.info("Reusing the result for page [[{}]], revision {}.".format(page["title"], revid))
+        else:
+            text_new, edit_summary = self.update_page(page["title"], text_old)
+
+        if text_new != text_old:
+            # make sure that we do not edit an outdated revision
+            current = self.page_source.confirm(page)
+            if current is None:
+                logger.warning("Page [[{}]] was deleted in the meantime, skipping.".format(page["title"]))
+                return
+            if current is not page:
+                page = current
+                timestamp = page["revisions"][0]["timestamp"]
+                text_old = page["revisions"][0]["slots"]["main"]["*"]
+                text_new, edit_summary = self.update_page(page["title"], text_old)
+                result = None
+
+        # the page is marked as processed only after a successful edit
+        # (dry runs do not change anything, so the page is not marked at all)
+        # (reused results are not stored again to keep their original timestamp)
+        if self.sync is not None and not self.dry_run and result is None and "revid" in page["revisions"][0]:
+            on_success = functools.partial(self.sync.set_processed, page["pageid"], page["revisions"][0]["revid"], state=state,
+                                           text=text_new if text_new != text_old else None, summary=edit_summary)
+        else:
+            on_success = None
+        self._edit(page["title"], page["pageid"], text_new, text_old, timestamp, edit_summary, on_success=on_success)
 
     def generate_pages(self):
         # handle the trivial case first
         if self.title is not None:
-            result = self.api.call_api(action="query", prop="revisions", rvprop="content|timestamp", rvslots="main", titles=self.title)
+            result = self.api.call_api(action="query", prop="revisions", rvprop="content|timestamp|ids", rvslots="main", titles=self.title)
             yield list(result["pages"].values())[0]
             return
 
@@ -256,20 +461,44 @@ class PageUpdater:
             # apfrom must be without namespace prefix
             apfrom = _title.pagename
 
+        if self.incremental is True:
+            yield from self._generate_pages_incremental(namespaces, apfrom)
+            return
+
         for ns in namespaces:
-            for page in self.api.generator(generator="allpages", gaplimit="100", gapnamespace=ns, gapfrom=apfrom, gapfilterredir=self.apfilterredir,
-                                           prop="revisions", rvprop="content|timestamp", rvslots="main"):
-                # if the user is not logged in, the limit for revisions may be lower than gaplimit,
-                # in which case the generator will yield some pages multiple times without revisions
-                # before the query-continuation kicks in
-                if "revisions" not in page:
-                    continue
+            for page in self.page_source.allpages(ns, first=apfrom, filterredir=self.apfilterredir):
                 if self.langnames and lang.detect_language(page["title"])[1] not in self.langnames:
                     continue
                 yield page
             # the apfrom parameter is valid only for the first namespace
             apfrom = ""
 
+    def _generate_pages_incremental(self, namespaces, apfrom):
+        """
+        Like :py:meth:`generate_pages`, but the pages are selected from the
+        database (which should be synchronized beforehand) and only the
+        content of the pages which need to be processed is fetched from the
+        page source.
+        """
+        for ns in namespaces:
+            pages = self.sync.get_pages(ns, filterredir=self.apfilterredir, max_age=self.max_age, first=apfrom,
+                                        state=self.state_version, link_targets=self.depends_on_link_targets)
+            if self.langnames:
+                languages = lang.detect_languages(page["title"] for page in pages)
+                pages = [page for page in pages if languages[page["title"]][1] in self.langnames]
+            logger.info("Selected {} pages in namespace {} for the incremental update".format(len(pages), ns))
+
+            yield from self.page_source.pages_by_ids([page["pageid"] for page in pages])
+            # the apfrom parameter is valid only for the first namespace
+            apfrom = ""
+
     def run(self):
-        for page in self.generate_pages():
-            self.process_page(page)
+        try:
+            for page in self.generate_pages():
+                self.process_page(page)
+                self._check_pending_edits()
+        finally:
+            # wait for the edits submitted asynchronously (the worker thread
+            # would discard them when the script exits)
+            self.api.edit_queue.join()
+        self._check_pending_edits(wait=True)
@@ -1,11 +1,60 @@
 #! /usr/bin/env python3
 
+import functools
 import string
 import re
 import unicodedata
 
 __all__ = ["encode", "decode", "dotencode", "anchorencode", "urlencode", "urldecode", "queryencode", "querydecode"]
 
+class _EncodingTable(dict):
+    """
+    Translation table for :py:meth:`str.translate` implementing the encoding
+    of single characters. Entries for ASCII characters are precomputed (and
+    also available as the :py:attr:`ascii` tuple, which is faster for ASCII-only
+    strings), other entries are computed and stored on first use.
+
+    :param should_encode: a function returning ``True`` for characters which
+        should be encoded
+    :param escape_char: see :py:func:`encode`
+    :param special_map: see :py:func:`encode`
+    :param charset: see :py:func:`encode`
+    :param errors: see :py:func:`encode`
+    """
+    def __init__(self, should_encode, escape_char, special_map, charset, errors):
+        super().__init__()
+        self.should_encode = should_encode
+        self.escape_char = escape_char
+        self.special_map = special_map or {}
+        self.charset = charset
+        self.errors = errors
+        self.ascii = tuple(self[code] for code in range(128))
+
+    def __missing__(self, code):
+        char = chr(code)
+        if not self.should_encode(char):
+            # map to itself (None would delete the character)
+            value = code
+        elif char in self.special_map:
+            value = self.special_map[char]
+        else:
+            value = "".join("{}{:02X}".format(self.escape_char, byte) for byte in bytes(char, self.charset, self.errors))
+        self[code] = value
+        return value
+
+    def translate(self, str_):
+        if str_.isascii():
+            return str_.translate(self.ascii)
+        return str_.translate(self)
+
+@functools.lru_cache(maxsize=64)
+def _get_encoding_table(escape_char, encode_chars, skip_chars, special_items, charset, errors):
+    encode_chars = frozenset(encode_chars)
+    skip_chars = frozenset(skip_chars)
+    def should_encode(char):
+        return (not encode_chars or char in encode_chars) and char not in skip_chars
+    return _EncodingTable(should_encode, escape_char, dict(special_items), charset, errors)
+
 def encode(str_, escape_char="%", encode_chars="", skip_chars="", special_map=None, charset="utf-8", errors="strict"):
     """
     Generalized implementation of a `percent encoding`_ algorithm.
@@ -24,20 +73,15 @@ def encode(str_, escape_char="%", encode_chars="", skip_chars="", special_map=No
     :param errors: defines behaviour when encoding non-ASCII characters to bytes
         fails (passed to :py:meth:`str.encode()`)
     """
-    output = ""
-    for char in str_:
-        if encode_chars == "" or char in encode_chars:
-            if char not in skip_chars:
-                if special_map is not None and char in special_map:
-                    output += special_map[char]
-                else:
-                    for byte in bytes(char, charset, errors):
-                        output += "{}{:02X}".format(escape_char, byte)
-            else:
-                output += char
-        else:
-            output += char
-    return output
+    # the translation tables are cached for each combination of the parameters
+    special_items = tuple(sorted(special_map.items())) if special_map else ()
+    table = _get_encoding_table(escape_char, encode_chars, skip_chars, special_items, charset, errors)
+    return table.translate(str_)
+
+@functools.lru_cache(maxsize=64)
+def _get_decoding_regex(escape_char):
+    # matches runs of consecutive encoded octets
+    return re.compile("(?:{}[0-9A-Fa-f]{{2}})+".format(re.escape(escape_char)))
 
 def decode(str_, escape_char="%", special_map=None, charset="utf-8", errors="strict"):
     """
@@ -59,24 +103,43 @@ def decode(str_, escape_char="%", special_map=None, charset="utf-8", errors="str
     :param errors:
         defines behaviour when byte-decoding with :py:meth:`bytes.decode()` fails
     """
-    tok = re.compile(escape_char + "([0-9A-Fa-f]{2})|(.)", re.DOTALL)
-    output = ""
-    barr = bytearray()
-    for match in tok.finditer(str_):
-        enc_couple, char = match.groups()
-        if enc_couple:
-            barr.append(int(enc_couple, 16))
-        else:
-            if len(barr) > 0:
-                output += barr.decode(charset, errors)
-                barr = bytearray()
-            if special_map is not None and char in special_map:
-                output += special_map[char]
-            else:
-                output += char
-    if len(barr) > 0:
-        output += barr.decode(charset, errors)
-    return output
+    if special_map:
+        # only single characters can be matched
+        special_map = str.maketrans({key: value for key, value in special_map.items() if len(key) == 1})
+    if escape_char not in str_:
+        return str_.translate(special_map) if special_map else str_
+
+    output = []
+    pos = 0
+    for match in _get_decoding_regex(escape_char).finditer(str_):
+        text = str_[pos:match.start()]
+        output.append(text.translate(special_map) if special_map else text)
+        octets = bytes.fromhex(match.group().replace(escape_char, ""))
+        output.append(octets.decode(charset, errors))
+        pos = match.end()
+    text = str_[pos:]
+    output.append(text.translate(special_map) if special_map else text)
+    return "".join(output)
+
+def _should_anchorencode(char):
+    # encode sensitive characters - the output of anchorencode should be usable
+    # in MediaWiki links
+    # MW incompatibility: MediaWiki's safeEncodeAttribute sanitizer function
+    # replaces even more tokens with HTML entities, but they do not appear in
+    # the output of the {{anchorencode:}} magic word (substituted back into the
+    # original characters in a next parse stage?)
+    # Otherwise encode only characters from the Separator and Other categories
+    # https://en.wikipedia.org/wiki/Unicode#General_Category_property
+    return char in "[]|" or unicodedata.category(char)[0] in {"Z", "C"}
+
+# translation tables of the encoding profiles
+_DOTENCODE_TABLE = _get_encoding_table(".", "", string.ascii_letters + string.digits + "-_.:", ((" ", "_"),), "utf-8", "strict")
+# html5 spec says ids must not contain spaces (although only some of them are
+# possible in wikitext using either Lua or HTML entities)
+_ANCHORENCODE_TABLE = _EncodingTable(_should_anchorencode, "%", dict((c, "_") for c in string.whitespace), "utf-8", "strict")
+_URLENCODE_TABLE = _get_encoding_table("%", "", string.ascii_letters + string.digits + "-_.~", (), "utf-8", "strict")
+_QUERYENCODE_TABLE = _get_encoding_table("%", "", string.ascii_letters + string.digits + "-_.", ((" ", "+"),), "utf-8", "strict")
+_QUERYDECODE_MAP = {"+": " "}
 
 def _anchor_preprocess(str_):
     """
@@ -112,9 +175,7 @@ def dotencode(str_):
     .. _`T20431`: https://phabricator.wikimedia.org/T20431
     .. _`$wgFragmentMode`: https://www.mediawiki.org/wiki/Manual:$wgFragmentMode
     """
-    skipped = string.ascii_letters + string.digits + "-_.:"
-    special = {" ": "_"}
-    return encode(_anchor_preprocess(str_), escape_char=".", skip_chars=skipped, special_map=special)
+    return _DOTENCODE_TABLE.translate(_anchor_preprocess(str_))
 
 def anchorencode(str_, format="html5"):
     """
@@ -139,35 +200,7 @@ def anchorencode(str_, format="html5"):
     str_ = _anchor_preprocess(str_)
     # encode "%" from percent-encoded octets
     str_ = re.sub(r"%([a-fA-F0-9]{2})", r"%25\g<1>", str_)
-    # html5 spec says ids must not contain spaces (although only
-    # some of them are possible in wikitext using either Lua or
-    # HTML entities)
-    special_map = dict((c, "_") for c in string.whitespace)
-    escape_char = "%"
-    charset = "utf-8"
-    errors = "strict"
-    # encode sensitive characters - the output of this function should be usable
-    # in MediaWiki links
-    # MW incompatibility: MediaWiki's safeEncodeAttribute sanitizer function
-    # replaces even more tokens with HTML entities, but they do not appear in
-    # the output of the {{anchorencode:}} magic word (substituted back into the
-    # original characters in a next parse stage?)
-    encode_chars = "[]|"
-    # below is the code from the encode function, but without the skip_chars
-    # parameter and adjusted for unicode categories
-    output = ""
-    for char in str_:
-        # encode only characters from the Separator and Other categories
-        # https://en.wikipedia.org/wiki/Unicode#General_Category_property
-        if char in encode_chars or unicodedata.category(char)[0] in {"Z", "C"}:
-            if special_map is not None and char in special_map:
-                output += special_map[char]
-            else:
-                for byte in bytes(char, charset, errors):
-                    output += "{}{:02X}".format(escape_char, byte)
-        else:
-            output += char
-    return output
+    return _ANCHORENCODE_TABLE.translate(str_)
 
 def urlencode(str_):
     """
@@ -177,8 +210,7 @@ def urlencode(str_):
     .. _`Wikipedia`: https://en.wikipedia.org/wiki/Percent-encoding
     .. _`comparison table`: https://www.mediawiki.org/wiki/Manual:PAGENAMEE_encoding#Encodings_compared
     """
-    skipped = string.ascii_letters + string.digits + "-_.~"
-    return encode(str_, skip_chars=skipped)
+    return _URLENCODE_TABLE.translate(str_)
 
 def urldecode(str_):
     """
@@ -193,13 +225,10 @@ def queryencode(str_):
 
     .. _`MediaWiki`: https://www.mediawiki.org/wiki/Manual:PAGENAMEE_encoding#Encodings_compared
     """
-    skipped = string.ascii_letters + string.digits + "-_."
-    special = {" ": "+"}
-    return encode(str_, skip_chars=skipped, special_map=special)
+    return _QUERYENCODE_TABLE.translate(str_)
 
 def querydecode(str_):
     """
     An inverse function to :py:func:`queryencode`.
     """
-    special = {"+": " "}
-    return decode(str_, special_map=special)
+    return decode(str_, special_map=_QUERYDECODE_MAP)
@@ -1,8 +1,12 @@
 #! /usr/bin/env python3
 
 import logging
+import re
+from itertools import chain
 
 import mwparserfromhell
+from mwparserfromhell.definitions import is_scheme
+from mwparserfromhell.utils import parse_anything
 
 from . import encodings
 from .title import Title, TitleError
@@ -228,8 +232,22 @@ class MagicWords:
         "#titleparts",
     }
 
+    # variables which are replaced with an attribute of the source title
+    TITLE_VARIABLES = {
+        "FULLPAGENAME": "fullpagename",
+        "PAGENAME": "pagename",
+        "BASEPAGENAME": "basepagename",
+        "SUBPAGENAME": "subpagename",
+        "SUBJECTPAGENAME": "articlepagename",
+        "ARTICLEPAGENAME": "articlepagename",
+        "TALKPAGENAME": "talkpagename",
+        "ROOTPAGENAME": "rootpagename",
+    }
+
     def __init__(self, src_title):
         self.src_title = src_title
+        # values of TITLE_VARIABLES, evaluated at most once per source title
+        self._title_values = {}
 
     @classmethod
     def is_magic_word(klass, name):
@@ -245,53 +263,157 @@ class MagicWords:
             return True
         return False
 
-    def get_replacement(self, magic):
+    def _evaluate(self, magic):
+        """
+        Evaluate the magic word. Returns a string, a wikicode object taken
+        from the parameters of ``magic``, or ``None`` if the magic word is
+        not handled.
+        """
         name = str(magic.name).strip()
 
-        if name == "FULLPAGENAME":
-            return self.src_title.fullpagename
-        elif name == "PAGENAME":
-            return self.src_title.pagename
-        elif name == "BASEPAGENAME":
-            return self.src_title.basepagename
-        elif name == "SUBPAGENAME":
-            return self.src_title.subpagename
-        elif name == "SUBJECTPAGENAME" or name == "ARTICLEPAGENAME":
-            return self.src_title.articlepagename
-        elif name == "TALKPAGENAME":
-            return self.src_title.talkpagename
-        elif name == "ROOTPAGENAME":
-            return self.src_title.rootpagename
+        if name in self.TITLE_VARIABLES:
+            try:
+                return self._title_values[name]
+            except KeyError:
+                value = getattr(self.src_title, self.TITLE_VARIABLES[name])
+                self._title_values[name] = value
+                return value
 
         elif ":" in name:
             prefix, arg = name.split(":", maxsplit=1)
-            prefix = prefix.lower()
+            handler = self._parser_functions.get(prefix.lower())
+            if handler is not None:
+                return handler(self, magic, arg)
 
-            if prefix == "urlencode":
-                return encodings.queryencode(arg)
-            elif prefix == "anchorencode":
-                return encodings.anchorencode(arg)
-            elif prefix == "#if":
+    def get_replacement(self, magic):
+        """
+        Get the replacement for a magic word.
+
+        :param magic: the :py:class:`mwparserfromhell.nodes.template.Template`
+                      object representing the magic word
+        :returns: the replacement string, or ``None`` if the magic word is
+                  not handled
+        """
+        replacement = self._evaluate(magic)
+        if replacement is None or isinstance(replacement, str):
+            return replacement
+        return str(replacement).strip()
+
+    def evaluate(self, magic):
+        """
+        Like :py:meth:`get_replacement`, but the replacement is returned as a
+        :py:class:`mwparserfromhell.wikicode.Wikicode` object. The selected
+        branches of parser functions like ``{{#if:}}`` are taken from the
+        parameters of ``magic`` instead of being parsed again, so ``magic``
+        must be replaced with the result (or discarded).
+        """
+        replacement = self._evaluate(magic)
+        if replacement is None:
+            return None
+        if isinstance(replacement, str):
+            return _parse_text(replacement)
+        _strip_wikicode(replacement)
+        return replacement
+
+    def _urlencode(self, magic, arg):
+        return encodings.queryencode(arg)
+
+    def _anchorencode(self, magic, arg):
+        return encodings.anchorencode(arg)
+
+    def _if(self, magic, arg):
+        try:
+            if arg.strip():
+                return magic.get(1).value
+            else:
+                return magic.get(2).value
+        except ValueError:
+            return ""
+
+    def _switch(self, magic, arg):
+        # MW incompatibility: fall-thgourh cases are not supported
+        try:
+            return magic.get(str(arg).strip()).value
+        except ValueError:
+            try:
+                return magic.get("#default").value
+            except ValueError:
                 try:
-                    if arg.strip():
-                        return magic.get(1).value.strip()
-                    else:
-                        return magic.get(2).value.strip()
+                    return magic.get(1).value
                 except ValueError:
                     return ""
-            elif prefix == "#switch":
-                # MW incompatibility: fall-thgourh cases are not supported
-                try:
-                    replacement = magic.get(str(arg).strip()).value
-                except ValueError:
-                    try:
-                        replacement = magic.get("#default").value
-                    except ValueError:
-                        try:
-                            replacement = magic.get(1).value
-                        except ValueError:
-                            replacement = ""
-                return replacement.strip()
+
+    # handled parser functions
+    _parser_functions = {
+        "urlencode": _urlencode,
+        "anchorencode": _anchorencode,
+        "#if": _if,
+        "#switch": _switch,
+    }
+
+# characters which may produce other nodes than text when parsed
+_MARKUP_REGEX = re.compile(r"[\[\]{}<>&'\n]|^(?:[*#;:=]|----)|=$|//")
+# candidates for the scheme of free external links without slashes, e.g. "mailto:"
+_SCHEME_REGEX = re.compile(r"(\w+):")
+
+def _parse_text(text):
+    """
+    Parse a string into a :py:class:`mwparserfromhell.wikicode.Wikicode`
+    object. Strings without any markup are wrapped in a single text node
+    without running the tokenizer.
+    """
+    if _MARKUP_REGEX.search(text) is None and \
+            not any(is_scheme(scheme, slashes=False) for scheme in _SCHEME_REGEX.findall(text)):
+        return mwparserfromhell.wikicode.Wikicode([mwparserfromhell.nodes.text.Text(text)])
+    return mwparserfromhell.parse(text)
+
+def _strip_wikicode(wikicode):
+    """
+    Strip leading and trailing whitespace from the wikicode in place, like
+    :py:meth:`str.strip` does for its string representation.
+    """
+    nodes = wikicode.nodes
+    while nodes and isinstance(nodes[0], mwparserfromhell.nodes.text.Text):
+        nodes[0].value = nodes[0].value.lstrip()
+        if nodes[0].value:
+            break
+        del nodes[0]
+    while nodes and isinstance(nodes[-1], mwparserfromhell.nodes.text.Text):
+        nodes[-1].value = nodes[-1].value.rstrip()
+        if nodes[-1].value:
+            break
+        del nodes[-1]
+
+class _NodeReplacer:
+    """
+    Replaces nodes in their parent wikicode without the linear search in
+    :py:meth:`mwparserfromhell.wikicode.Wikicode.replace`, which would make
+    the template expansion quadratic in the number of nodes.
+
+    The nodes are usually replaced in the document order, so the search for
+    the node in its parent starts where the previous replacement in the same
+    parent ended.
+    """
+
+    def __init__(self):
+        # mapping of id(parent) to (parent, index) tuples (the parent is
+        # stored to keep it alive, otherwise the id could be reused)
+        self._hints = {}
+
+    def _find(self, parent, node):
+        nodes = parent.nodes
+        entry = self._hints.get(id(parent))
+        start = entry[1] if entry is not None and entry[0] is parent else 0
+        for i in chain(range(start, len(nodes)), range(min(start, len(nodes)))):
+            if nodes[i] is node:
+                return i
+        raise ValueError(node)
+
+    def replace(self, parent, node, value):
+        index = self._find(parent, node)
+        new_nodes = parse_anything(value).nodes
+        parent.nodes[index:index + 1] = new_nodes
+        self._hints[id(parent)] = (parent, index + len(new_nodes))
 
 def prepare_content_for_rendering(wikicode):
     """
@@ -463,14 +585,12 @@ def expand_templates(title, wikicode, content_getter_func, *,
                 if substitute_magic_words is True:
                     # MW incompatibility: in some cases, MediaWiki tries to transclude a template
                     # if the parser function failed (e.g. "{{ns:Foo}}" -> "{{Template:Ns:Foo}}")
-                    mw = MagicWords(title)
-                    replacement = mw.get_replacement(template)
+                    replacement = magic_words.evaluate(template)
                     if replacement is not None:
                         # expand the replacement to handle nested magic words in parser functions like {{#if:}})
-                        replacement = mwparserfromhell.parse(replacement)
                         expand(title, replacement, content_getter_func, visited_templates)
 #                        wikicode.replace(template, replacement)
-                        parent.replace(template, replacement, recursive=False)
+                        replacer.replace(parent, template, replacement)
             else:
                 try:
                     target_title = get_target_title(title, name)
@@ -485,7 +605,7 @@ def expand_templates(title, wikicode, content_getter_func, *,
                         # If the target page does not exist, MediaWiki just skips the expansion,
                         # but it renders a wikilink to the non-existing page.
 #                        wikicode.replace(template, "[[{}]]".format(target_title))
-                        parent.replace(template, "[[{}]]".format(target_title), recursive=False)
+                        replacer.replace(parent, template, "[[{}]]".format(target_title))
                     else:
                         # Restore the modifier, but don't render a wikilink.
                         template.name = original_name
@@ -535,7 +655,12 @@ def expand_templates(title, wikicode, content_getter_func, *,
                     content = mwparserfromhell.nodes.text.Text("")
 
 #                wikicode.replace(template, content)
-                parent.replace(template, content, recursive=False)
+                replacer.replace(parent, template, content)
+
+    # the title is the same for all nested transclusions, so the values of
+    # the magic words derived from it can be shared
+    magic_words = MagicWords(title)
+    replacer = _NodeReplacer()
 
     prepare_content_for_rendering(wikicode)
     expand(title, wikicode, content_getter_func, set())
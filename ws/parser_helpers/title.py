@@ -2,13 +2,14 @@
 
 import re
 from copy import copy, deepcopy
+from functools import lru_cache
 import os.path
+import types
 
 # only for explicit type check in Title.parse
 import mwparserfromhell
 
 from .encodings import _anchor_preprocess, urldecode
-from ..utils import find_caseless
 
 __all__ = ["canonicalize", "Context", "Title", "TitleError", "InvalidTitleCharError", "InvalidColonError", "DatabaseTitleError"]
 
@@ -55,6 +56,8 @@ class Context:
         about the namespace, such as names or case-sensitiveness
     :param str legaltitlechars:
         string of characters which are allowed to occur in page titles
+    :param int parse_cache_size:
+        maximum number of parse results cached by the context (see below)
 
     Normally, the user does not interact with the :py:class:`Context` class.
     Both the API and Database classes provide shortcut functions
@@ -62,13 +65,38 @@ class Context:
     :py:func:`Database.Title <ws.db.database.Database.Title>`, respectively)
     which construct the necessary context and pass it to the
     :py:class:`Title` class.
+
+    The context is immutable: the mappings are exposed as read-only views and
+    the case-insensitive lookup tables for interwiki prefixes and namespace
+    names are built only once. This allows to share one context among all
+    titles parsed for the same wiki and to cache the results of
+    :py:meth:`Title.parse` for recurring title strings in a bounded LRU cache.
+    Each :py:class:`Title` object gets its own copy of the parsed attributes,
+    so cached results are never affected by the setters.
     """
-    def __init__(self, interwikimap, namespacenames, namespaces, legaltitlechars):
-        self.interwikimap = interwikimap
-        self.namespacenames = namespacenames
-        self.namespaces = namespaces
+    def __init__(self, interwikimap, namespacenames, namespaces, legaltitlechars, *, parse_cache_size=4096):
+        self.interwikimap = types.MappingProxyType(interwikimap)
+        self.namespacenames = types.MappingProxyType(namespacenames)
+        self.namespaces = types.MappingProxyType(namespaces)
         self.legaltitlechars = legaltitlechars
 
+        # case-insensitive lookup tables (the first match wins, same as with find_caseless)
+        self._iwprefixes = {}
+        for prefix in interwikimap:
+            self._iwprefixes.setdefault(prefix.lower(), prefix)
+        self._namespacenames = {}
+        for name in namespacenames:
+            self._namespacenames.setdefault(name.lower(), name)
+
+        # FIXME: how does MediaWiki handle unicode titles?  https://phabricator.wikimedia.org/T139881
+        # as a workaround, any UTF-8 character, which is not an ASCII character, is allowed
+        # Note: \uFFFF is not the last UTF-8 character, it is \U0010FFFF (can be checked with hex(sys.maxunicode))
+        # see https://en.wikipedia.org/wiki/UTF-8#Description
+        self._illegal_chars = re.compile("[^{}\\u0100-\\U0010FFFF]".format(legaltitlechars))
+
+        # bounded cache of the parse results (exceptions are not cached)
+        self._parse_cached = lru_cache(maxsize=parse_cache_size)(self._parse)
+
     @classmethod
     def from_api(klass, api):  # pragma: no cover
         """
@@ -96,11 +124,132 @@ class Context:
         Standard equality comparison operator. Comparing API-based and
         Database-based contexts is possible.
         """
+        # shortcut for titles sharing the same context
+        if self is other:
+            return True
         return self.interwikimap == other.interwikimap and \
                self.namespacenames == other.namespacenames and \
                self.namespaces == other.namespaces and \
                self.legaltitlechars == other.legaltitlechars
 
+    def find_iwprefix(self, iw):
+        """
+        Find a valid interwiki prefix in the context.
+
+        :param str iw: the interwiki prefix to look up (case-insensitive)
+        :returns: the interwiki prefix as present in the ``interwikimap``
+        :raises ValueError: when the prefix is not valid
+        """
+        # strip spaces
+        iw = iw.replace("_", " ").strip()
+        # convert spaces to underscores to make the lookup work
+        # (Note that MediaWiki's Special:Interwiki page does not allow interwiki prefixes
+        # with spaces, but [[foo bar:Some page]] is valid as an interwiki link.)
+        iw = iw.replace(" ", "_")
+        try:
+            return self._iwprefixes[iw.lower()]
+        except KeyError:
+            raise ValueError(iw)
+
+    def find_namespace(self, ns):
+        """
+        Find a valid namespace name in the context.
+
+        :param str ns: the namespace name to look up (case-insensitive)
+        :returns: the namespace name as present in the ``namespacenames``
+        :raises ValueError: when the namespace name is not valid
+        """
+        try:
+            return self._namespacenames[canonicalize(ns).lower()]
+        except KeyError:
+            raise ValueError(ns)
+
+    def check_pagename(self, pagename):
+        """
+        Decode and canonicalize the page name and check that it contains only
+        legal title characters.
+
+        :param str pagename: the page name to check
+        :returns: the canonical form of the page name
+        :raises InvalidColonError: when the page name starts with a colon
+        :raises InvalidTitleCharError: when the page name contains illegal characters
+        """
+        if pagename.startswith(":"):
+            raise InvalidColonError("The ``pagename`` part cannot start with a colon: '{}'".format(pagename))
+
+        # MediaWiki does not treat encoded underscores as spaces (e.g.
+        # [[Main%5Fpage]] is rendered as <a href="...">Main_page</a>),
+        # but we focus on meaning, not rendering.
+        pagename = urldecode(pagename)
+        if self._illegal_chars.search(pagename):
+            raise InvalidTitleCharError("Given title contains illegal character(s): '{}'".format(pagename))
+        # canonicalize title
+        return canonicalize(pagename)
+
+    def parse(self, full_title):
+        """
+        Split a full title into ``(leading_colon, iwprefix, namespace,
+        pagename, sectionname)`` parts and canonicalize them. Results for
+        recurring title strings are taken from a bounded cache.
+
+        This is the backend of :py:meth:`Title.parse`, see the description
+        there.
+
+        :param str full_title: the full title to be parsed
+        :returns: a tuple of five strings
+        """
+        return self._parse_cached(full_title)
+
+    def _parse(self, full_title):
+        """
+        Uncached implementation of :py:meth:`parse`.
+        """
+        leading_colon = ":" if full_title.startswith(":") else ""
+
+        def lstrip_one(text, char):
+            if text.startswith(char):
+                return text.replace(char, "", 1)
+            return text
+
+        # parse interwiki prefix
+        try:
+            iw, _rest = lstrip_one(full_title, ":").split(":", maxsplit=1)
+            iw = self.find_iwprefix(iw)
+        except ValueError:
+            iw = ""
+
+        if iw:
+            # [[wikipedia::Foo]] is valid
+            _rest = _rest.lstrip(":")
+        else:
+            # reset _rest if the interwiki prefix is empty
+            _rest = lstrip_one(full_title, ":")
+            if _rest.startswith(":"):
+                raise InvalidColonError("The ``pagename`` part cannot start with a colon: '{}'".format(_rest))
+
+        # parse namespace
+        try:
+            ns, _pure = _rest.split(":", maxsplit=1)
+            if iw == "" or "local" in self.interwikimap[iw]:
+                ns = self.find_namespace(ns)
+            elif canonicalize(ns):
+                raise ValueError("non-empty namespace for an interwiki link")
+            else:
+                ns = ""
+        except ValueError:
+            ns = ""
+            _pure = _rest
+
+        # split section anchor
+        try:
+            _pure, anchor = _pure.split("#", maxsplit=1)
+        except ValueError:
+            anchor = ""
+
+        pure = self.check_pagename(_pure)
+        anchor = _anchor_preprocess(anchor)
+        return leading_colon, iw, ns, pure, anchor
+
 class Title:
     """
     A helper class intended for easy manipulation with wiki titles. Title
@@ -116,6 +265,9 @@ class Title:
     .. _`magic words`: https://www.mediawiki.org/wiki/Help:Magic_words#Page_names
     """
 
+    # titles are created in large numbers, avoid the per-instance __dict__
+    __slots__ = ("context", "iw", "ns", "pure", "anchor", "_leading_colon")
+
     def __init__(self, context, title):
         """
         :param Context context:
@@ -152,17 +304,11 @@ class Title:
             raise TypeError("iwprefix must be of type 'str'")
 
         try:
-            # strip spaces
-            iw = iw.replace("_", " ").strip()
-            # convert spaces to underscores to make find_caseless work
-            # (Note that MediaWiki's Special:Interwiki page does not allow interwiki prefixes
-            # with spaces, but [[foo bar:Some page]] is valid as an interwiki link.)
-            iw = iw.replace(" ", "_")
             # check if it is valid interwiki prefix
-            self.iw = find_caseless(iw, self.context.interwikimap.keys(), from_target=True)
+            self.iw = self.context.find_iwprefix(iw)
         except ValueError:
-            if iw == "":
-                self.iw = iw
+            if iw.replace("_", " ").strip() == "":
+                self.iw = ""
             else:
                 raise ValueError("tried to assign invalid interwiki prefix: {}".format(iw))
 
@@ -177,7 +323,7 @@ class Title:
             ns = canonicalize(ns)
             if self.iw == "" or "local" in self.context.interwikimap[self.iw]:
                 # check if it is valid namespace
-                self.ns = find_caseless(ns, self.context.namespacenames, from_target=True)
+                self.ns = self.context.find_namespace(ns)
             elif ns:
                 raise ValueError("tried to assign non-empty namespace '{}' to an interwiki link".format(ns))
             else:
@@ -192,21 +338,7 @@ class Title:
         if not isinstance(pagename, str):
             raise TypeError("pagename must be of type 'str'")
 
-        if pagename.startswith(":"):
-            raise InvalidColonError("The ``pagename`` part cannot start with a colon: '{}'".format(pagename))
-
-        # MediaWiki does not treat encoded underscores as spaces (e.g.
-        # [[Main%5Fpage]] is rendered as <a href="...">Main_page</a>),
-        # but we focus on meaning, not rendering.
-        pagename = urldecode(pagename)
-        # FIXME: how does MediaWiki handle unicode titles?  https://phabricator.wikimedia.org/T139881
-        # as a workaround, any UTF-8 character, which is not an ASCII character, is allowed
-        # Note: \uFFFF is not the last UTF-8 character, it is \U0010FFFF (can be checked with hex(sys.maxunicode))
-        # see https://en.wikipedia.org/wiki/UTF-8#Description
-        if re.search("[^{}\\u0100-\\U0010FFFF]".format(self.context.legaltitlechars), pagename):
-            raise InvalidTitleCharError("Given title contains illegal character(s): '{}'".format(pagename))
-        # canonicalize title
-        self.pure = canonicalize(pagename)
+        self.pure = self.context.check_pagename(pagename)
 
     def _set_sectionname(self, sectionname):
         """
@@ -236,46 +368,9 @@ class Title:
             raise TypeError("full_title must be either 'str' or 'Wikicode'")
         full_title = str(full_title)
 
-        if full_title.startswith(":"):
-            self._leading_colon = ":"
-
-        def lstrip_one(text, char):
-            if text.startswith(char):
-                return text.replace(char, "", 1)
-            return text
-
-        # parse interwiki prefix
-        try:
-            iw, _rest = lstrip_one(full_title, ":").split(":", maxsplit=1)
-            self._set_iwprefix(iw)
-        except ValueError:
-            self.iw = ""
-
-        if self.iw:
-            # [[wikipedia::Foo]] is valid
-            _rest = _rest.lstrip(":")
-        else:
-            # reset _rest if the interwiki prefix is empty
-            _rest = lstrip_one(full_title, ":")
-            if _rest.startswith(":"):
-                raise InvalidColonError("The ``pagename`` part cannot start with a colon: '{}'".format(_rest))
-
-        # parse namespace
-        try:
-            ns, _pure = _rest.split(":", maxsplit=1)
-            self._set_namespace(ns)
-        except ValueError:
-            self.ns = ""
-            _pure = _rest
-
-        # split section anchor
-        try:
-            _pure, anchor = _pure.split("#", maxsplit=1)
-        except ValueError:
-            anchor = ""
-
-        self._set_pagename(_pure)
-        self._set_sectionname(anchor)
+        leading_colon, self.iw, self.ns, self.pure, self.anchor = self.context.parse(full_title)
+        if leading_colon:
+            self._leading_colon = leading_colon
 
     def format(self, *, iwprefix=False, namespace=False, sectionname=False, colon=False):
         """
@@ -12,7 +12,7 @@ __all__ = [
     "strip_markup", "get_adjacent_node", "get_parent_wikicode", "remove_and_squash",
     "get_section_headings", "get_anchors", "ensure_flagged_by_template",
     "ensure_unflagged_by_template", "is_flagged_by_template", "is_redirect",
-    "parented_ifilter",
+    "parented_ifilter", "NodeVisitor",
 ]
 
 def strip_markup(text, normalize=True, collapse=True):
@@ -54,7 +54,17 @@ def get_parent_wikicode(wikicode, node):
     """
     Returns the parent of `node` as a `wikicode` object.
     Raises :exc:`ValueError` if `node` is not a descendant of `wikicode`.
+
+    If `wikicode` is being walked by a :py:class:`NodeVisitor`, the parent
+    recorded by the visitor is used when it still contains the node and is
+    still reachable from `wikicode`, so only the siblings of the ancestors of
+    the node are checked instead of searching the whole tree.
     """
+    visitor = _active_visitors.get(id(wikicode))
+    if visitor is not None:
+        parent = visitor._get_attached_parent(node)
+        if parent is not None:
+            return parent
     context, index = wikicode._do_strong_search(node, True)
     return context
 
@@ -136,6 +146,10 @@ def get_section_headings(text):
     matches = re.findall(r"^((\={1,6})[^\S\n]*)([^\n]+?)([^\S\n]*(\2))[^\S\n]*$", text, flags=re.MULTILINE | re.DOTALL)
     return [match[2] for match in matches]
 
+# headings which may contain markup stripped by strip_markup (or which are not
+# parsed as a heading by mwparserfromhell when wrapped in "=")
+_HEADING_MARKUP_REGEX = re.compile(r"[\[\]{}<>&'\n\x00]|^=|=$")
+
 def get_anchors(headings, pretty=False, suffix_sep="_"):
     """
     Converts section headings to anchors.
@@ -161,25 +175,37 @@ def get_anchors(headings, pretty=False, suffix_sep="_"):
         section names
     :returns: list of section anchors
     """
-    # MediaWiki markup should be stripped, but the text has to be parsed as a
-    # heading, otherwise e.g. starting '#' would be understood as a list and
-    # stripped as well.
-    anchors = [strip_markup("={}=".format(heading)) for heading in headings]
-    if pretty is False:
-        anchors = [dotencode(a) for a in anchors]
-    else:
-        # anchors can't contain '[', '|', ']' and tags encode them manually
-        anchors = [a.replace("[", "%5B").replace("|", "%7C").replace("]", "%5D") for a in anchors]
-
-    # handle equivalent headings duplicated on the page
-    for i, anchor in enumerate(anchors):
-        j = 2
-        # this check should be case-insensitive, see https://wiki.archlinux.org/index.php/User:Lahwaacz/Notes#Section_anchors
-        while anchor.lower() in [a.lower() for a in anchors[:i]]:
-            anchor = anchors[i] + suffix_sep + "{}".format(j)
-            j += 1
-        # update the main array
-        anchors[i] = anchor
+    anchors = []
+    # lowercase anchors used so far (the check for duplicates should be
+    # case-insensitive, see https://wiki.archlinux.org/index.php/User:Lahwaacz/Notes#Section_anchors)
+    used = set()
+    # next numeric suffix to try for each lowercase base anchor
+    suffixes = {}
+    for heading in headings:
+        if heading and not _HEADING_MARKUP_REGEX.search(heading):
+            # fast path: there is no markup to strip
+            anchor = heading
+        else:
+            # MediaWiki markup should be stripped, but the text has to be parsed as a
+            # heading, otherwise e.g. starting '#' would be understood as a list and
+            # stripped as well.
+            anchor = strip_markup("={}=".format(heading))
+        if pretty is False:
+            anchor = dotencode(anchor)
+        else:
+            # anchors can't contain '[', '|', ']' and tags encode them manually
+            anchor = anchor.replace("[", "%5B").replace("|", "%7C").replace("]", "%5D")
+
+        # handle equivalent headings duplicated on the page
+        key = anchor.lower()
+        if key in used:
+            j = suffixes.get(key, 2)
+            while (key + suffix_sep + str(j)).lower() in used:
+                j += 1
+            suffixes[key] = j + 1
+            anchor = anchor + suffix_sep + str(j)
+        used.add(anchor.lower())
+        anchors.append(anchor)
     return anchors
 
 def ensure_flagged_by_template(wikicode, node, template_name, *template_parameters, overwrite_parameters=True):
@@ -305,3 +331,101 @@ def parented_ifilter(wikicode, recursive=True, matches=None, flags=FLAGS,
     for parent, node in inodes:
         if (not forcetype or isinstance(node, forcetype)) and match(node):
             yield (parent, node)
+
+# active NodeVisitor objects, keyed by id() of the root wikicode
+_active_visitors = {}
+
+class NodeVisitor:
+    """
+    Visitor which walks the whole wikicode tree once and yields all nodes in
+    the document order (parents before children) together with their parent
+    wikicode, like :py:func:`parented_ifilter` with ``recursive=True``.
+
+    The tree may be modified by the consumer while it is being walked: when
+    the current node is replaced or removed, the walk continues with the nodes
+    found at its place, and nodes inserted after the current node are visited
+    too. Each node is yielded at most once.
+
+    The parents of the visited nodes are recorded. When the visitor is used as
+    a context manager, :py:func:`get_parent_wikicode` uses the recorded
+    parents for the walked wikicode instead of searching the whole tree.
+
+    :param wikicode: a :py:class:`mwparserfromhell.wikicode.Wikicode` object
+    :param types: a node type or a tuple of node types; if not ``None``, only
+                  the nodes of these types are yielded (but the whole tree is
+                  still walked)
+    """
+
+    def __init__(self, wikicode, types=None):
+        self.wikicode = wikicode
+        self.types = types
+        # mapping of id(node) to (node, parent) tuples (the node is stored to
+        # keep it alive, otherwise the id could be reused)
+        self.parents = {}
+        # mapping of id(code) to (code, node) tuples, where code is a child
+        # wikicode of node
+        self._owners = {}
+        # ids of the nodes whose children were walked
+        self._descended = set()
+
+    def __enter__(self):
+        _active_visitors[id(self.wikicode)] = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_visitors.pop(id(self.wikicode), None)
+
+    def __iter__(self):
+        return self._walk(self.wikicode)
+
+    def get_parent(self, node):
+        """
+        Get the recorded parent of a visited node, or ``None``.
+        """
+        entry = self.parents.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+        return None
+
+    def _get_attached_parent(self, node):
+        """
+        Get the recorded parent of a visited node if it still contains the
+        node and is still attached to the walked wikicode, otherwise ``None``.
+        """
+        parent = self.get_parent(node)
+        if parent is None:
+            return None
+        code = parent
+        while True:
+            if not any(n is node for n in code.nodes):
+                return None
+            if code is self.wikicode:
+                return parent
+            entry = self._owners.get(id(code))
+            if entry is None or entry[0] is not code:
+                return None
+            node = entry[1]
+            if not any(child is code for child in node.__children__()):
+                return None
+            code = self.get_parent(node)
+            if code is None:
+                return None
+
+    def _walk(self, code):
+        i = 0
+        while i < len(code.nodes):
+            node = code.nodes[i]
+            key = id(node)
+            if key not in self.parents:
+                self.parents[key] = (node, code)
+                if self.types is None or isinstance(node, self.types):
+                    yield code, node
+                    # the node might have been replaced, removed or moved
+                    if i >= len(code.nodes) or code.nodes[i] is not node:
+                        continue
+            if key not in self._descended:
+                self._descended.add(key)
+                for child in node.__children__():
+                    self._owners[id(child)] = (child, node)
+                    yield from self._walk(child)
+            i += 1
@@ -1,10 +1,14 @@
 #! /usr/bin/env python3
 
 import ssl
+import threading
+
 import requests
 from requests.packages.urllib3.poolmanager import PoolManager
 from requests.packages.urllib3.util import ssl_
 
+from .connection_cache import CachingSSLContext, CachingHTTPConnectionPool, CachingHTTPSConnectionPool
+
 __all__ = ["TLSAdapter"]
 
 class TLSAdapter(requests.adapters.HTTPAdapter):
@@ -18,16 +22,47 @@ class TLSAdapter(requests.adapters.HTTPAdapter):
         # by the used openssl version)
         adapter = TLSAdapter(ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1)
         session.mount("https://", adapter)
+
+    With ``shared_cache=True``, the adapter resolves host names using a DNS
+    cache (including negative caching of non-existent domains) and resumes TLS
+    sessions. Both caches are shared by all adapters created with the same
+    ``ssl_options``, even across different sessions. See the
+    :py:mod:`ws.utils.connection_cache` module for details.
     """
 
-    def __init__(self, *, ssl_options=0, **kwargs):
+    # shared SSL contexts for shared_cache=True, keyed by ssl_options
+    _shared_contexts = {}
+    _shared_contexts_lock = threading.Lock()
+
+    def __init__(self, *, ssl_options=0, shared_cache=False, **kwargs):
         self.ssl_options = ssl_options
+        self.shared_cache = shared_cache
         super(TLSAdapter, self).__init__(**kwargs)
 
+    @classmethod
+    def _get_shared_context(klass, ssl_options):
+        with klass._shared_contexts_lock:
+            ctx = klass._shared_contexts.get(ssl_options)
+            if ctx is None:
+                # certificate verification and hostname checking are enabled
+                # by default for PROTOCOL_TLS_CLIENT
+                ctx = CachingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+                ctx.options |= ssl.OP_NO_COMPRESSION | ssl_options
+                klass._shared_contexts[ssl_options] = ctx
+            return ctx
+
     def init_poolmanager(self, *pool_args, **pool_kwargs):
-        ctx = ssl_.create_urllib3_context(ssl.PROTOCOL_TLS)
-        # extend the default context options, which is to disable SSL2, SSL3
-        # and SSL compression, see:
-        # https://github.com/shazow/urllib3/blob/6a6cfe9/urllib3/util/ssl_.py#L241
-        ctx.options |= self.ssl_options
+        if self.shared_cache:
+            ctx = self._get_shared_context(self.ssl_options)
+        else:
+            ctx = ssl_.create_urllib3_context(ssl.PROTOCOL_TLS)
+            # extend the default context options, which is to disable SSL2, SSL3
+            # and SSL compression, see:
+            # https://github.com/shazow/urllib3/blob/6a6cfe9/urllib3/util/ssl_.py#L241
+            ctx.options |= self.ssl_options
         self.poolmanager = PoolManager(*pool_args, ssl_context=ctx, **pool_kwargs)
+        if self.shared_cache:
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": CachingHTTPConnectionPool,
+                "https": CachingHTTPSConnectionPool,
+            }
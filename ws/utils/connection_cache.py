@@ -0,0 +1,197 @@
+#! /usr/bin/env python3
+
+"""
+Caches of DNS lookups and TLS sessions which can be shared by multiple
+:py:class:`requests.Session` objects via the
+:py:class:`TLSAdapter <ws.utils.TLSAdapter.TLSAdapter>`.
+"""
+
+import collections
+import socket
+import ssl
+import threading
+import time
+
+from requests.packages.urllib3 import connection, connectionpool, exceptions
+from requests.packages.urllib3.util.connection import allowed_gai_family, create_connection
+
+__all__ = ["DNSCache", "TLSSessionCache", "CachingSSLContext",
+           "CachingHTTPConnectionPool", "CachingHTTPSConnectionPool"]
+
+
+class DNSCache:
+    """
+    Thread-safe cache of :py:func:`socket.getaddrinfo` results.
+
+    Failed lookups for non-existent domains are cached too (negative caching),
+    so that links to the same dead domain do not trigger a new query each time.
+    Temporary failures are not cached.
+
+    :param float ttl: time (in seconds) for which successful lookups are cached
+    :param float negative_ttl: time (in seconds) for which failed lookups are cached
+    :param int maxsize: maximum number of cached entries
+    """
+
+    # error codes of getaddrinfo which mean that the name does not exist
+    negative_errors = {getattr(socket, name) for name in ["EAI_NONAME", "EAI_NODATA"] if hasattr(socket, name)}
+
+    def __init__(self, *, ttl=600, negative_ttl=300, maxsize=10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _put(self, key, value, ttl):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def getaddrinfo(self, host, port, family=0, type=0):
+        """
+        Cached version of :py:func:`socket.getaddrinfo`.
+
+        :raises socket.gaierror: when the lookup failed (possibly cached)
+        """
+        key = (host, port, family, type)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._cache[key]
+                entry = None
+        if entry is not None:
+            value = entry[1]
+            if isinstance(value, socket.gaierror):
+                raise socket.gaierror(*value.args)
+            return value
+
+        try:
+            value = socket.getaddrinfo(host, port, family, type)
+        except socket.gaierror as e:
+            if e.errno in self.negative_errors:
+                self._put(key, e, self.negative_ttl)
+            raise
+        self._put(key, value, self.ttl)
+        return value
+
+
+class TLSSessionCache:
+    """
+    Thread-safe LRU cache of :py:class:`ssl.SSLSession` objects keyed by the
+    server host name. The sessions can be reused only with the
+    :py:class:`ssl.SSLContext` that created them, see
+    :py:class:`CachingSSLContext`.
+
+    :param int maxsize: maximum number of cached sessions
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, host):
+        with self._lock:
+            return self._cache.get(host)
+
+    def put(self, host, session):
+        if host is None or session is None:
+            return
+        with self._lock:
+            self._cache[host] = session
+            self._cache.move_to_end(host)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+
+class CachingSSLContext(ssl.SSLContext):
+    """
+    :py:class:`ssl.SSLContext` which resumes the TLS sessions stored in its
+    :py:attr:`session_cache`. New sessions are stored when the connection is
+    established and again when it is closed by :py:class:`CachingHTTPSConnection`
+    (TLS 1.3 session tickets arrive only after the handshake).
+    """
+
+    def __new__(klass, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        self = super().__new__(klass, protocol, *args, **kwargs)
+        self.session_cache = TLSSessionCache()
+        return self
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        if session is None and server_hostname is not None:
+            session = self.session_cache.get(server_hostname)
+        sslsock = super().wrap_socket(sock, *args, server_hostname=server_hostname, session=session, **kwargs)
+        if sslsock.session is not None and not sslsock.session_reused:
+            self.session_cache.put(server_hostname, sslsock.session)
+        return sslsock
+
+
+class CachingHTTPConnection(connection.HTTPConnection):
+    """
+    HTTP connection which resolves the host name using the :py:attr:`dns_cache`.
+    """
+
+    # shared by all connections
+    dns_cache = DNSCache()
+
+    def _new_conn(self):
+        try:
+            addresses = self.dns_cache.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if hasattr(exceptions, "NameResolutionError"):
+                raise exceptions.NameResolutionError(self.host, self, e) from e
+            raise exceptions.NewConnectionError(self, "Failed to establish a new connection: {}".format(e)) from e
+
+        err = None
+        for address in addresses:
+            # connect to the resolved address, the host name is still used for
+            # the Host header, SNI and certificate verification
+            sockaddr = address[4]
+            try:
+                return create_connection(sockaddr[:2], self.timeout,
+                                         source_address=self.source_address,
+                                         socket_options=self.socket_options)
+            except socket.timeout as e:
+                raise exceptions.ConnectTimeoutError(
+                    self, "Connection to {} timed out. (connect timeout={})".format(self.host, self.timeout)) from e
+            except OSError as e:
+                err = e
+        if err is None:
+            err = OSError("getaddrinfo returns an empty list")
+        raise exceptions.NewConnectionError(self, "Failed to establish a new connection: {}".format(err)) from err
+
+
+class CachingHTTPSConnection(CachingHTTPConnection, connection.HTTPSConnection):
+    """
+    HTTPS connection which resolves the host name using the :py:attr:`dns_cache`
+    and stores the TLS session in the :py:class:`CachingSSLContext` when closed.
+    """
+
+    def close(self):
+        sock = self.sock
+        context = getattr(self, "ssl_context", None)
+        if isinstance(sock, ssl.SSLSocket) and isinstance(context, CachingSSLContext):
+            try:
+                session = sock.session
+            except (OSError, ValueError):
+                session = None
+            if session is not None and session.has_ticket:
+                context.session_cache.put(sock.server_hostname, session)
+        super().close()
+
+
+class CachingHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = CachingHTTPConnection
+
+
+class CachingHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = CachingHTTPSConnection
@@ -0,0 +1,112 @@
+#! /usr/bin/env python3
+
+import collections
+import difflib
+
+__all__ = ["FuzzyIndex"]
+
+class FuzzyIndex:
+    """
+    Index for fuzzy matching of strings against a fixed list of items.
+
+    The similarity ratio is the same as computed by
+    ``difflib.SequenceMatcher(a=key, b=item).ratio()``. Instead of comparing
+    the key with all items, the index:
+
+    - selects only the items which share at least one character n-gram with
+      the key (when ``min_ratio`` is positive),
+    - skips the items whose cheap upper bounds of the ratio (based on the
+      lengths and character counts) are below ``min_ratio`` or below the
+      ratio of the last of the ``limit`` best items found so far,
+    - reuses the :py:class:`difflib.SequenceMatcher` objects of the items,
+      which cache the analysis of the item string.
+
+    Note that the n-gram filtering may theoretically miss an item whose ratio
+    is formed only by matching blocks shorter than ``n`` characters, but this
+    does not happen for practically useful thresholds (e.g. 0.8).
+
+    :param items: an iterable of strings
+    :param int n: length of the n-grams
+    """
+
+    def __init__(self, items, n=3):
+        self.items = list(items)
+        self.n = n
+        # mapping of n-grams to the indexes of the items containing them
+        self._grams = {}
+        self._counters = []
+        for i, item in enumerate(self.items):
+            for gram in set(self._ngrams(item)):
+                self._grams.setdefault(gram, []).append(i)
+            self._counters.append(collections.Counter(item))
+        # lazily created SequenceMatcher objects for the items
+        self._matchers = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def _ngrams(self, text):
+        padding = "\0" * (self.n - 1)
+        padded = padding + text + padding
+        return (padded[i:i + self.n] for i in range(len(padded) - self.n + 1))
+
+    def _matcher(self, i):
+        matcher = self._matchers.get(i)
+        if matcher is None:
+            matcher = self._matchers[i] = difflib.SequenceMatcher(b=self.items[i])
+        return matcher
+
+    def ranks(self, key, *, min_ratio=0, limit=None):
+        """
+        Get the items most similar to the key.
+
+        :param str key: the string to look up
+        :param float min_ratio: minimum similarity ratio of the returned items
+        :param int limit: maximum number of returned items (``None`` means
+                          no limit)
+        :returns:
+            a list of ``(item, ratio)`` tuples sorted by ``ratio`` in
+            descending order (items with the same ratio are in the order of
+            the index)
+        """
+        if min_ratio > 0:
+            candidates = set()
+            for gram in set(self._ngrams(key)):
+                candidates.update(self._grams.get(gram, ()))
+            candidates = sorted(candidates)
+        else:
+            candidates = range(len(self.items))
+
+        key_counter = collections.Counter(key)
+        bounds = []
+        for i in candidates:
+            total = len(key) + len(self.items[i])
+            if total == 0:
+                bound = 1.0
+            elif 2.0 * min(len(key), len(self.items[i])) / total < min_ratio:
+                continue
+            else:
+                bound = 2.0 * sum((key_counter & self._counters[i]).values()) / total
+                if bound < min_ratio:
+                    continue
+            bounds.append((bound, i))
+        # stable sort keeps the order of the index for equal bounds
+        bounds.sort(key=lambda item: item[0], reverse=True)
+
+        ranks = []
+        for bound, i in bounds:
+            if limit is not None and len(ranks) >= limit and bound < ranks[limit - 1][0]:
+                break
+            matcher = self._matcher(i)
+            matcher.set_seq1(key)
+            ratio = matcher.ratio()
+            if ratio >= min_ratio:
+                ranks.append((ratio, i))
+                if limit is not None:
+                    ranks.sort(key=lambda item: (-item[0], item[1]))
+                    del ranks[limit:]
+
+        ranks.sort(key=lambda item: (-item[0], item[1]))
+        if limit is not None:
+            ranks = ranks[:limit]
+        return [(self.items[i], ratio) for ratio, i in ranks]
@@ -1,5 +1,9 @@
 #! /usr/bin/env python3
 
+import threading
+
+__all__ = ["LazyProperty"]
+
 class LazyProperty(property):
     """
     A `descriptor`_ wrapping a class method and exposing it as a lazily
@@ -11,14 +15,21 @@ class LazyProperty(property):
     ``del object.attribute``, which will cause the wrapped method to be called
     again on the next access.
 
+    The cached value is stored in the ``__dict__`` of the instance, so it is
+    released together with the instance. Concurrent first access from multiple
+    threads is synchronized, the wrapped method is evaluated only once.
+
     .. _`descriptor`: https://docs.python.org/3/howto/descriptor.html
     """
 
     def __init__(self, func):
         self.func = func
-        # descriptors must be set on class, so we manage a mapping
-        # of the memoized values per instance
-        self._cache = {}
+        # key in the instance's __dict__ holding the cached value
+        # (the descriptor has precedence over the instance's __dict__, because
+        # it defines __set__, so the function name can be used directly)
+        self._name = func.__name__
+        # key in the instance's __dict__ holding the lock for the first access
+        self._lock_name = "_LazyProperty_lock_" + func.__name__
 
         # pass along the decorated function's docstring
         self.__doc__ = func.__doc__
@@ -28,17 +39,30 @@ class LazyProperty(property):
             # static access, e.g. introspection
             return self
 
-        if instance not in self._cache:
-            self._cache[instance] = self.func(instance)
-        return self._cache[instance]
+        cache = instance.__dict__
+        try:
+            return cache[self._name]
+        except KeyError:
+            pass
+
+        # dict.setdefault is atomic, so all threads get the same lock
+        lock = cache.setdefault(self._lock_name, threading.RLock())
+        with lock:
+            # check again, the value might have been computed by another thread
+            try:
+                return cache[self._name]
+            except KeyError:
+                value = cache[self._name] = self.func(instance)
+        # the lock is not needed anymore, threads waiting for it will find the value
+        cache.pop(self._lock_name, None)
+        return value
 
     # allow overriding the cached value (useful e.g. for mocking in tests)
     def __set__(self, instance, value):
-        self._cache[instance] = value
+        instance.__dict__[self._name] = value
 
     def __delete__(self, instance):
-        if instance in self._cache:  # pragma: no branch
-            del self._cache[instance]
+        instance.__dict__.pop(self._name, None)
 
 if __name__ == "__main__":
     class Foo:
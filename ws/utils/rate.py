@@ -28,13 +28,32 @@ Or at runtime by wrapping the function call:
 
 from functools import wraps
 import time
+import threading
 import logging
 
 import ws
 
 logger = logging.getLogger(__name__)
 
-__all__ = ["RateLimited"]
+__all__ = ["RateLimited", "add_throttle_hook", "remove_throttle_hook"]
+
+# callables invoked as hook(func_qualname, seconds) whenever a rate-limited
+# function has to sleep (used e.g. by ws.client.metrics)
+_throttle_hooks = []
+
+def add_throttle_hook(hook):
+    """
+    Register a callable which is called as ``hook(qualname, seconds)`` each
+    time a function decorated with :py:func:`RateLimited` sleeps due to the
+    exceeded rate limit.
+    """
+    _throttle_hooks.append(hook)
+
+def remove_throttle_hook(hook):
+    """
+    Unregister a callable registered with :py:func:`add_throttle_hook`.
+    """
+    _throttle_hooks.remove(hook)
 
 def RateLimited(rate, per):
     def decorator(func):
@@ -42,6 +61,9 @@ def RateLimited(rate, per):
         # defined as lists to avoid problems with the 'global' keyword
         allowance = [rate]
         last_check = [time.time()]
+        # the bookkeeping (including the sleep) must be synchronized when the
+        # function is called from multiple threads, the call itself is not
+        lock = threading.Lock()
 
         @wraps(func)
         def rate_limit_func(*args, **kargs):
@@ -49,24 +71,25 @@ def RateLimited(rate, per):
             if hasattr(ws, "_tests_are_running"):
                 return func(*args, **kargs)
 
-            current = time.time()
-            time_passed = current - last_check[0]
-            last_check[0] = current
-            allowance[0] += time_passed * (rate / per)
-            if allowance[0] > rate:
-                allowance[0] = rate    # throttle
-            if allowance[0] < 1.0:
-                # the original used    to_sleep = (1 - allowance[0]) * (per / rate)
-                # but we want longer timeout after burst limit is exceeded
-                to_sleep = (1 - allowance[0]) * per
-                logger.info("rate limit for function {} exceeded, sleeping for {:0.3f} seconds".format(func.__qualname__, to_sleep))
-                time.sleep(to_sleep)
-                ret = func(*args, **kargs)
-                allowance[0] = rate
-            else:
-                ret = func(*args, **kargs)
-                allowance[0] -= 1.0
-            return ret
+            with lock:
+                current = time.time()
+                time_passed = current - last_check[0]
+                last_check[0] = current
+                allowance[0] += time_passed * (rate / per)
+                if allowance[0] > rate:
+                    allowance[0] = rate    # throttle
+                if allowance[0] < 1.0:
+                    # the original used    to_sleep = (1 - allowance[0]) * (per / rate)
+                    # but we want longer timeout after burst limit is exceeded
+                    to_sleep = (1 - allowance[0]) * per
+                    logger.info("rate limit for function {} exceeded, sleeping for {:0.3f} seconds".format(func.__qualname__, to_sleep))
+                    time.sleep(to_sleep)
+                    allowance[0] = rate
+                    for hook in _throttle_hooks:
+                        hook(func.__qualname__, to_sleep)
+                else:
+                    allowance[0] -= 1.0
+            return func(*args, **kargs)
 
         return rate_limit_func
 